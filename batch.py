@@ -0,0 +1,88 @@
+# ================== BATCHED FIELDS ==================
+#
+# K independent torus fields of the same shape, stepped together: the state
+# is one (K, ...) uint8 array and every numpy operation of a generation
+# covers all of them, so small fields (the default [14,14,1] or [16,16,16])
+# no longer pay the per-call overhead of numpy once per field. Every field
+# has its own rule - its lookup table is a row of a (K, 2, width) array - as
+# long as all the rules share their neighbourhood (radius, shape, centre).
+#
+# A field stops once it is extinct or still (a generation changed nothing):
+# it keeps its last state and the next generations only step the others.
+# See core.setRandomBatch for seeded random batches.
+
+import numpy
+import rules
+
+
+def countBatch(cells, rule):
+    """
+        Neighbour counts of every cell of a (K, ...) stack of torus fields
+        (the first axis is not wrapped around).
+    """
+    return rule.countNeighbours(cells, range(1, cells.ndim))
+
+
+class Batch(object):
+    """
+        count fields of the given state shape (e.g. (14, 14) or (16, 16, 16)),
+        all under rule or each under its own entry of fieldRules (any
+        notation of rules.py). population, generation, extinct and still are
+        per-field arrays.
+    """
+    def __init__(self, shape, count, rule=[[3],[2,3]], fieldRules=None):
+        if fieldRules is None:
+            fieldRules = [rule]*count
+        self.rules = [rules.parse(r) for r in fieldRules]
+        if len(self.rules) != count:
+            raise Exception('A batch of %d fields needs %d rules!' % (count, count))
+        self.rule = self.rules[0]
+        neighbourhood = lambda r: (r.radius, r.neighbourhood, r.centre)
+        if any(neighbourhood(r) != neighbourhood(self.rule) for r in self.rules):
+            raise Exception('The rules of a batch must share their neighbourhood!')
+        self.shape = tuple(shape)
+        self.count = count
+        self.tables = numpy.array([r.compile(len(self.shape)) for r in self.rules])
+        self.width = self.tables.shape[2]
+        # with birth on 0 neighbours an empty field does not stay empty
+        self.mortal = ~self.tables[:, 0, 0]
+        self.setState(numpy.zeros((count,) + self.shape, dtype=numpy.uint8))
+
+    def setState(self, cells):
+        """
+            Sets the (count, ...) states and restarts every field.
+        """
+        self.cells = numpy.array(cells, dtype=numpy.uint8).reshape((self.count,) + self.shape)
+        self.population = self.cells.reshape(self.count, -1).sum(axis=1)
+        self.generation = numpy.zeros(self.count, dtype=numpy.intp)
+        self.extinct = (self.population == 0) & self.mortal
+        self.still = numpy.zeros(self.count, dtype=bool)
+
+    @property
+    def done(self):
+        return self.extinct | self.still
+
+    def step(self, generations=1):
+        """
+            Advances every field that is not done; returns the number of
+            fields still running.
+        """
+        flat = self.tables.reshape(self.count, -1)
+        for g in range(generations):
+            running = numpy.flatnonzero(~self.done)
+            if not len(running):
+                return 0
+            if len(running) == self.count:
+                cells, tables = self.cells, flat
+            else:
+                cells, tables = self.cells[running], flat[running]
+            index = cells.astype(numpy.intp)*self.width + countBatch(cells, self.rule)
+            index += (numpy.arange(len(running))*tables.shape[1]).reshape((-1,) + (1,)*len(self.shape))
+            new = numpy.take(tables, index).view(numpy.uint8)
+            population = new.reshape(len(running), -1).sum(axis=1)
+            self.still[running] = ~(new != cells).reshape(len(running), -1).any(axis=1)
+            self.extinct[running] = (population == 0) & self.mortal[running]
+            self.population[running] = population
+            self.generation[running] += 1
+            self.cells[running] = new
+        return int(numpy.count_nonzero(~self.done))
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+
+# ================== BENCHMARKS ==================
+#
+# Times the hot paths and writes the results as JSON:
+#   - update2DField/update3DField generations per second, for the fieldSize
+#     presets of core.py at several minRand densities;
+#   - Field.__init__/Field.remove against a mock scene manager;
+#   - config decoding (loadConfig) for every configs/ entry.
+# Every result is stored as seconds per operation (lower is better).
+#
+#     python benchmarks.py run [--output results.json] [--repeat N]
+#     python benchmarks.py compare baseline.json results.json [--threshold 0.1]
+#
+# compare prints every result side by side and exits with status 1 if any of
+# them got slower than the baseline by more than the threshold.
+
+import argparse
+import json
+import sys
+import time
+import types
+
+import numpy
+import core
+import patterns
+
+sizes = [[14,14,1], [60,60,1], [16,16,16], [30,30,20]]
+densities = [0.5, 0.8, 0.95]
+
+
+def best(function, repeat):
+    """
+        Best wall time of repeat calls (the least disturbed one).
+    """
+    times = []
+    for r in range(repeat):
+        t = time.time()
+        function()
+        times.append(time.time() - t)
+    return min(times)
+
+
+def benchStepping(repeat, generations=10):
+    results = {}
+    for size in sizes:
+        for minRand in densities:
+            numpy.random.seed(0)
+            f = core.HeadlessField(size)
+            core.setFieldState(f, (numpy.random.random_sample(f.size) > minRand).view(numpy.uint8))
+            update = core.update3DField if core.is3D(f.size) else core.update2DField
+            def steps():
+                for g in range(generations):
+                    update(f)
+            name = 'step/%s/%dx%dx%d/minRand=%s' % ((update.__name__,) + tuple(size) + (minRand,))
+            results[name] = best(steps, repeat)/generations
+    return results
+
+
+# ------------------------------------------------------------
+# mock Ogre, only what scene_objects needs to build and remove a Field:
+
+class MockObject(object):
+    def __init__(self, name=None):
+        self.name = name
+
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+class MockSceneManager(object):
+    def __init__(self):
+        self.root = MockObject('Ogre/SceneRoot')
+        self.root.createChildSceneNode = MockObject
+        self.calls = 0
+
+    def getRootSceneNode(self):
+        return self.root
+
+    def createEntity(self, name, mesh):
+        self.calls += 1
+        return mockOgre.Entity(name)
+
+    def createManualObject(self, name):
+        self.calls += 1
+        return mockOgre.ManualObject(name)
+
+    def __getattr__(self, name):
+        def call(*args):
+            self.calls += 1
+        return call
+
+
+class MockRenderOperation:
+    OT_LINE_LIST = 2
+    OT_TRIANGLE_LIST = 4
+
+
+mockOgre = types.ModuleType('ogre.renderer.OGRE')
+mockOgre.Vector3 = lambda x=0.0, y=0.0, z=0.0: (x, y, z)
+mockOgre.Entity = type('Entity', (MockObject,), {})
+mockOgre.ManualObject = type('ManualObject', (MockObject,), {})
+mockOgre.RenderOperation = MockRenderOperation
+
+
+def importSceneObjects():
+    try:
+        import scene_objects
+    except ImportError:
+        package = types.ModuleType('ogre')
+        package.renderer = types.ModuleType('ogre.renderer')
+        package.renderer.OGRE = mockOgre
+        sys.modules.update({'ogre': package, 'ogre.renderer': package.renderer,
+                            'ogre.renderer.OGRE': mockOgre})
+        import scene_objects
+    return scene_objects
+
+
+def benchFields(repeat):
+    scene_objects = importSceneObjects()
+    results = {}
+    for size in sizes:
+        sceneManager = MockSceneManager()
+        fields = []
+        name = '%dx%dx%d' % tuple(size)
+        results['field/init/' + name] = best(
+            lambda: fields.append(scene_objects.Field(sceneManager, size, 1.0)), repeat)
+        results['field/remove/' + name] = best(lambda: fields.pop().remove(), repeat)
+    return results
+
+
+def benchConfigs(repeat):
+    results = {}
+    for fname in core.files:
+        def load():
+            patterns.cache.clear()
+            core.loadConfig(fname)
+        results['config/' + fname] = best(load, repeat)
+    return results
+
+
+def runAll(repeat):
+    results = {}
+    results.update(benchStepping(repeat))
+    results.update(benchFields(repeat))
+    results.update(benchConfigs(repeat))
+    return results
+
+
+def compare(baseline, results, threshold):
+    """
+        Prints the results against the baseline; returns the regressions.
+    """
+    regressions = []
+    for name in sorted(results):
+        new = results[name]
+        old = baseline.get(name)
+        if old is None:
+            sys.stdout.write('%-60s %10.3f ms  (new)\n' % (name, new*1000))
+            continue
+        ratio = new/old if old > 0 else 1.0
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        sys.stdout.write('%-60s %10.3f ms  %10.3f ms  x%.2f%s\n' % (name, old*1000, new*1000, ratio, flag))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Game of life benchmarks.')
+    commands = parser.add_subparsers(dest='command')
+    run = commands.add_parser('run')
+    run.add_argument('--output', '-o', default='bench_output.json')
+    run.add_argument('--repeat', '-r', type=int, default=3)
+    comparing = commands.add_parser('compare')
+    comparing.add_argument('baseline')
+    comparing.add_argument('results')
+    comparing.add_argument('--threshold', '-t', type=float, default=0.1)
+    options = parser.parse_args(args)
+    if options.command == 'run':
+        results = runAll(options.repeat)
+        f = open(options.output, 'w')
+        json.dump(results, f, indent=1, sort_keys=True)
+        f.close()
+        compare({}, results, 0)
+    elif options.command == 'compare':
+        baseline = json.load(open(options.baseline))
+        results = json.load(open(options.results))
+        if compare(baseline, results, options.threshold):
+            sys.exit(1)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
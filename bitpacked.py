@@ -0,0 +1,125 @@
+# ============== BIT-PACKED 2D STEPPING ENGINE ==============
+#
+# Every row of a 2D field (fixed i, running j) is packed into uint64 words,
+# 64 cells per word: cell j lives in word j//64, bit j%64. Neighbour counts
+# are never materialized per cell - the eight neighbour bit-planes are summed
+# with full-adder logic into four count bit-planes, and the rule is applied
+# with bitwise masks. The torus wrap-around matches engine.step exactly.
+
+import numpy
+
+ONE = numpy.uint64(1)
+# every byte with its bits in reverse order
+REVERSED = numpy.packbits(numpy.unpackbits(numpy.arange(256, dtype=numpy.uint8)[:, None], axis=1)[:, ::-1],
+                          axis=1).reshape(-1)
+
+
+def wordsCount(ny):
+    return (ny + 63) // 64
+
+
+def pack(cells):
+    """
+        Packs a 2D uint8 state array of shape (nx, ny) into (nx, words) uint64.
+    """
+    nx, ny = cells.shape
+    padded = numpy.zeros((nx, wordsCount(ny)*64), dtype=numpy.uint8)
+    padded[:, :ny] = cells != 0
+    # packbits fills the high bit of a byte first: reversed, cell j is bit
+    # j%8 of byte j//8, i.e. bit j%64 of the little-endian word j//64
+    bytes = REVERSED[numpy.packbits(padded, axis=1)]
+    return bytes.view('<u8').astype(numpy.uint64, copy=False)
+
+
+def unpack(words, ny):
+    """
+        Unpacks (nx, words) uint64 back into a (nx, ny) uint8 state array.
+    """
+    bytes = numpy.ascontiguousarray(words, dtype='<u8').view(numpy.uint8)
+    return numpy.ascontiguousarray(numpy.unpackbits(REVERSED[bytes], axis=1)[:, :ny])
+
+
+def _padMask(ny):
+    # valid bits of the last word of each row
+    tail = ny % 64
+    if tail == 0:
+        return ~numpy.uint64(0)
+    return (ONE << numpy.uint64(tail)) - ONE
+
+
+def _shiftRows(words, ny):
+    """
+        Returns (prev, next): planes holding, at bit j, the cell at j-1 and at
+        j+1 respectively (torus wrap along the row).
+    """
+    last = wordsCount(ny) - 1
+    tail = numpy.uint64((ny - 1) % 64)
+    mask = _padMask(ny)
+    prev = (words << ONE) | (numpy.roll(words, 1, 1) >> numpy.uint64(63))
+    nxt = (words >> ONE) | (numpy.roll(words, -1, 1) << numpy.uint64(63))
+    if ny % 64:
+        # the wrapped bit does not sit on a word boundary: move it by hand
+        prev[:, 0] = (prev[:, 0] & ~ONE) | ((words[:, last] >> tail) & ONE)
+        nxt[:, last] &= mask >> ONE
+        nxt[:, last] |= (words[:, 0] & ONE) << tail
+    prev[:, last] &= mask
+    return prev, nxt
+
+
+def _fullAdd(a, b, c):
+    t = a ^ b
+    return t ^ c, (a & b) | (t & c)
+
+
+def _halfAdd(a, b):
+    return a ^ b, a & b
+
+
+def countPlanes(words, ny):
+    """
+        Returns the neighbour count of every cell as four bit-planes
+        (weights 1, 2, 4, 8).
+    """
+    up = numpy.roll(words, -1, 0)
+    down = numpy.roll(words, 1, 0)
+    upPrev, upNext = _shiftRows(up, ny)
+    downPrev, downNext = _shiftRows(down, ny)
+    prev, nxt = _shiftRows(words, ny)
+    s1, c1 = _fullAdd(upPrev, up, upNext)
+    s2, c2 = _fullAdd(downPrev, down, downNext)
+    s3, c3 = _halfAdd(prev, nxt)
+    ones, cA = _fullAdd(s1, s2, s3)
+    t, cB = _fullAdd(c1, c2, c3)
+    twos, cC = _halfAdd(t, cA)
+    fours, eights = _halfAdd(cB, cC)
+    return ones, twos, fours, eights
+
+
+def _countEquals(planes, n):
+    result = None
+    for bit, plane in enumerate(planes):
+        term = plane if (n >> bit) & 1 else ~plane
+        result = term if result is None else result & term
+    return result
+
+
+def _anyCount(planes, counts, zeros):
+    result = zeros
+    for n in set(counts):
+        if 0 <= n <= 8:
+            result = result | _countEquals(planes, n)
+    return result
+
+
+def step(words, ny, rules):
+    """
+        Advances the packed state by one generation under [birth, survival]
+        rules and returns the new packed state.
+    """
+    planes = countPlanes(words, ny)
+    zeros = numpy.zeros_like(words)
+    born = _anyCount(planes, rules[0], zeros)
+    survive = _anyCount(planes, rules[1], zeros)
+    result = (~words & born) | (words & survive)
+    result[:, -1] &= _padMask(ny)
+    return result
@@ -0,0 +1,130 @@
+# ============== TEMPORALLY BLOCKED STEPPING ==============
+#
+# Advances a torus field several generations per pass over memory. The field
+# is wrapped once per pass with a halo of depth*radius cells (so the torus is
+# respected) and cut into tiles; each tile is read once together with its
+# halo, as a view of the wrapped field, stepped depth generations - every generation only the cells
+# whose neighbourhood is still complete are kept, so the padded tile shrinks
+# by radius cells per side and ends up as the tile itself - and written back.
+# The whole working set of a tile stays in cache, instead of the whole field
+# being streamed through memory once per generation: this pays off for large
+# 3D fields, whose stepping is memory-bound. The results are exactly those
+# of the single-step engine.
+#
+# The tile side is chosen so that a padded tile fits in cacheBytes, and the
+# depth from the tile side: the halo is kept to a sixteenth of the tile per
+# side, which bounds the cells stepped more than once.
+#
+# Run this module to compare it with the single-step engine:
+#     python blocked.py [nx ny nz] [generations]
+
+import sys
+import time
+
+import numpy
+import rules
+
+# bytes per padded cell: the cells, their counts and the table indices
+CELL_BYTES = 4
+
+
+def tileSide(dimensions, cacheBytes=2**21):
+    """
+        Tile side whose padded tile (with the halo of tileDepth) fits in
+        cacheBytes.
+    """
+    return max(4, int((cacheBytes / float(CELL_BYTES))**(1.0/dimensions) / 1.25))
+
+
+def tileDepth(side, radius=1):
+    """
+        Generations per pass for a tile side: the halo (depth*radius cells
+        per side) is at most a sixteenth of the tile.
+    """
+    return max(1, side // (16*radius))
+
+
+def _splits(n, side):
+    return [(lo, min(lo+side, n)) for lo in range(0, n, side)]
+
+
+class BlockedStepper(object):
+    """
+        Steps a torus state array under a rule (any notation of rules.py)
+        depth generations per pass over its tiles. side and depth default
+        to tileSide and tileDepth.
+    """
+    def __init__(self, rule, dimensions, side=None, depth=None, cacheBytes=2**21):
+        self.rule = rules.parse(rule)
+        self.cacheBytes = cacheBytes
+        self.side = side or tileSide(dimensions, cacheBytes)
+        self.depth = depth or tileDepth(self.side, self.rule.radius)
+        table = self.rule.compile(dimensions)
+        self.width = table.shape[1]
+        self.flat = table.ravel().view(numpy.uint8)
+        self.indexType = numpy.uint8 if 2*self.width <= 256 else numpy.intp
+
+    def _stepTile(self, cells, generations):
+        r = self.rule.radius
+        for g in range(generations):
+            counts = self.rule.countPadded(cells)
+            inner = cells[(slice(r, -r),)*cells.ndim].astype(self.indexType)
+            inner *= self.width
+            inner += counts
+            cells = numpy.take(self.flat, inner)
+        return cells
+
+    def step(self, cells, generations=1):
+        """
+            Returns the state array generations later.
+        """
+        if cells.size*CELL_BYTES <= self.cacheBytes:
+            # the whole field stays in cache anyway
+            for g in range(generations):
+                cells = self.rule.step(cells)
+            return cells
+        tiles = [[]]
+        for n in cells.shape:
+            tiles = [tile + [s] for tile in tiles for s in _splits(n, self.side)]
+        while generations > 0:
+            depth = min(self.depth, generations)
+            halo = depth*self.rule.radius
+            # slicing the wrapped field is much cheaper than gathering every
+            # tile with wrapped indices
+            wrapped = numpy.pad(cells, halo, mode='wrap')
+            new = numpy.empty_like(cells)
+            for bounds in tiles:
+                padded = wrapped[tuple(slice(lo, hi+2*halo) for lo, hi in bounds)]
+                new[tuple(slice(lo, hi) for lo, hi in bounds)] = self._stepTile(padded, depth)
+            cells = new
+            generations -= depth
+        return cells
+
+
+def benchmark(size, generations, rule=[[6],[3,4,5,6]]):
+    """
+        Prints generations/sec of the single-step engine and of the blocked
+        stepper, and checks that they agree.
+    """
+    cells = (numpy.random.random_sample(size) > 0.8).view(numpy.uint8)
+    rule = rules.parse(rule)
+    t = time.time()
+    expected = cells
+    for g in range(generations):
+        expected = rule.step(expected)
+    single = generations/(time.time()-t)
+    stepper = BlockedStepper(rule, len(size))
+    t = time.time()
+    result = stepper.step(cells, generations)
+    blocked = generations/(time.time()-t)
+    sys.stdout.write('single step: %8.1f gen/s\n' % single)
+    sys.stdout.write('blocked:     %8.1f gen/s  x%.2f (tile %d, depth %d)%s\n' %
+                     (blocked, blocked/single, stepper.side, stepper.depth,
+                      '' if (result == expected).all() else '  MISMATCH'))
+
+
+if __name__ == '__main__':
+    # a 1-cell axis is dropped: 'python blocked.py 2048 2048 1' is a 2D field
+    size = [int(n) for n in sys.argv[1:4] if int(n) > 1] or [200, 200, 200]
+    generations = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+    benchmark(size, generations)
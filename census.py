@@ -0,0 +1,121 @@
+# ================== GENERATION CENSUS ==================
+#
+# Per-generation statistics of a field, gathered while it is stepped: core
+# reports every generation to the Census attached to the field (f.census),
+# as its births and deaths (core.applyFieldDiff), from which the population
+# follows without counting the field again, or as the old and new states
+# (core.setFieldState): one comparison gives the births, the new population
+# the deaths. At the end of a generation (core.updateField) a record is made:
+#
+#   {'generation': 12, 'population': 240, 'births': 31, 'deaths': 27,
+#    'boundingBox': [[2, 3, 0], [18, 17, 9]], 'layers': [20, 31, ...]}
+#
+# boundingBox is the (low, high) corners of the alive cells (high excluded,
+# None for an empty field) and layers the population of every z layer (3D
+# fields only); both come from two more reductions of the state, so they are
+# only added when asked for (extent=True).
+#
+# Records are appended to a JSONL file (path) as they are made, and kept
+# until taken (take, or core.iterateField that steps a field and yields them).
+
+import json
+from collections import deque
+
+import numpy
+
+
+class Census(object):
+    """
+        Births, deaths and population of a field, recorded per generation;
+        with extent=True the bounding box and the layer counts as well.
+    """
+    def __init__(self, path=None, generation=0, extent=False):
+        self.dump = open(path, 'a') if path else None
+        self.extent = extent
+        self.generation = generation
+        self.population = None
+        self.births = 0
+        self.deaths = 0
+        self.records = deque()
+
+    def reset(self, state, generation=None):
+        """
+            Counts a state from scratch, as the one of generation (by
+            default the current one).
+        """
+        if generation is not None:
+            self.generation = generation
+        self.population = int(numpy.count_nonzero(state))
+        self.births = self.deaths = 0
+
+    def flip(self, births, deaths):
+        """
+            Follows a change given as (births, deaths) index tuples.
+        """
+        self.births += len(births[0])
+        self.deaths += len(deaths[0])
+
+    def change(self, old, new):
+        """
+            Follows a change given as the old and the new state arrays.
+        """
+        if old is None or old.shape != new.shape or self.population is None:
+            self.reset(new)
+            return
+        # states are 0/1: one comparison for the births, the deaths follow
+        # from the populations
+        births = int(numpy.count_nonzero(new > old))
+        population = int(numpy.count_nonzero(new))
+        self.deaths += births - (population - (self.population + self.births - self.deaths))
+        self.births += births
+
+    def record(self, state, generations=1):
+        """
+            Closes the generation(s) stepped since the last record; returns
+            the record.
+        """
+        self.generation += generations
+        self.population += self.births - self.deaths
+        record = {'generation': self.generation, 'population': self.population,
+                  'births': self.births, 'deaths': self.deaths}
+        if self.extent:
+            record.update(_extent(state))
+        self.births = self.deaths = 0
+        self.records.append(record)
+        if self.dump is not None:
+            self.dump.write(json.dumps(record, sort_keys=True) + '\n')
+            self.dump.flush()
+        return record
+
+    def take(self):
+        """
+            Returns the records not taken yet, oldest first.
+        """
+        records = list(self.records)
+        self.records.clear()
+        return records
+
+    def close(self):
+        if self.dump is not None:
+            self.dump.close()
+            self.dump = None
+
+
+def _extent(state):
+    # bounding box (and layer counts in 3D) from the (ny, nz) column counts
+    # and the x projection
+    columns = state.sum(axis=0, dtype=numpy.intp)
+    extent = {}
+    if state.ndim == 3 and state.shape[2] > 1:
+        extent['layers'] = columns.sum(axis=0).tolist()
+    rows = numpy.flatnonzero(state.any(axis=tuple(range(1, state.ndim))))
+    if not len(rows):
+        extent['boundingBox'] = None
+        return extent
+    low, high = [int(rows[0])], [int(rows[-1])+1]
+    for axis in range(columns.ndim):
+        alive = numpy.flatnonzero(columns.any(axis=tuple(a for a in range(columns.ndim) if a != axis)))
+        low.append(int(alive[0]))
+        high.append(int(alive[-1])+1)
+    extent['boundingBox'] = [low, high]
+    return extent
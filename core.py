@@ -0,0 +1,615 @@
+# ============ THE GAME Of LIFE: SIMULATION CORE ============
+#
+# Field state, configs and stepping. Nothing here imports the renderer, so
+# the core runs on render-less machines (see life_run.py); main.py adds
+# the Ogre viewer on top. The heavier engines are imported on first use.
+
+# --------------- setting main parameters --------------
+#fieldSize = [20,20,10]
+#fieldSize = [60,60,1]
+#fieldSize = [30,30,20]
+#fieldSize = [16,16,16]
+fieldSize = [14,14,1]
+fieldScale = 10
+minRand = 0.8
+# rules (any notation of rules.py, e.g. 'B3/S23' or [[3],[2,3]]):
+rules2D = [[3],[2,3]]
+#rules3D = [[6],[5,6,7]]
+rules3D = [[6],[3,4,5,6]]
+#rules3D = [6,8,10]
+#rules3D = [6,9,11]
+#rules3D = 'B4/S2-4/NN'
+# stepping backends: 'array', 'active' (changed cells only),
+# 'bitpacked' (2D only), 'parallel' (3D only, multi-core tiles),
+# 'sparse' (unbounded universe, the field shows its fieldSize window),
+# 'hashlife' (2D only: the same with a HashLife plane, for advanceField) or
+# 'blocked' (several generations per pass over cache-sized tiles, for
+# advanceField, free-running simulations and large fields)
+backend2D = 'array'
+backend3D = 'array'
+# worker processes (None = all cores) and tiles per axis of the 'parallel' backend
+processes = None
+tiles = None
+# precompute the initial fields of the prefetched configs (see prefetch.py)
+prefetchStates = True
+# largest field (in cells) a config is expanded into; larger 2D patterns
+# (.mc, .rle, .cells) only run with advanceField, as a HashLife quadtree
+maxFieldCells = 2**28
+# plain cell steps a HashLife torus jump costs per alive cell: advanceField
+# only jumps sparse fields, where the plain steps would cost more
+hashLifeCellCost = 2**16
+# ------------------------------------------------------
+
+defaultRules2D, defaultRules3D = rules2D, rules3D
+
+def is3D(size):
+    return size[0] > 1 and size[1] > 1 and size[2] > 1
+
+def getFieldSize():
+    global fieldSize
+    return fieldSize
+
+def setFieldSize(size):
+    global fieldSize
+    fieldSize = size
+
+def getFieldScale():
+    global fieldScale
+    return fieldScale
+
+def setFieldScale(scale):
+    global fieldScale
+    fieldScale = scale
+
+def getMinRand():
+    global minRand
+    return minRand
+
+def setMinRand(rand):
+    global minRand
+    minRand = rand
+
+
+from os.path import isdir
+import patterns
+
+dir = 'configs'
+files = patterns.listConfigs(dir) if isdir(dir) else []
+currentFileIndex = None
+prefetcher = None
+
+initialCells = None
+initialPattern = None
+initialGeneration = 0
+initialSeed = None
+prefetchedState = None
+# seed of the last random field drawn (None if the last field was not random)
+fieldSeed = None
+
+def startPrefetching():
+    global prefetcher
+    import prefetch
+    prefetcher = prefetch.Prefetcher(dir, states=prefetchStates)
+    prefetcher.start()
+
+def refreshFiles(step):
+    """
+        Picks up the configs added to/removed from the directory since the
+        last switch, keeping the current index on the current file (or, if
+        it was removed, where the next step lands on its neighbour).
+    """
+    global files, currentFileIndex
+    if prefetcher is not None:
+        current = files[currentFileIndex] if currentFileIndex is not None else None
+        files = prefetcher.getFiles()
+    if not files:
+        raise Exception('No config in %r!' % dir)
+    if prefetcher is None:
+        return
+    if current in files:
+        currentFileIndex = files.index(current)
+    elif currentFileIndex is not None:
+        currentFileIndex = (currentFileIndex - (step > 0)) % len(files)
+
+def loadConfig(fname):
+    """
+        Loads a config (any format of patterns.py): the initial cells or the
+        random field parameters, and optionally a rule.
+    """
+    global initialCells, initialPattern, initialGeneration, initialSeed, rules2D, rules3D, prefetchedState
+    config = patterns.load(fname)
+    prefetchedState = None
+    if prefetcher is not None:
+        prefetchedState = prefetcher.takeState(fname)
+        prefetcher.setCurrent(fname)
+    rules2D, rules3D = defaultRules2D, defaultRules3D
+    # 2D patterns are kept unexpanded: only HashLife runs those too large for a field
+    initialPattern = config if config.node is not None or config.coords is not None else None
+    initialCells = config.cells if fitsField(config.size) else None
+    initialGeneration = config.generation
+    initialSeed = config.seed
+    setFieldSize(list(config.size))
+    if config.scale is not None:
+        setFieldScale(config.scale)
+    if config.minRand is not None:
+        setMinRand(config.minRand)
+    if config.rule:
+        if is3D(fieldSize):
+            rules3D = config.rule
+        else:
+            rules2D = config.rule
+
+def loadNextConfig():
+    global files, currentFileIndex
+    refreshFiles(1)
+    if currentFileIndex is None:
+        currentFileIndex = 0
+    else:
+        currentFileIndex += 1
+        if currentFileIndex == len(files):
+            currentFileIndex = 0
+    loadConfig(files[currentFileIndex])
+
+def loadPrevConfig():
+    global files, currentFileIndex
+    refreshFiles(-1)
+    if currentFileIndex is None:
+        currentFileIndex = 0
+    elif currentFileIndex == 0:
+        currentFileIndex = len(files)-1
+    else:
+        currentFileIndex -= 1
+    loadConfig(files[currentFileIndex])
+
+
+import time
+import numpy
+import engine
+import rules
+parallelStepper = None
+# per-tick timings (see profiling.py), None while profiling is off
+profiler = None
+
+
+def startProfiling(path=None, length=256):
+    """
+        Starts recording the step/sync timings of every tick; path is an
+        optional JSONL file to append them to.
+    """
+    global profiler
+    import profiling
+    stopProfiling()
+    profiler = profiling.Profiler(length, path)
+    return profiler
+
+def stopProfiling():
+    global profiler
+    if profiler is not None:
+        profiler.close()
+        profiler = None
+
+def getProfiler():
+    return profiler
+
+
+class HeadlessField(object):
+    """
+        The state of a field without any scene objects, for render-less
+        runs; the functions below take it or a scene_objects.Field alike.
+    """
+    def __init__(self, size):
+        if len(size) == 1:
+            self.size = list(size[0:1]) + [1, 1]
+        elif len(size) == 2:
+            self.size = list(size[0:2]) + [1]
+        elif len(size) == 3:
+            self.size = list(size[0:3])
+        else:
+            raise Exception('len(size) of Field may only be 1, 2 or 3!')
+        self.state = None
+        self.active = None
+        self.packed = None
+        self.sparse = None
+        self.hashlife = None
+        self.blocked = None
+        self.batch = None
+        self.cells = None
+        self.cycles = None
+        self.census = None
+
+
+def setFieldState(f, state):
+    """
+        Pushes a new state array into the field: only the cells whose state
+        differs from the current one are revived/killed.
+    """
+    if f.cycles is not None:
+        f.cycles.change(f.state, state)
+    if f.census is not None:
+        f.census.change(f.state, state)
+    # read once: profiling may be stopped from another thread meanwhile
+    timings = profiler
+    if timings is None:
+        _setFieldState(f, state)
+        return
+    changed = state.size if f.state is None else int(numpy.count_nonzero(state != f.state))
+    t = time.time()
+    _setFieldState(f, state)
+    timings.addSync(time.time() - t, changed)
+
+def _setFieldState(f, state):
+    f.active = None
+    f.packed = None
+    f.sparse = None
+    f.hashlife = None
+    if f.cells is None:
+        f.state = state
+        if f.batch is not None:
+            f.batch.update(state)
+        return
+    if f.state is None:
+        changed = numpy.ones(state.shape, dtype=bool)
+    else:
+        changed = state != f.state
+    for i, j, k in zip(*numpy.nonzero(changed)):
+        if state[i, j, k]:
+            f.cells[i][j][k].revive()
+        else:
+            f.cells[i][j][k].kill()
+    f.state = state
+
+def applyFieldDiff(f, births, deaths):
+    """
+        Revives/kills only the cells born/dead in the last generation.
+    """
+    if f.cycles is not None:
+        f.cycles.flip(births, deaths)
+    if f.census is not None:
+        f.census.flip(births, deaths)
+    timings = profiler
+    if timings is None:
+        _applyFieldDiff(f, births, deaths)
+        return
+    t = time.time()
+    _applyFieldDiff(f, births, deaths)
+    timings.addSync(time.time() - t, len(births[0]) + len(deaths[0]))
+
+def _applyFieldDiff(f, births, deaths):
+    f.state[births] = 1
+    f.state[deaths] = 0
+    if f.cells is None:
+        if f.batch is not None and (len(births[0]) or len(deaths[0])):
+            f.batch.update(f.state)
+        return
+    for i, j, k in zip(*births):
+        f.cells[i][j][k].revive()
+    for i, j, k in zip(*deaths):
+        f.cells[i][j][k].kill()
+
+def stepActiveField(f, cells, rule):
+    if f.active is None:
+        f.active = engine.ActiveSet(cells, rule.compile(cells.ndim), rule.offsets(cells.ndim))
+    return f.active.step()
+
+def stepPackedField(f, rule, generations=1):
+    """
+        Steps the packed words kept on a 2D field (see bitpacked.py; packed
+        from the state the first time) and unpacks them once into the state.
+    """
+    import bitpacked
+    ny = f.size[1]
+    words = f.packed if f.packed is not None else bitpacked.pack(f.state[:, :, 0])
+    for g in range(generations):
+        words = bitpacked.step(words, ny, rule)
+    setFieldState(f, bitpacked.unpack(words, ny).reshape(f.state.shape))
+    f.packed = words
+
+def isUnbounded(size):
+    if is3D(size):
+        return backend3D == 'sparse'
+    return backend2D in ('sparse', 'hashlife')
+
+def stepSparseField(f, rule, dimensions, generations=1):
+    """
+        Steps the unbounded universe behind the field (started from the
+        field state at the origin) and shows its window: the cells that
+        leave the field keep living outside of it.
+    """
+    if f.sparse is None:
+        import sparse
+        f.sparse = sparse.Universe(rule, dimensions)
+        f.sparse.setState(f.state)
+    f.sparse.step(generations)
+    window = f.sparse.getState((0,)*dimensions, f.size[:dimensions]).reshape(f.state.shape)
+    applyFieldDiff(f, numpy.nonzero(window & ~f.state), numpy.nonzero(f.state & ~window))
+
+def stepHashLifeField(f, rule, generations=1):
+    """
+        Jumps the HashLife plane behind the field (started from the field
+        state at the origin, and kept on the field) and shows its window,
+        like stepSparseField.
+    """
+    if not rule.isSimple():
+        raise Exception('HashLife only runs radius 1 Moore rules, not %s!' % rule)
+    universe = f.hashlife
+    if universe is None or universe.torus or universe.rules is not rule:
+        import hashlife
+        universe = hashlife.HashLife(rule)
+        universe.setState(f.state[:, :, 0])
+    universe.advance(generations)
+    if f.state is not None:
+        setFieldState(f, universe.getState((0, 0) + tuple(f.size[:2])).reshape(f.state.shape))
+    f.hashlife = universe
+
+def stepParallelField(f, rule, generations=1):
+    """
+        Steps the field with the worker pool of parallelStepper, started
+        again when the field shape or the rule changes.
+    """
+    global parallelStepper
+    table = rule.compile(3)
+    if (parallelStepper is None or parallelStepper.shape != f.state.shape
+            or parallelStepper.table is not table):
+        import parallel
+        if parallelStepper is not None:
+            parallelStepper.close()
+        parallelStepper = parallel.ParallelStepper(f.state, table, processes, tiles)
+    parallelStepper.setState(f.state)
+    parallelStepper.step(generations)
+    setFieldState(f, parallelStepper.getState())
+
+def stepBlockedField(f, rule, dimensions, generations=1):
+    stepper = _blockedStepper(f, rule, dimensions)
+    state = f.state.copy()
+    if dimensions == 2:
+        state[:, :, 0] = stepper.step(f.state[:, :, 0], generations)
+    else:
+        state = stepper.step(state, generations)
+    setFieldState(f, state)
+
+def _blockedStepper(f, rule, dimensions):
+    # kept on the field: it only depends on the rule, not on the state
+    stepper = f.blocked
+    if stepper is None or stepper.rule is not rule:
+        import blocked
+        stepper = f.blocked = blocked.BlockedStepper(rule, dimensions)
+    return stepper
+
+def stride(f):
+    """
+        Generations advanceField can step at once for the price of one pass
+        over the field: the depth of the 'blocked' backend, otherwise 1.
+    """
+    dimensions = 3 if is3D(f.size) else 2
+    if (backend3D if dimensions == 3 else backend2D) != 'blocked' or f.state is None:
+        return 1
+    return _blockedStepper(f, rules.parse(rules3D if dimensions == 3 else rules2D), dimensions).depth
+
+def boundingBox(f):
+    """
+        (low, high) corners of the alive cells (high excluded), of the whole
+        universe with the 'sparse' backend; None if there are none.
+    """
+    if f.sparse is not None:
+        return f.sparse.boundingBox()
+    alive = numpy.nonzero(f.state)
+    if not len(alive[0]):
+        return None
+    return tuple(int(a.min()) for a in alive), tuple(int(a.max())+1 for a in alive)
+
+def randomState(size, minRand, seed=None):
+    """
+        Returns a random state array and the seed it was drawn with (by
+        default a new one, from numpy.random).
+    """
+    if seed is None:
+        seed = int(numpy.random.randint(2**31))
+    state = numpy.random.RandomState(seed).random_sample(size) > minRand
+    return state.view(numpy.uint8), seed
+
+def setRandomField(f, seed=None):
+    global fieldSeed
+    state, fieldSeed = randomState(f.size, minRand, seed)
+    setFieldState(f, state)
+
+def randomStates(count, size, minRand, seeds=None):
+    """
+        Returns count random state arrays stacked as (count, ...) and their
+        seeds: state k is randomState(size, minRand, seeds[k]) (by default
+        new seeds, from numpy.random).
+    """
+    if seeds is None:
+        seeds = [int(s) for s in numpy.random.randint(2**31, size=count)]
+    states = numpy.empty([count] + list(size), dtype=numpy.uint8)
+    for k, seed in enumerate(seeds):
+        states[k] = randomState(size, minRand, seed)[0]
+    return states, list(seeds)
+
+def setRandomBatch(b, seeds=None):
+    """
+        The batch.Batch counterpart of setRandomField: fills every field
+        of the batch with a random state of the current minRand, from
+        seeds (one per field, by default new ones). Returns the seeds.
+    """
+    states, seeds = randomStates(b.count, b.shape, minRand, seeds)
+    b.setState(states)
+    return seeds
+
+def seekField(f, history, generation):
+    """
+        Sets the field to a generation recorded in a history.History;
+        returns False if that generation is not recorded.
+    """
+    state = history.seek(generation)
+    if state is None:
+        return False
+    setFieldState(f, state)
+    return True
+
+def fitsField(size):
+    """
+        Whether a field of that size fits in maxFieldCells cells.
+    """
+    cells = 1
+    for n in size:
+        cells *= n
+    return cells <= maxFieldCells
+
+def _patternUniverse(config, rule):
+    # a HashLife plane loaded from the quadtree or the coordinates of a pattern
+    if not rule.isSimple():
+        raise Exception('A %s pattern is too large for a field, and HashLife only runs '
+                        'radius 1 Moore rules, not %s!' % ('x'.join(str(n) for n in config.size), rule))
+    import hashlife
+    universe = hashlife.HashLife(rule)
+    if config.node is not None:
+        universe.setNode(config.node[1])
+    else:
+        universe.setCells(*config.coords)
+    return universe
+
+def initField(f):
+    global initialCells, prefetchedState, fieldSeed
+    if not fitsField(f.size):
+        # no state array: the field is the HashLife plane of the pattern, for advanceField
+        if initialPattern is None or f.cells is not None:
+            raise Exception('A %s field is too large to be held in memory!' %
+                            'x'.join(str(n) for n in f.size))
+        fieldSeed = initialSeed
+        f.state = None
+        f.hashlife = _patternUniverse(initialPattern, rules.parse(rules2D))
+        return
+    if prefetchedState is not None and list(prefetchedState[0].shape) == f.size:
+        (state, fieldSeed), prefetchedState = prefetchedState, None
+        setFieldState(f, state)
+    elif initialCells is None:
+        setRandomField(f)
+    else:
+        fieldSeed = initialSeed
+        setFieldState(f, numpy.array(initialCells, dtype=numpy.uint8))
+
+def saveSnapshot(path, f, generation=0):
+    """
+        Saves the state of a field with its rule and, for random fields,
+        the seed they were drawn with (see snapshot.py).
+    """
+    import snapshot
+    rule = rules.parse(rules3D if is3D(f.size) else rules2D)
+    snapshot.save(path, f.state, generation, rule, fieldSeed)
+
+def update2DField(f):
+    rule = rules.parse(rules2D)
+    if backend2D == 'sparse':
+        stepSparseField(f, rule, 2)
+        return
+    if backend2D == 'hashlife':
+        stepHashLifeField(f, rule)
+        return
+    if backend2D == 'blocked':
+        stepBlockedField(f, rule, 2)
+        return
+    if backend2D == 'active':
+        births, deaths = stepActiveField(f, f.state[:, :, 0], rule)
+        applyFieldDiff(f, births + (numpy.zeros_like(births[0]),),
+                          deaths + (numpy.zeros_like(deaths[0]),))
+        return
+    if backend2D == 'bitpacked' and rule.isSimple():
+        stepPackedField(f, rule)
+        return
+    state = f.state.copy()
+    state[:, :, 0] = rule.step(f.state[:, :, 0])
+    setFieldState(f, state)
+
+def update3DField(f):
+    rule = rules.parse(rules3D)
+    if backend3D == 'sparse':
+        stepSparseField(f, rule, 3)
+    elif backend3D == 'blocked':
+        stepBlockedField(f, rule, 3)
+    elif backend3D == 'active':
+        births, deaths = stepActiveField(f, f.state, rule)
+        applyFieldDiff(f, births, deaths)
+    elif backend3D == 'parallel' and rule.isSimple():
+        stepParallelField(f, rule)
+    else:
+        setFieldState(f, rule.step(f.state))
+
+def updateField(f):
+    timings = profiler
+    if timings is not None:
+        timings.beginTick()
+    if is3D(f.size):
+        update3DField(f)
+    else:
+        update2DField(f)
+    if f.census is not None:
+        f.census.record(f.state)
+    if timings is not None:
+        timings.endTick()
+
+def iterateField(f, generations, path=None, generation=0, extent=False):
+    """
+        Steps the field generations times, yielding the census record of
+        every generation (see census.py); path appends them to a JSONL file
+        and extent adds the bounding box and the layer counts.
+    """
+    import census
+    f.census = census.Census(path, generation, extent)
+    f.census.reset(f.state)
+    try:
+        for g in range(generations):
+            updateField(f)
+            yield f.census.take()[-1]
+    finally:
+        f.census.close()
+        f.census = None
+
+def advanceField(f, generations):
+    """
+        Advances the field by a number of generations at once: the
+        'sparse', 'hashlife', 'blocked', 'bitpacked' and 'parallel' backends
+        step them in one go (unpacking the state once). Otherwise large
+        sparse 2D fields jump with HashLife on the same torus (the universe
+        is kept on the field for the next jump) and the others are stepped.
+        A pattern too large for a field (see initField) jumps on the plane,
+        from its quadtree.
+    """
+    timings = profiler
+    if timings is not None:
+        timings.beginTick()
+    dimensions = 3 if is3D(f.size) else 2
+    backend = backend3D if dimensions == 3 else backend2D
+    rule = rules.parse(rules3D if dimensions == 3 else rules2D)
+    if f.state is None or (backend == 'hashlife' and dimensions == 2):
+        stepHashLifeField(f, rule, generations)
+    elif backend == 'sparse':
+        stepSparseField(f, rule, dimensions, generations)
+    elif backend == 'blocked':
+        stepBlockedField(f, rule, dimensions, generations)
+    elif backend == 'bitpacked' and dimensions == 2 and rule.isSimple():
+        stepPackedField(f, rule, generations)
+    elif backend == 'parallel' and dimensions == 3 and rule.isSimple():
+        stepParallelField(f, rule, generations)
+    elif dimensions == 3:
+        for g in range(generations):
+            update3DField(f)
+    elif (not rule.isSimple() or generations > max(f.size[:2]) or
+          int(numpy.count_nonzero(f.state))*hashLifeCellCost > f.state.size*generations):
+        # a torus narrower than the jump is tiled over and over: stepped
+        for g in range(generations):
+            update2DField(f)
+    else:
+        universe = f.hashlife
+        if universe is None or not universe.torus or universe.rules is not rule:
+            import hashlife
+            universe = hashlife.HashLife(rule)
+            universe.setState(f.state[:, :, 0], torus=True)
+        universe.advance(generations)
+        state = f.state.copy()
+        state[:, :, 0] = universe.getState()
+        setFieldState(f, state)
+        f.hashlife = universe
+    if f.census is not None:
+        f.census.record(f.state, generations)
+    if timings is not None:
+        timings.endTick(generations)
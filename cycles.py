@@ -0,0 +1,74 @@
+# ================== CYCLE DETECTION ==================
+#
+# Zobrist hashing of field states: every cell has a random 63-bit key and
+# the hash of a state is the XOR of the keys of its alive cells. Flipping a
+# cell flips its key in and out, so the hash follows the field at the cost
+# of the births and deaths of each generation (core keeps it up to date for
+# the fields that have a Cycles attached, see core.setFieldState and
+# core.applyFieldDiff).
+#
+# The hashes of the last `window` generations are kept; a hash seen again
+# means the field entered a cycle: period 1 is a still life, anything else
+# an oscillator (or a spaceship wrapped around the torus).
+
+from collections import deque
+
+import numpy
+
+
+class Cycles(object):
+    """
+        Running hash of a field and table of the recent generations' hashes.
+        record returns (period, onset) the first time a state repeats: the
+        state of generation onset recurs every period generations.
+    """
+    def __init__(self, shape, window=1024, seed=0):
+        random = numpy.random.RandomState(seed)
+        self.keys = random.randint(0, 2**63-1, size=tuple(shape), dtype=numpy.int64)
+        self.window = window
+        self.hash = 0
+        self.recent = deque()
+        self.seen = {}
+        self.found = None
+
+    def reset(self, state):
+        """
+            Rehashes a state from scratch and forgets the recorded generations.
+        """
+        self.hash = int(numpy.bitwise_xor.reduce(self.keys[state != 0], axis=None))
+        self.recent.clear()
+        self.seen.clear()
+        self.found = None
+
+    def flip(self, births, deaths):
+        """
+            Follows a generation given as (births, deaths) index tuples.
+        """
+        self.hash ^= int(numpy.bitwise_xor.reduce(self.keys[births], axis=None))
+        self.hash ^= int(numpy.bitwise_xor.reduce(self.keys[deaths], axis=None))
+
+    def change(self, old, new):
+        """
+            Follows a generation given as the old and the new state arrays.
+        """
+        if old is None or old.shape != new.shape:
+            self.reset(new)
+        else:
+            self.hash ^= int(numpy.bitwise_xor.reduce(self.keys[(old != 0) != (new != 0)], axis=None))
+
+    def record(self, generation):
+        """
+            Records the current hash as the one of generation; returns
+            (period, onset) if it was seen within the window, else None.
+        """
+        onset = self.seen.get(self.hash)
+        if onset is not None:
+            self.found = (generation - onset, onset)
+            return self.found
+        self.seen[self.hash] = generation
+        self.recent.append((generation, self.hash))
+        while len(self.recent) > self.window:
+            g, h = self.recent.popleft()
+            if self.seen.get(h) == g:
+                del self.seen[h]
+        return None
@@ -0,0 +1,153 @@
+# ============== WHOLE-ARRAY STEPPING ENGINE ==============
+#
+# The field state is kept as a numpy uint8 array (1 = alive, 0 = dead)
+# indexed as state[i][j][k], just like Field.cells. Neighbours are counted
+# with rolled sums, so the torus wrap-around of the original per-cell loops
+# is preserved exactly (including the degenerate 1- and 2-cell wide axes).
+
+import itertools
+import numpy
+
+
+def compileRules(rules, dimensions):
+    """
+        Compiles [birth, survival] lists into a (2, 3**dimensions) boolean
+        lookup table indexed by [alive][neighboursCount].
+    """
+    table = numpy.zeros((2, 3**dimensions), dtype=bool)
+    for n in rules[0]:
+        table[0][n] = True
+    for n in rules[1]:
+        table[1][n] = True
+    return table
+
+
+def countNeighbours(cells, axes=None):
+    """
+        Returns the number of alive neighbours of every cell (torus).
+        The 3**d box is summed separably, one axis at a time, over the
+        given axes (by default all of them; the others, e.g. the field axis
+        of a batch, are independent).
+    """
+    box = cells.astype(numpy.uint8)
+    for axis in (range(cells.ndim) if axes is None else axes):
+        box = box + numpy.roll(box, 1, axis) + numpy.roll(box, -1, axis)
+    return box - cells
+
+
+def countBox(cells, radius, centre=False, axes=None):
+    """
+        Neighbour counts over the (2*radius+1)**d box (Larger-than-Life),
+        as separable running sums: cumulative sums along every axis of the
+        wrapped field, so the cost does not depend on the radius.
+    """
+    box = cells.astype(numpy.intp)
+    width = 2*radius + 1
+    for axis in (range(cells.ndim) if axes is None else axes):
+        pad = [(radius, radius) if a == axis else (0, 0) for a in range(cells.ndim)]
+        sums = numpy.cumsum(numpy.pad(box, pad, mode='wrap'), axis)
+        zero = numpy.zeros_like(numpy.take(sums, [0], axis))
+        sums = numpy.concatenate((zero, sums), axis)
+        n = box.shape[axis]
+        box = numpy.take(sums, range(width, width+n), axis) - numpy.take(sums, range(n), axis)
+    if not centre:
+        box -= cells
+    return box
+
+
+def countOffsets(cells, offsets, axes=None):
+    """
+        Neighbour counts over an arbitrary list of offsets (e.g. the
+        von Neumann diamond), one rolled sum per offset.
+    """
+    counts = numpy.zeros(cells.shape, dtype=numpy.intp)
+    axes = tuple(range(cells.ndim) if axes is None else axes)
+    for offset in offsets:
+        counts += numpy.roll(cells, [-o for o in offset], axes)
+    return counts
+
+
+def countPadded(padded, radius=1, offsets=None, centre=False, axes=None):
+    """
+        Neighbour counts of the cells of a padded array whose whole
+        neighbourhood is inside it: radius cells less per side along the
+        padded axes (by default all of them; the others, e.g. the field
+        axis of a stack, are kept). The (2*radius+1)**d box is summed
+        separably, without the cell itself unless centre; with offsets the
+        counts are summed over those instead.
+    """
+    axes = list(range(padded.ndim) if axes is None else axes)
+    r = radius
+    inner = tuple(slice(r, n-r) if a in axes else slice(None) for a, n in enumerate(padded.shape))
+    cells = (2*r+1)**len(axes) if offsets is None else len(offsets)
+    dtype = numpy.uint8 if cells < 256 else numpy.int16
+    if offsets is None:
+        counts = padded.astype(dtype)
+        for axis in axes:
+            size = counts.shape[axis] - 2*r
+            parts = [counts[(slice(None),)*axis + (slice(i, i+size),)] for i in range(2*r+1)]
+            counts = sum(parts[1:], parts[0])
+        if not centre:
+            counts -= padded[inner]
+        return counts
+    shape = padded[inner].shape
+    counts = numpy.zeros(shape, dtype=dtype)
+    for offset in offsets:
+        shifts = dict(zip(axes, offset))
+        counts += padded[tuple(slice(r+shifts[a], r+shifts[a]+n) if a in shifts else slice(None)
+                               for a, n in enumerate(shape))]
+    return counts
+
+
+def step(cells, table):
+    """
+        Advances the state array by one generation and returns the new one.
+    """
+    counts = countNeighbours(cells)
+    index = cells.astype(numpy.intp) * table.shape[1] + counts
+    return numpy.take(table.ravel(), index).view(numpy.uint8)
+
+
+class ActiveSet(object):
+    """
+        Stepping restricted to the cells that changed in the last generation
+        and their neighbours, so the cost of a generation scales with the
+        activity rather than with the field volume.
+    """
+    def __init__(self, cells, table, offsets=None):
+        self.cells = cells.astype(numpy.uint8, order='C')
+        self.table = table.ravel()
+        self.width = table.shape[1]
+        if offsets is None:
+            offsets = [o for o in itertools.product((-1, 0, 1), repeat=cells.ndim) if any(o)]
+        self.offsets = numpy.array(offsets, dtype=numpy.intp).reshape(-1, cells.ndim)
+        # everything is active in the first generation
+        self.changed = numpy.arange(cells.size, dtype=numpy.intp)
+
+    def _shifted(self, coords, offset):
+        shape = self.cells.shape
+        return numpy.ravel_multi_index(
+            [(coords[a] + offset[a]) % shape[a] for a in range(len(shape))], shape)
+
+    def step(self):
+        """
+            Advances the cells by one generation and returns the (births,
+            deaths) diff as tuples of index arrays.
+        """
+        shape = self.cells.shape
+        flat = self.cells.reshape(-1)
+        coords = numpy.unravel_index(self.changed, shape)
+        candidates = numpy.unique(numpy.concatenate(
+            [self.changed] + [self._shifted(coords, -o) for o in self.offsets]))
+        coords = numpy.unravel_index(candidates, shape)
+        counts = numpy.zeros(len(candidates), dtype=numpy.intp)
+        for o in self.offsets:
+            counts += flat[self._shifted(coords, o)]
+        old = flat[candidates]
+        new = self.table[old.astype(numpy.intp) * self.width + counts]
+        births = candidates[new & (old == 0)]
+        deaths = candidates[(old != 0) & ~new]
+        flat[births] = 1
+        flat[deaths] = 0
+        self.changed = numpy.concatenate((births, deaths))
+        return numpy.unravel_index(births, shape), numpy.unravel_index(deaths, shape)
@@ -0,0 +1,104 @@
+# ============== GRID GEOMETRY ==============
+#
+# The Grid and GridFrame line sets, precomputed as numpy arrays of segment
+# end points and emitted as one OT_LINE_LIST section (instead of one
+# OT_LINE_STRIP section - and render operation - per line).
+#
+# Run this module to compare the old and the new builds:
+#     python geometry.py
+
+import sys
+import time
+
+import numpy
+
+
+def boxLines(xs, ys, zs, hx, hy, hz):
+    """
+        Returns the (2*lines, 3) end points of the lines running along z at
+        every (x, y), along x at every (y, z) and along y at every (x, z),
+        spanning [-hx, hx], [-hy, hy] and [-hz, hz].
+    """
+    xs, ys, zs = [numpy.asarray(a, dtype=numpy.float32) for a in (xs, ys, zs)]
+    parts = []
+    for (a, b), (ia, ib, il), h in (((xs, ys), (0, 1, 2), hz),
+                                    ((ys, zs), (1, 2, 0), hx),
+                                    ((xs, zs), (0, 2, 1), hy)):
+        u, v = [m.ravel() for m in numpy.meshgrid(a, b, indexing='ij')]
+        lines = numpy.empty((len(u), 2, 3), dtype=numpy.float32)
+        lines[:, :, ia] = u[:, None]
+        lines[:, :, ib] = v[:, None]
+        lines[:, 0, il] = -h
+        lines[:, 1, il] = h
+        parts.append(lines.reshape(-1, 3))
+    return numpy.concatenate(parts)
+
+
+def gridLines(size, scale=1.0):
+    sx, sy, sz = size[0], size[1], size[2]
+    n20, n21, n22 = sx*scale*0.5, sy*scale*0.5, sz*scale*0.5
+    return boxLines(numpy.arange(sx+1)*scale-n20, numpy.arange(sy+1)*scale-n21,
+                    numpy.arange(sz+1)*scale-n22, n20, n21, n22)
+
+
+def gridFrameLines(size, scale=1.0):
+    sx, sy, sz = size[0], size[1], size[2]
+    n20, n21, n22 = (sx+0.1)*scale*0.5, (sy+0.1)*scale*0.5, (sz+0.1)*scale*0.5
+    l0 = [-(0.5*sx+0.05)*scale, (0.5*sx+0.05)*scale]
+    l1 = [-(0.5*sy+0.05)*scale, (0.5*sy+0.05)*scale]
+    l2 = [-(0.5*sz+0.05)*scale, (0.5*sz+0.05)*scale]
+    return boxLines(l0, l1, l2, n20, n21, n22)
+
+
+def buildLines(mesh, material, points, operationType):
+    """
+        Emits all the segments into one section of a ManualObject.
+    """
+    mesh.begin(material, operationType)
+    position = mesh.position
+    for p in points.tolist():
+        position(p[0], p[1], p[2])
+    mesh.end()
+
+
+class _CountingMesh(object):
+    # stands in for a ManualObject in the benchmark
+    def __init__(self):
+        self.sections = 0
+        self.vertices = 0
+
+    def begin(self, material, operationType):
+        self.sections += 1
+
+    def position(self, x, y, z):
+        self.vertices += 1
+
+    def end(self):
+        pass
+
+
+def _buildStrips(mesh, points):
+    # the previous build: one begin/end section per line
+    for a, b in zip(points[0::2].tolist(), points[1::2].tolist()):
+        mesh.begin('pale', 0)
+        mesh.position(a[0], a[1], a[2])
+        mesh.position(b[0], b[1], b[2])
+        mesh.end()
+
+
+def benchmark(sizes=([14,14,1], [60,60,1], [16,16,16], [30,30,20])):
+    for size in sizes:
+        t = time.time()
+        strips = _CountingMesh()
+        _buildStrips(strips, gridLines(size, 10))
+        stripsTime = time.time() - t
+        t = time.time()
+        single = _CountingMesh()
+        buildLines(single, 'pale', gridLines(size, 10), 1)
+        singleTime = time.time() - t
+        sys.stdout.write('%-12s strips: %6d sections %8.2f ms   line list: %d section %8.2f ms\n'
+                         % (size, strips.sections, stripsTime*1000, single.sections, singleTime*1000))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,380 @@
+# ================== HASHLIFE ENGINE ==================
+#
+# Quadtree HashLife for 2D [birth, survival] rules. Every quadtree node is
+# canonicalised through a hash table, so identical regions (in space and in
+# time) are stored and evolved only once, and the result of advancing a
+# level-L node by 2**j generations is memoized. This lets periodic and highly
+# regular patterns jump millions of generations at once.
+#
+# Two universes are supported:
+#   - the unbounded plane (the default);
+#   - the torus of the other engines: the torus is tiled over the plane, and
+#     since a periodic tiling only has nx*ny distinct blocks per level, the
+#     whole run stays within a bounded number of nodes.
+#
+# Cells are addressed as (x, y) = (i, j), like state[i][j] in engine.py.
+
+import numpy
+
+
+class Node(object):
+    """
+        A canonical quadtree node: four children of level-1 (or a cell
+        when level is 0). Never build nodes directly - use HashLife.join.
+    """
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.level = level
+        self.population = population
+
+
+class HashLife(object):
+    """
+        HashLife universe. Load cells with setState, jump with advance and
+        read them back with getState.
+        nw/ne/sw/se stand for (low x, low y)/(high x, low y)/(low x, high y)/
+        (high x, high y).
+    """
+    def __init__(self, rules=[[3],[2,3]], maxNodes=1000000):
+        if 0 in rules[0]:
+            raise Exception('HashLife does not support rules with birth on 0 neighbours!')
+        self.rules = rules
+        self.birth = [n in rules[0] for n in range(9)]
+        self.survival = [n in rules[1] for n in range(9)]
+        self.maxNodes = maxNodes
+        self.nodes = {}
+        self.results = {}
+        self.dead = Node(None, None, None, None, 0, 0)
+        self.alive = Node(None, None, None, None, 0, 1)
+        self.empties = [self.dead]
+        self.generation = 0
+        self.size = (0, 0)
+        self.torus = False
+        self.cells = None
+        self.sums = None
+        self.root = self.empty(3)
+        self.origin = (0, 0)
+
+    # ------------------------------------------------------------
+    # node cache:
+
+    def _node(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level+1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+    def join(self, nw, ne, sw, se):
+        """
+            Returns the canonical node with the four given children.
+        """
+        return self._node(nw, ne, sw, se)
+
+    def empty(self, level):
+        while len(self.empties) <= level:
+            e = self.empties[-1]
+            self.empties.append(self._node(e, e, e, e))
+        return self.empties[level]
+
+    def collect(self):
+        """
+            Evicts every node (and memoized result) that is not reachable
+            from the current root.
+        """
+        alive = set()
+        stack = [self.root] + self.empties
+        while stack:
+            node = stack.pop()
+            if node.level == 0 or node in alive:
+                continue
+            alive.add(node)
+            stack.extend((node.nw, node.ne, node.sw, node.se))
+        self.nodes = dict((key, node) for key, node in self.nodes.items() if node in alive)
+        self.results = dict((key, node) for key, node in self.results.items()
+                            if key[0] in alive and node in alive)
+
+    # ------------------------------------------------------------
+    # evolution:
+
+    def _centre(self, node):
+        return self._node(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def _base(self, node):
+        # one generation of the 4x4 cells of a level-2 node -> inner 2x2
+        cells = [[0]*4 for y in range(4)]
+        for qx, qy, q in ((0, 0, node.nw), (2, 0, node.ne), (0, 2, node.sw), (2, 2, node.se)):
+            cells[qy][qx] = q.nw.population
+            cells[qy][qx+1] = q.ne.population
+            cells[qy+1][qx] = q.sw.population
+            cells[qy+1][qx+1] = q.se.population
+        leaves = []
+        for y in (1, 2):
+            for x in (1, 2):
+                n = (cells[y-1][x-1] + cells[y-1][x] + cells[y-1][x+1] +
+                     cells[y][x-1] + cells[y][x+1] +
+                     cells[y+1][x-1] + cells[y+1][x] + cells[y+1][x+1])
+                if cells[y][x]:
+                    leaves.append(self.alive if self.survival[n] else self.dead)
+                else:
+                    leaves.append(self.alive if self.birth[n] else self.dead)
+        return self._node(*leaves)
+
+    def _step(self, node, j):
+        """
+            Returns the centre (level-1) of node advanced by 2**j generations,
+            0 <= j <= level-2.
+        """
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+        level = node.level
+        if node.population == 0:
+            result = self.empty(level-1)
+        elif level == 2:
+            result = self._base(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            sub = [nw, self._node(nw.ne, ne.nw, nw.se, ne.sw), ne,
+                   self._node(nw.sw, nw.se, sw.nw, sw.ne),
+                   self._node(nw.se, ne.sw, sw.ne, se.nw),
+                   self._node(ne.sw, ne.se, se.nw, se.ne),
+                   sw, self._node(sw.ne, se.nw, sw.se, se.sw), se]
+            full = (j == level-2)
+            r = [self._step(n, j-1 if full else j) for n in sub]
+            quads = [self._node(r[0], r[1], r[3], r[4]), self._node(r[1], r[2], r[4], r[5]),
+                     self._node(r[3], r[4], r[6], r[7]), self._node(r[4], r[5], r[7], r[8])]
+            if full:
+                result = self._node(*[self._step(q, j-1) for q in quads])
+            else:
+                result = self._node(*[self._centre(q) for q in quads])
+        self.results[key] = result
+        return result
+
+    def _expand(self):
+        root = self.root
+        e = self.empty(root.level-1)
+        self.root = self._node(self._node(e, e, e, root.nw), self._node(e, e, root.ne, e),
+                               self._node(e, root.sw, e, e), self._node(root.se, e, e, e))
+        half = 1 << (root.level-1)
+        self.origin = (self.origin[0]-half, self.origin[1]-half)
+
+    def _crop(self):
+        while self.root.level > 3 and self._centre(self.root).population == self.root.population:
+            quarter = 1 << (self.root.level-2)
+            self.root = self._centre(self.root)
+            self.origin = (self.origin[0]+quarter, self.origin[1]+quarter)
+
+    def _jump(self, j):
+        if self.torus:
+            nx, ny = self.size
+            level = max(j, _bitLength(max(nx, ny)-1)) + 2
+            half = 1 << (level-1)
+            tiled = self._tile(level, -half % nx, -half % ny, {})
+            result = self._step(tiled, j)
+            cells = numpy.zeros((nx, ny), dtype=numpy.uint8)
+            self.fill(result, cells, -(half >> 1), -(half >> 1))
+            self.cells = cells
+            self.sums = _summedArea(cells)
+            self.root = result
+        else:
+            while self.root.level < j+2:
+                self._expand()
+            self._expand()
+            self._expand()
+            quarter = 1 << (self.root.level-2)
+            self.root = self._step(self.root, j)
+            self.origin = (self.origin[0]+quarter, self.origin[1]+quarter)
+            self._crop()
+
+    def advance(self, generations):
+        """
+            Advances the universe by any number of generations, as a sum of
+            2**j jumps.
+        """
+        j = 0
+        while generations >> j:
+            if (generations >> j) & 1:
+                self._jump(j)
+                if len(self.nodes) > self.maxNodes:
+                    self.collect()
+            j += 1
+        self.generation += generations
+
+    # ------------------------------------------------------------
+    # conversion from/to state arrays:
+
+    def _tile(self, level, x, y, memo):
+        # block of the torus tiling with its (low x, low y) corner at (x, y)
+        key = (level, x, y)
+        node = memo.get(key)
+        if node is None:
+            if not self._alive(x, y, 1 << level):
+                node = self.empty(level)
+            elif level == 0:
+                node = self.alive if self.cells[x, y] else self.dead
+            else:
+                nx, ny = self.size
+                h = 1 << (level-1)
+                xh, yh = (x+h) % nx, (y+h) % ny
+                node = self._node(self._tile(level-1, x, y, memo), self._tile(level-1, xh, y, memo),
+                                  self._tile(level-1, x, yh, memo), self._tile(level-1, xh, yh, memo))
+            memo[key] = node
+        return node
+
+    def _alive(self, x, y, side):
+        # whether the side x side block of the torus cornered at (x, y) has
+        # alive cells: empty blocks are not tiled cell by cell
+        sums = self.sums
+        for x0, x1 in _wrapped(x, side, self.size[0]):
+            for y0, y1 in _wrapped(y, side, self.size[1]):
+                if sums[x1, y1] - sums[x0, y1] - sums[x1, y0] + sums[x0, y0]:
+                    return True
+        return False
+
+    def block(self, cells, level, x=0, y=0):
+        """
+            Returns the node of the level-sized block of a (zero-padded)
+            state array with its corner at (x, y).
+        """
+        side = 1 << level
+        if not cells[x:x+side, y:y+side].any():
+            return self.empty(level)
+        if level == 0:
+            return self.alive
+        h = side >> 1
+        return self._node(self.block(cells, level-1, x, y), self.block(cells, level-1, x+h, y),
+                          self.block(cells, level-1, x, y+h), self.block(cells, level-1, x+h, y+h))
+
+    def fill(self, node, out, x=0, y=0):
+        """
+            Writes the alive cells of node, cornered at (x, y), into the 2D
+            array out (clipped to it).
+        """
+        side = 1 << node.level
+        if (node.population == 0 or x >= out.shape[0] or y >= out.shape[1] or
+                x+side <= 0 or y+side <= 0):
+            return
+        if node.level == 0:
+            out[x, y] = 1
+            return
+        h = side >> 1
+        self.fill(node.nw, out, x, y)
+        self.fill(node.ne, out, x+h, y)
+        self.fill(node.sw, out, x, y+h)
+        self.fill(node.se, out, x+h, y+h)
+
+    def setState(self, cells, torus=False):
+        """
+            Loads a 2D state array. On the plane the array is placed with its
+            corner at (0, 0); with torus=True it wraps around like Field.
+        """
+        cells = numpy.asarray(cells, dtype=numpy.uint8)
+        self.size = cells.shape
+        self.torus = torus
+        self.cells = cells.copy() if torus else None
+        self.sums = _summedArea(cells) if torus else None
+        level = max(3, _bitLength(max(self.size)-1))
+        self.root = self.block(cells, level, 0, 0)
+        self.origin = (0, 0)
+        self.generation = 0
+
+    def setNode(self, node):
+        """
+            Loads a quadtree node (of this or any other universe) on the
+            plane, with its corner at (0, 0), without expanding it.
+        """
+        self.size = (1 << node.level,)*2
+        self.torus = False
+        self.cells = None
+        self.root = self._import(node, {})
+        self.origin = (0, 0)
+        self.generation = 0
+
+    def _import(self, node, memo):
+        if node.population == 0:
+            return self.empty(node.level)
+        if node.level == 0:
+            return self.alive
+        imported = memo.get(node)
+        if imported is None:
+            imported = memo[node] = self._node(*[self._import(n, memo) for n in
+                                                 (node.nw, node.ne, node.sw, node.se)])
+        return imported
+
+    def setCells(self, xs, ys):
+        """
+            Loads the alive cells at the coordinates (xs, ys) on the plane,
+            without ever building the array that holds them.
+        """
+        xs = numpy.asarray(xs, dtype=numpy.int64)
+        ys = numpy.asarray(ys, dtype=numpy.int64)
+        nx = int(xs.max())+1 if len(xs) else 1
+        ny = int(ys.max())+1 if len(ys) else 1
+        self.size = (nx, ny)
+        self.torus = False
+        self.cells = None
+        self.root = self._coords(xs, ys, max(3, _bitLength(max(nx, ny)-1)))
+        self.origin = (0, 0)
+        self.generation = 0
+
+    def _coords(self, xs, ys, level):
+        if not len(xs):
+            return self.empty(level)
+        if level == 3:
+            leaf = numpy.zeros((8, 8), dtype=numpy.uint8)
+            leaf[xs, ys] = 1
+            return self.block(leaf, 3)
+        h = 1 << (level-1)
+        east, south = xs >= h, ys >= h
+        quads = []
+        for e, s in ((False, False), (True, False), (False, True), (True, True)):
+            inside = (east == e) & (south == s)
+            quads.append(self._coords(xs[inside] - h*e, ys[inside] - h*s, level-1))
+        return self._node(*quads)
+
+    def getState(self, window=None):
+        """
+            Returns the cells as a 2D uint8 array: the whole torus, or an
+            (x, y, nx, ny) window of the plane (by default the loaded area).
+        """
+        if self.torus:
+            return self.cells.copy()
+        if window is None:
+            window = (0, 0) + tuple(self.size)
+        x, y, nx, ny = window
+        cells = numpy.zeros((nx, ny), dtype=numpy.uint8)
+        self.fill(self.root, cells, self.origin[0]-x, self.origin[1]-y)
+        return cells
+
+    def getPopulation(self):
+        if self.torus:
+            return int(self.cells.sum())
+        return self.root.population
+
+
+def _bitLength(n):
+    level = 0
+    while (1 << level) <= n:
+        level += 1
+    return level
+
+
+def _summedArea(cells):
+    sums = numpy.zeros((cells.shape[0]+1, cells.shape[1]+1), dtype=numpy.int64)
+    sums[1:, 1:] = cells.cumsum(axis=0, dtype=numpy.int64).cumsum(axis=1)
+    return sums
+
+
+def _wrapped(x, side, n):
+    # the ranges of [x, x+side) on an axis of n cells that wraps around
+    if side >= n:
+        return [(0, n)]
+    if x + side <= n:
+        return [(x, x+side)]
+    return [(x, n), (0, x+side-n)]
@@ -0,0 +1,124 @@
+# ================== GENERATION HISTORY ==================
+#
+# A bounded record of the past generations of a field, for rewinding and
+# seeking. Every keyframeInterval generations a full state is stored as
+# packed bits; the generations in between are stored as the flat indices of
+# their births and deaths (uint16/uint32, whichever fits the field). A seek
+# unpacks the nearest keyframe at or before the generation and applies at
+# most keyframeInterval-1 deltas, whatever the generation number.
+#
+# When the stored bytes exceed maxBytes, the oldest segments (a keyframe and
+# its deltas) are dropped. Recording a generation that is not the next one
+# (after a rewind) drops the recorded future first.
+
+from collections import deque
+
+import numpy
+
+
+class Segment(object):
+    """
+        A keyframe and the (births, deaths) deltas of the generations after it.
+    """
+    def __init__(self, generation, state):
+        self.generation = generation
+        self.keyframe = numpy.packbits(state.reshape(-1) != 0)
+        self.deltas = []
+        self.nbytes = self.keyframe.nbytes
+
+    def last(self):
+        return self.generation + len(self.deltas)
+
+
+class History(object):
+    """
+        Keyframes plus deltas of the recorded generations, at most maxBytes.
+    """
+    def __init__(self, keyframeInterval=32, maxBytes=64*2**20):
+        self.keyframeInterval = keyframeInterval
+        self.maxBytes = maxBytes
+        self.segments = deque()
+        self.nbytes = 0
+        self.shape = None
+        self.previous = None
+
+    def clear(self):
+        self.segments.clear()
+        self.nbytes = 0
+        self.previous = None
+
+    def first(self):
+        return self.segments[0].generation if self.segments else None
+
+    def last(self):
+        return self.segments[-1].last() if self.segments else None
+
+    def record(self, generation, state):
+        """
+            Records the state of a generation.
+        """
+        if self.shape is not None and tuple(state.shape) != self.shape:
+            self.clear()
+        self.shape = tuple(state.shape)
+        last = self.last()
+        if last is not None and generation <= last:
+            self.truncate(generation-1)
+            last = self.last()
+        segment = self.segments[-1] if self.segments else None
+        if (segment is None or generation != last+1 or
+                generation - segment.generation >= self.keyframeInterval):
+            segment = Segment(generation, state)
+            self.segments.append(segment)
+            self.nbytes += segment.nbytes
+        else:
+            old, new = self.previous.reshape(-1) != 0, state.reshape(-1) != 0
+            dtype = _indexType(state.size)
+            births = numpy.flatnonzero(new & ~old).astype(dtype)
+            deaths = numpy.flatnonzero(old & ~new).astype(dtype)
+            segment.deltas.append((births, deaths))
+            segment.nbytes += births.nbytes + deaths.nbytes
+            self.nbytes += births.nbytes + deaths.nbytes
+        self.previous = numpy.array(state, dtype=numpy.uint8)
+        while self.nbytes > self.maxBytes and len(self.segments) > 1:
+            self.nbytes -= self.segments.popleft().nbytes
+
+    def seek(self, generation):
+        """
+            Returns the state array of a recorded generation, or None if it
+            is not (or no longer) recorded.
+        """
+        for segment in reversed(self.segments):
+            if segment.generation <= generation <= segment.last():
+                break
+        else:
+            return None
+        size = int(numpy.prod(self.shape))
+        flat = numpy.unpackbits(segment.keyframe)[:size]
+        for births, deaths in segment.deltas[:generation - segment.generation]:
+            flat[births] = 1
+            flat[deaths] = 0
+        return flat.reshape(self.shape)
+
+    def truncate(self, generation):
+        """
+            Forgets every generation after the given one.
+        """
+        while self.segments and self.segments[-1].generation > generation:
+            self.nbytes -= self.segments.pop().nbytes
+        if not self.segments:
+            self.previous = None
+            return
+        segment = self.segments[-1]
+        for births, deaths in segment.deltas[generation - segment.generation:]:
+            segment.nbytes -= births.nbytes + deaths.nbytes
+            self.nbytes -= births.nbytes + deaths.nbytes
+        del segment.deltas[generation - segment.generation:]
+        self.previous = self.seek(segment.last())
+
+
+def _indexType(size):
+    if size <= 2**16:
+        return numpy.uint16
+    if size <= 2**32:
+        return numpy.uint32
+    return numpy.intp
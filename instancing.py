@@ -0,0 +1,178 @@
+# ============== BATCHED CELL RENDERING ==============
+#
+# Instead of one cube Entity + SceneNode per cell, all the alive cells are
+# drawn by a single entity of a manual mesh: the vertices (position and
+# normal, interleaved) and the indices of one cube per alive cell are built
+# with numpy straight from the state array and copied into the mesh's
+# hardware vertex/index buffers with one memmove each, only when the state
+# changes. The buffers grow (doubling) as the population does.
+#
+# Everything Ogre is reached through the ogre module given to InstancedCells
+# (by default ogre.renderer.OGRE) and the scene manager's createEntity/
+# destroyEntity/getRootSceneNode, so a mock can stand in for both in a test.
+# When a locked buffer gives no address to copy into, NoBufferAccess is
+# raised and the field falls back to one scene node per cell.
+
+import ctypes
+
+import numpy
+
+# cube.mesh is 100 units wide and cells scale it by 0.008
+CELL_SIDE = 0.8
+
+# per face: normal and the 4 corners (counter-clockwise seen from outside)
+FACES = [
+    (( 1, 0, 0), [( 1,-1,-1), ( 1, 1,-1), ( 1, 1, 1), ( 1,-1, 1)]),
+    ((-1, 0, 0), [(-1,-1,-1), (-1,-1, 1), (-1, 1, 1), (-1, 1,-1)]),
+    (( 0, 1, 0), [(-1, 1,-1), (-1, 1, 1), ( 1, 1, 1), ( 1, 1,-1)]),
+    (( 0,-1, 0), [(-1,-1,-1), ( 1,-1,-1), ( 1,-1, 1), (-1,-1, 1)]),
+    (( 0, 0, 1), [(-1,-1, 1), ( 1,-1, 1), ( 1, 1, 1), (-1, 1, 1)]),
+    (( 0, 0,-1), [(-1,-1,-1), (-1, 1,-1), ( 1, 1,-1), ( 1,-1,-1)]),
+]
+CORNERS = numpy.array([c for normal, corners in FACES for c in corners], dtype=numpy.float32)
+NORMALS = numpy.array([normal for normal, corners in FACES for c in corners], dtype=numpy.float32)
+TRIANGLES = numpy.array([[4*f, 4*f+1, 4*f+2, 4*f, 4*f+2, 4*f+3] for f in range(6)],
+                        dtype=numpy.uint32).ravel()
+
+
+def cubeGeometry(state, scale=1.0):
+    """
+        Returns (positions, normals, indices) of one cube per alive cell of
+        a 3D state array, centred like the cells of Field.
+    """
+    alive = numpy.array(numpy.nonzero(state), dtype=numpy.float32).T
+    centre = (numpy.array(state.shape, dtype=numpy.float32)-1)*0.5
+    centres = (alive-centre)*scale
+    positions = (centres[:, None, :] + CORNERS[None, :, :]*(0.5*CELL_SIDE*scale)).reshape(-1, 3)
+    normals = numpy.tile(NORMALS, (len(alive), 1))
+    offsets = numpy.arange(len(alive), dtype=numpy.uint32)*len(CORNERS)
+    indices = (offsets[:, None] + TRIANGLES[None, :]).ravel()
+    return positions, normals, indices
+
+
+# bytes per vertex: position and normal, 3 floats each
+VERTEX_SIZE = 24
+batchesCount = 0
+
+
+class NoBufferAccess(Exception):
+    pass
+
+
+def geometryArrays(state, scale=1.0):
+    """
+        cubeGeometry as the arrays copied into the buffers: (vertices,
+        indices), vertices interleaving position and normal.
+    """
+    positions, normals, indices = cubeGeometry(state, scale)
+    vertices = numpy.empty((len(positions), 6), dtype=numpy.float32)
+    vertices[:, :3] = positions
+    vertices[:, 3:] = normals
+    return vertices, indices
+
+
+def _address(ogre, pointer):
+    # python-ogre returns the locked memory as an opaque void pointer, which
+    # ogre.castAsInt turns into its address
+    if isinstance(pointer, int) or type(pointer).__name__ == 'long':
+        return pointer
+    if hasattr(ogre, 'castAsInt'):
+        return ogre.castAsInt(pointer)
+    raise NoBufferAccess('A locked hardware buffer gave no address to copy into!')
+
+
+class InstancedCells(object):
+    """
+        All the alive cells of a field as one batch, with the material of
+        cube.mesh unless another one is given.
+    """
+    def __init__(self, sceneManager, scale=1.0, node=None, material=None, ogreModule=None):
+        global batchesCount
+        if sceneManager is None:
+            raise Exception('sceneManager is None!')
+        if ogreModule is None:
+            import ogre.renderer.OGRE as ogreModule
+        self.ogre = ogre = ogreModule
+        self.sceneManager = sceneManager
+        self.scale = scale
+        self.node = node if node is not None else sceneManager.getRootSceneNode()
+        self.name = 'CellsBatch%d' % batchesCount
+        batchesCount += 1
+        meshes = ogre.MeshManager.getSingleton()
+        group = ogre.ResourceGroupManager.DEFAULT_RESOURCE_GROUP_NAME
+        if material is None:
+            material = meshes.load('cube.mesh', group).getSubMesh(0).getMaterialName()
+        self.mesh = meshes.createManual(self.name, group)
+        try:
+            self.vertexData = ogre.VertexData()
+            self.mesh.sharedVertexData = self.vertexData
+            declaration = self.vertexData.vertexDeclaration
+            declaration.addElement(0, 0, ogre.VET_FLOAT3, ogre.VES_POSITION)
+            declaration.addElement(0, 12, ogre.VET_FLOAT3, ogre.VES_NORMAL)
+            self.subMesh = self.mesh.createSubMesh()
+            self.subMesh.useSharedVertices = True
+            self.subMesh.setMaterialName(material)
+            self.capacity = 0
+            self.cellsCount = 0
+            self._reserve(64)
+            # an empty write checks that the buffers can be written into at all
+            self._upload(numpy.zeros((0, 6), dtype=numpy.float32), numpy.zeros(0, dtype=numpy.uint32))
+            self.mesh.load()
+        except Exception:
+            # the field falls back to scene nodes: the mesh is not left behind
+            meshes.remove(self.name)
+            raise
+        self.entity = sceneManager.createEntity(self.name, self.name)
+        self.entity.setVisible(False)
+        self.node.attachObject(self.entity)
+
+    def _reserve(self, cells):
+        # (re)creates the buffers with room for at least cells cubes
+        if cells <= self.capacity:
+            return
+        ogre = self.ogre
+        capacity = max(self.capacity, 64)
+        while capacity < cells:
+            capacity *= 2
+        manager = ogre.HardwareBufferManager.getSingleton()
+        usage = ogre.HardwareBuffer.HBU_DYNAMIC_WRITE_ONLY_DISCARDABLE
+        self.vertexBuffer = manager.createVertexBuffer(VERTEX_SIZE, capacity*len(CORNERS), usage)
+        self.vertexData.vertexBufferBinding.setBinding(0, self.vertexBuffer)
+        self.indexBuffer = manager.createIndexBuffer(ogre.HardwareIndexBuffer.IT_32BIT,
+                                                     capacity*len(TRIANGLES), usage)
+        self.subMesh.indexData.indexBuffer = self.indexBuffer
+        self.capacity = capacity
+
+    def _write(self, buffer, array):
+        pointer = buffer.lock(0, max(array.nbytes, 1), self.ogre.HardwareBuffer.HBL_DISCARD)
+        try:
+            ctypes.memmove(_address(self.ogre, pointer), array.ctypes.data, array.nbytes)
+        finally:
+            buffer.unlock()
+
+    def _upload(self, vertices, indices):
+        self._write(self.vertexBuffer, vertices)
+        self._write(self.indexBuffer, indices)
+        self.vertexData.vertexStart = 0
+        self.vertexData.vertexCount = len(vertices)
+        self.subMesh.indexData.indexStart = 0
+        self.subMesh.indexData.indexCount = len(indices)
+
+    def update(self, state):
+        """
+            Rebuilds the batch from a 3D state array (one copy per buffer).
+        """
+        vertices, indices = geometryArrays(state, self.scale)
+        self.cellsCount = len(vertices)//len(CORNERS)
+        self._reserve(self.cellsCount)
+        self._upload(vertices, indices)
+        ogre = self.ogre
+        half = (numpy.array(state.shape, dtype=numpy.float32)*0.5 + 0.5)*self.scale
+        self.mesh._setBounds(ogre.AxisAlignedBox(-half[0], -half[1], -half[2], half[0], half[1], half[2]))
+        self.mesh._setBoundingSphereRadius(float(numpy.sqrt((half**2).sum())))
+        self.entity.setVisible(self.cellsCount > 0)
+
+    def remove(self):
+        self.node.detachObject(self.entity)
+        self.sceneManager.destroyEntity(self.entity)
+        self.ogre.MeshManager.getSingleton().remove(self.name)
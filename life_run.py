@@ -0,0 +1,191 @@
+#!/usr/bin/python
+
+# ================== LIFE RUNNER ==================
+#
+# Runs a config without the viewer - the renderer is never imported:
+#     python life_run.py CONFIG [--generations N] [--engine ENGINE]
+#                               [--rule RULE] [--seed SEED] [--output FILE]
+#                               [--profile FILE] [--cycles] [--record FILE]
+#                               [--census FILE [--extent]]
+# CONFIG is a path or the name (or the start of the name) of a configs/
+# entry. Prints the stats of the run as a JSON line; --output writes the
+# final state (.npy, .snap, or .rle/.cells for 2D fields), --profile appends
+# the per-tick timings to a JSONL file (see profiling.py) and --cycles
+# stops the run as soon as the field repeats itself, reporting the period
+# and the onset generation of the cycle (see cycles.py). --record streams
+# every generation to a recording file for replayPath in main.py (see
+# recording.py). With --engine sparse the field is the window of an
+# unbounded universe (see sparse.py): the stats add the population and the
+# bounding box of the whole universe, and --cycles is ignored. --engine
+# blocked advances several generations per pass over cache-sized tiles (see
+# blocked.py), --engine bitpacked keeps the field packed between them and
+# --engine parallel keeps its worker pool stepping (see parallel.py),
+# unless every generation is needed for --cycles, --record or --census.
+# --census appends the population, births and deaths of every generation to
+# a JSONL file as the run goes (see census.py); --extent adds the bounding
+# box (and the population of every z layer) to them. --engine hashlife runs
+# 2D fields the same way on a HashLife plane (see hashlife.py), jumping over
+# the generations in one go.
+# Patterns too large for a field (core.maxFieldCells) only run with
+# --engine hashlife, from their quadtree: they cannot be written with
+# --output.
+
+import time
+startTime = time.time()
+
+import argparse
+import json
+import os
+import sys
+
+import numpy
+import core
+import cycles
+import patterns
+import recording
+import rules
+from census import Census
+
+engines = ['array', 'active', 'bitpacked', 'parallel', 'hashlife', 'sparse', 'blocked']
+
+
+def findConfig(name):
+    if os.path.isfile(name):
+        return name
+    for match in (lambda f: os.path.basename(f) == name,
+                  lambda f: os.path.basename(f).startswith(name),
+                  lambda f: name in os.path.basename(f)):
+        found = [f for f in core.files if match(f)]
+        if found:
+            return found[0]
+    raise Exception('No config matches %r!' % name)
+
+
+def run(config, generations=100, engine='array', rule=None, seed=None, profile=None,
+        stopOnCycle=False, record=None, census=None, extent=False):
+    """
+        Loads and steps a config headless; returns (field, stats).
+    """
+    path = findConfig(config)
+    core.loadConfig(path)
+    size = core.getFieldSize()
+    if rule is not None:
+        if core.is3D(size):
+            core.rules3D = rule
+        else:
+            core.rules2D = rule
+    if seed is not None:
+        numpy.random.seed(seed)
+    f = core.HeadlessField(size)
+    core.initField(f)
+    if f.state is None and (engine != 'hashlife' or stopOnCycle or record is not None
+                            or census is not None):
+        raise Exception('%s is too large for a field: it only runs with --engine hashlife, '
+                        'without --cycles, --record or --census!' % path)
+    core.backend2D = core.backend3D = engine
+    if profile is not None:
+        core.startProfiling(profile)
+    detector = None
+    if stopOnCycle and engine not in ('hashlife', 'sparse'):
+        f.cycles = detector = cycles.Cycles(f.size, window=max(generations, 1))
+        detector.reset(f.state)
+        detector.record(0)
+    recorder = None
+    if record is not None:
+        if engine == 'hashlife':
+            raise Exception('hashlife jumps over the generations, they cannot be recorded!')
+        recorder = recording.Recorder(record, f.size,
+                                      rules.parse(core.rules3D if core.is3D(f.size) else core.rules2D))
+        recorder.record(f.state)
+    if census is not None:
+        f.census = Census(census, core.initialGeneration, extent)
+        f.census.reset(f.state)
+    t = time.time()
+    if engine == 'hashlife' or (engine in ('blocked', 'bitpacked', 'parallel') and recorder is None
+                                and detector is None and census is None):
+        core.advanceField(f, generations)
+    else:
+        for g in range(generations):
+            core.updateField(f)
+            if recorder is not None:
+                recorder.record(f.state)
+            if f.census is not None:
+                f.census.take()
+            if detector is not None and detector.record(g+1):
+                generations = g+1
+                break
+    elapsed = time.time() - t
+    if recorder is not None:
+        recorder.close()
+    if f.census is not None:
+        f.census.close()
+        f.census = None
+    if core.parallelStepper is not None:
+        core.parallelStepper.close()
+        core.parallelStepper = None
+    stats = {
+        'config': path,
+        'size': f.size,
+        'rule': str(rules.parse(core.rules3D if core.is3D(f.size) else core.rules2D)),
+        'engine': engine,
+        'generations': generations,
+        'generation': core.initialGeneration + generations,
+        'population': int(f.state.sum()) if f.state is not None else f.hashlife.getPopulation(),
+        'seconds': round(elapsed, 6),
+        'generationsPerSecond': round(generations/elapsed, 2) if elapsed > 0 else None,
+        'startupSeconds': round(t - startTime, 6),
+    }
+    if f.sparse is not None:
+        # the population above is the one of the fieldSize window
+        stats['universePopulation'] = f.sparse.getPopulation()
+        stats['boundingBox'] = core.boundingBox(f)
+    elif f.hashlife is not None and not f.hashlife.torus and f.state is not None:
+        stats['universePopulation'] = f.hashlife.getPopulation()
+    if detector is not None:
+        stats['period'], stats['onset'] = detector.found or (None, None)
+    profiler = core.getProfiler()
+    if profiler is not None:
+        stats['profile'] = profiler.summary()
+        core.stopProfiling()
+    return f, stats
+
+
+def writeState(path, f, rule=None, generation=0):
+    if f.state is None:
+        raise Exception('The field is too large to be written!')
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.snap':
+        core.saveSnapshot(path, f, generation)
+    elif extension == '.rle' and not core.is3D(f.size):
+        patterns.writeRLE(path, f.state[:, :, 0], rule)
+    elif extension == '.cells' and not core.is3D(f.size):
+        patterns.writeCells(path, f.state[:, :, 0])
+    else:
+        numpy.save(path, f.state)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs a game of life config headless.')
+    parser.add_argument('config', help='config path or name in configs/')
+    parser.add_argument('--generations', '-n', type=int, default=100)
+    parser.add_argument('--engine', '-e', choices=engines, default='array')
+    parser.add_argument('--rule', '-r', help="rule override, e.g. 'B3/S23' (see rules.py)")
+    parser.add_argument('--seed', '-s', type=int, help='seed of the random fields')
+    parser.add_argument('--output', '-o', help='file to write the final state to')
+    parser.add_argument('--profile', '-p', help='JSONL file to append the per-tick timings to')
+    parser.add_argument('--cycles', '-c', action='store_true',
+                        help='stop as soon as the field enters a cycle (still life or oscillator)')
+    parser.add_argument('--record', help='recording file to stream every generation to')
+    parser.add_argument('--census', help='JSONL file to append the statistics of every generation to')
+    parser.add_argument('--extent', action='store_true',
+                        help='add the bounding box and the layer counts to the --census records')
+    options = parser.parse_args(args)
+    f, stats = run(options.config, options.generations, options.engine, options.rule, options.seed,
+                   options.profile, options.cycles, options.record, options.census, options.extent)
+    if options.output:
+        writeState(options.output, f, stats['rule'], stats['generation'])
+    sys.stdout.write(json.dumps(stats, sort_keys=True) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,242 +1,51 @@
 #!/usr/bin/python
 
 # ================== THE GAME Of LIFE ==================
+#
+# The Ogre viewer. The simulation parameters (field size, rules, stepping
+# backends) are set in core.py.
 
-# --------------- setting main parameters --------------
-#fieldSize = [20,20,10]
-#fieldSize = [60,60,1]
-#fieldSize = [30,30,20]
-#fieldSize = [16,16,16]
-fieldSize = [14,14,1]
-fieldScale = 10
+# -------------- setting viewer parameters -------------
 tickTime = 0.2
-minRand = 0.8
-# rules:
-rules2D = [[3],[2,3]]
-#rules3D = [[6],[5,6,7]]
-rules3D = [[6],[3,4,5,6]]
-#rules3D = [6,8,10]
-#rules3D = [6,9,11]
+# draw all the alive cells as one batch instead of one scene node per cell
+instancedCells = False
+# keep cells and grids of previous configs for reuse (faster config switching)
+sceneCaching = True
+# decode the neighbouring configs in the background (and precompute their fields)
+prefetching = True
+# record the step/scene sync timings of every tick and show them in the
+# debug overlay (F toggles it), optionally appending them to a JSONL file
+profiling = False
+profileDump = None
+# seconds between two overlay updates
+statisticsTime = 0.5
+# step the field in a worker thread (see simulation.py), which publishes its
+# generations into this many buffers; the viewer shows the newest one
+threadedSimulation = True
+simulationBuffers = 2
+# longest stretch of stepping (in seconds) before the newest generation is
+# shown; generations owed beyond it are dropped and reported (at most once
+# every behindMessageTime seconds)
+frameBudget = 0.02
+behindMessageTime = 1.0
+# keep the past generations (a full keyframe every keyframeInterval of them,
+# births/deaths in between) within historyBytes, for rewinding; 0 = off
+historyBytes = 64*2**20
+keyframeInterval = 32
+# replay a recording (see life_run.py --record) instead of stepping the
+# first field; switching configs ends the replay
+replayPath = None
+# F5 saves the field (with its generation, rule and seed) into the configs
+# directory under this name (see snapshot.py)
+snapshotName = 'snapshot_%d.snap'
 # ------------------------------------------------------
 
-def getFieldSize():
-    global fieldSize
-    return fieldSize
-
-def setFieldSize(size):
-    global fieldSize
-    fieldSize = size
-
-def getFieldScale():
-    global fieldScale
-    return fieldScale
-
-def setFieldScale(scale):
-    global fieldScale
-    fieldScale = scale
-
-def getMinRand():
-    global minRand
-    return minRand
-
-def setMinRand(rand):
-    global minRand
-    minRand = rand
-
-
-from os import listdir
-from os.path import isfile, join
-
-dir = 'configs'
-files = [join(dir,f) for f in listdir(dir) if isfile(join(dir,f))]
-currentFileIndex = None
-
-import Image
-initialCells = None
-
-def loadNextConfig():
-    global files, currentFileIndex
-    if currentFileIndex is None:
-        currentFileIndex = 0
-    else:
-        currentFileIndex += 1
-        if currentFileIndex == len(files):
-            currentFileIndex = 0
-    fname = files[currentFileIndex]
-    if fname[-3:] == 'bmp':
-        global initialCells
-        img = Image.open(fname)
-        pix = img.load()
-        nx = img.size[0]
-        ny = img.size[1]
-        initialCells = [[[pix[i,j][0]>0] for j in range(ny)] for i in range(nx)]
-        setFieldSize([nx,ny,1])
-    else:
-        initialCells = None
-        f = open(fname, 'r')
-        #execfile(fname)
-        setFieldSize(eval(f.readline()))
-        setFieldScale(eval(f.readline()))
-        setMinRand(eval(f.readline()))
-        f.close()
-
-def loadPrevConfig():
-    global files, currentFileIndex
-    if currentFileIndex is None:
-        currentFileIndex = 0
-    elif currentFileIndex == 0:
-        currentFileIndex = len(files)-1
-    else:
-        currentFileIndex -= 1
-    fname = files[currentFileIndex]
-    if fname[-3:] == 'bmp':
-        global initialCells
-        img = Image.open(fname)
-        pix = img.load()
-        nx = img.size[0]
-        ny = img.size[1]
-        initialCells = [[[pix[i,j][0]>0] for j in range(ny)] for i in range(nx)]
-        setFieldSize([nx,ny,1])
-    else:
-        initialCells = None
-        f = open(fname, 'r')
-        #execfile(fname)
-        setFieldSize(eval(f.readline()))
-        setFieldScale(eval(f.readline()))
-        setMinRand(eval(f.readline()))
-        f.close()
-
-
-from random import random
-
-def setRandomField(f):
-    nx = f.size[0]
-    ny = f.size[1]
-    nz = f.size[2]
-    for i in range(nx):
-        for j in range(ny):
-            for k in range(nz):
-                if random()>minRand:
-                    f.cells[i][j][k].revive()
-                else:
-                    f.cells[i][j][k].kill()
-
-def initField(f):
-    global initialCells
-    if initialCells is None:
-        setRandomField(f)
-    else:
-        nx = f.size[0]
-        ny = f.size[1]
-        nz = f.size[2]
-        for i in range(nx):
-            for j in range(ny):
-                for k in range(nz):
-                    if initialCells[i][j][k]:
-                        f.cells[i][j][k].revive()
-                    else:
-                        f.cells[i][j][k].kill()
-
-def update2DField(f):
-    nx, ny = f.size[0], f.size[1]
-    oldCells = [[ int(f.cells[i][j][0].alive)
-                      for j in range(ny)     ]
-                          for i in range(nx) ]
-    for i in range(nx):
-        for j in range(ny):
-            cell = f.cells[i][j][0]
-            # ---------------------------------------------
-            # counting neighbours:
-            if i == nx-1:
-                ri = 0
-            else:
-                ri = i+1
-            if i == 0:
-                li = nx-1
-            else:
-                li = i-1
-            if j == ny-1:
-                uj = 0
-            else:
-                uj = j+1
-            if j == 0:
-                bj = ny-1
-            else:
-                bj = j-1
-            neighboursCount = (
-                oldCells[ri][j] + oldCells[li][j] + oldCells[i][uj] + oldCells[i][bj] +
-                oldCells[ri][uj]+ oldCells[li][uj]+ oldCells[ri][bj]+ oldCells[li][bj]
-                )
-            # --------------------------------------------
-            # setting rules:
-            if not cell.alive and neighboursCount in rules2D[0]:
-                cell.revive()
-            elif neighboursCount not in rules2D[1]:
-                cell.kill()
-            # --------------------------------------------
-
-def update3DField(f):
-    nx, ny, nz = f.size[0], f.size[1], f.size[2]
-    oldCells = [[[ int(f.cells[i][j][k].alive)
-                       for k in range(nz)         ]
-                           for j in range(ny)     ]
-                               for i in range(nx) ]
-    for i in range(nx):
-        for j in range(ny):
-            for k in range(nz):
-                cell = f.cells[i][j][k]
-                # ---------------------------------------------
-                # counting neighbours:
-                if i == nx-1:
-                    ri = 0
-                else:
-                    ri = i+1
-                if i == 0:
-                    li = nx-1
-                else:
-                    li = i-1
-                if j == ny-1:
-                    uj = 0
-                else:
-                    uj = j+1
-                if j == 0:
-                    bj = ny-1
-                else:
-                    bj = j-1
-                if k == nz-1:
-                    fk = 0
-                else:
-                    fk = k+1
-                if k == 0:
-                    rk = nz-1
-                else:
-                    rk = k-1
-                neighboursCount = (
-                  oldCells[ri][j][k]+ oldCells[li][j][k]+ oldCells[i][uj][k]+ oldCells[i][bj][k]+
-                  oldCells[ri][uj][k]+ oldCells[li][uj][k]+ oldCells[ri][bj][k]+ oldCells[li][bj][k]+
-                  oldCells[ri][uj][fk]+ oldCells[li][uj][fk]+ oldCells[i][uj][fk]+
-                  oldCells[ri][bj][fk]+ oldCells[li][bj][fk]+ oldCells[i][bj][fk]+
-                  oldCells[ri][j][fk]+ oldCells[li][j][fk]+ oldCells[i][j][fk]+
-                  oldCells[ri][uj][rk]+ oldCells[li][uj][rk]+ oldCells[i][uj][rk]+
-                  oldCells[ri][bj][rk]+ oldCells[li][bj][rk]+ oldCells[i][bj][rk]+
-                  oldCells[ri][j][rk]+ oldCells[li][j][rk]+ oldCells[i][j][rk]
-                  )
-                # --------------------------------------------
-                # setting rules:
-                if not cell.alive and neighboursCount in rules3D[0]:
-                    cell.revive()
-                elif neighboursCount not in rules3D[1]:
-                    cell.kill()
-                # --------------------------------------------
-
-def updateField(f):
-    if f.size[0] > 1 and f.size[1] > 1 and f.size[2] > 1:
-        update3DField(f)
-    else:
-        update2DField(f)
-
-
+import os
+from core import *
 from scene_objects import *
+from simulation import Simulation
+from history import History
+from recording import Recording
 from framework import *
 
 
@@ -250,22 +59,66 @@ class FrameListener(OgreFrameListener):
         self.isRightKeyDown = False
         self.isLeftKeyDown = False
         self.isSpaceKeyDown = False
+        self.isFKeyDown = False
+        self.isCommaKeyDown = False
+        self.isHomeKeyDown = False
+        self.isF5KeyDown = False
         self.app = app
         self.field = app.field
-        self.t = 0
+        self.statisticsTime = 0
+        self.behind = 0
+        self.behindTime = behindMessageTime
+        self.period = None
         global tickTime
         self.tickTime = tickTime
         self.camNode = app.sceneManager.getSceneNode('CameraNode')
         OgreFrameListener.__init__(self, app.renderWindow, app.camera)
 
     def _updateSimulation(self, frameEvent):
-        if self.updating:
-            self.t += frameEvent.timeSinceLastFrame
-            if self.t >= self.tickTime:
-                self.t = 0
-                updateField(self.field)
+        profiler = getProfiler()
+        if profiler is not None:
+            profiler.addFrame(frameEvent.timeSinceLastFrame)
+            self.statisticsTime += frameEvent.timeSinceLastFrame
+            if self.statisticsTime >= statisticsTime:
+                self.statisticsTime = 0
+                self._updateStatistics()
+        simulation = self.app.simulation
+        simulation.tickTime = self.tickTime
+        if not threadedSimulation:
+            simulation.update(frameEvent.timeSinceLastFrame)
+        # the scene is synced once per frame, with the newest generation only
+        latest = simulation.takeLatest()
+        if latest is not None:
+            setFieldState(self.field, latest[1])
+        self.behindTime += frameEvent.timeSinceLastFrame
+        if simulation.scheduler.behind != self.behind and self.behindTime >= behindMessageTime:
+            # while it stays behind, the count is updated once per behindMessageTime
+            self.behind = simulation.scheduler.behind
+            self.behindTime = 0
+            if self.behind:
+                self._showMessage('behind schedule: %u generations dropped' % self.behind)
+        if simulation.period != self.period:
+            self.period = simulation.period
+            if self.period == 1:
+                self._showMessage('still life from generation %u' % simulation.onset)
+            elif self.period is not None:
+                self._showMessage('period %u from generation %u' % (self.period, simulation.onset))
         return True
 
+    def _showMessage(self, text):
+        # the statistics are only refreshed while profiling: the message is
+        # written right away, in the overlay F shows and hides
+        OgreApplication.debugText = text
+        self._setGuiCaption('POCore/DebugText', text)
+
+    def _updateStatistics(self):
+        OgreFrameListener._updateStatistics(self)
+        profiler = getProfiler()
+        if profiler is not None:
+            stepCaption, frameCaption = profiler.captions()
+            self._setGuiCaption('POCore/BestFps', stepCaption)
+            self._setGuiCaption('POCore/WorstFps', frameCaption)
+
     def _processUnbufferedKeyInput(self, frameEvent):
         dt = frameEvent.timeSinceLastFrame
         if self.Keyboard.isKeyDown(OIS.KC_LBRACKET):
@@ -291,19 +144,21 @@ class FrameListener(OgreFrameListener):
         if self.Keyboard.isKeyDown(OIS.KC_R):
             if not self.isRKeyDown:
                 self.updating = False
-                initField(self.field)
+                self.app.simulation.command('reset')
                 self.isRKeyDown = True
         else:
             self.isRKeyDown = False
         if self.Keyboard.isKeyDown(OIS.KC_RETURN):
             if not self.isEnterKeyDown:
                 self.updating = not self.updating
+                self.app.simulation.command('run' if self.updating else 'pause')
                 self.isEnterKeyDown = True
         else:
             self.isEnterKeyDown = False
         if self.Keyboard.isKeyDown(OIS.KC_RIGHT):
             if not self.isRightKeyDown:
                 self.updating = False
+                self.app.recording = None
                 loadNextConfig()
                 self.app.createNewField()
                 self.field = self.app.field
@@ -313,6 +168,7 @@ class FrameListener(OgreFrameListener):
         if self.Keyboard.isKeyDown(OIS.KC_LEFT):
             if not self.isLeftKeyDown:
                 self.updating = False
+                self.app.recording = None
                 loadPrevConfig()
                 self.app.createNewField()
                 self.field = self.app.field
@@ -321,12 +177,52 @@ class FrameListener(OgreFrameListener):
             self.isLeftKeyDown = False
         if self.Keyboard.isKeyDown(OIS.KC_SPACE):
             if not self.isSpaceKeyDown:
-                updateField(self.field)
+                self.app.simulation.command('step')
                 self.isSpaceKeyDown = True
         else:
             self.isSpaceKeyDown = False
+        if self.Keyboard.isKeyDown(OIS.KC_COMMA):
+            if not self.isCommaKeyDown:
+                self.updating = False
+                self.app.simulation.command('back')
+                self.isCommaKeyDown = True
+        else:
+            self.isCommaKeyDown = False
+        if self.Keyboard.isKeyDown(OIS.KC_HOME):
+            if not self.isHomeKeyDown:
+                self.updating = False
+                self.app.simulation.command('seek')
+                self.isHomeKeyDown = True
+        else:
+            self.isHomeKeyDown = False
+        if self.Keyboard.isKeyDown(OIS.KC_F5):
+            if not self.isF5KeyDown:
+                self._saveSnapshot()
+                self.isF5KeyDown = True
+        else:
+            self.isF5KeyDown = False
+        if self.Keyboard.isKeyDown(OIS.KC_F):
+            if not self.isFKeyDown:
+                if getProfiler() is None:
+                    startProfiling(profileDump)
+                else:
+                    stopProfiling()
+                self.showDebugOverlay(getProfiler() is not None)
+                self.isFKeyDown = True
+        else:
+            self.isFKeyDown = False
         return not self.Keyboard.isKeyDown(OIS.KC_ESCAPE)
 
+    def _saveSnapshot(self):
+        if not os.path.isdir(dir):
+            os.makedirs(dir)
+        n = 0
+        while os.path.exists(os.path.join(dir, snapshotName % n)):
+            n += 1
+        path = os.path.join(dir, snapshotName % n)
+        self.app.simulation.command('save', path)
+        self._showMessage('snapshot saved: ' + path)
+
     def _moveCamera(self, frameEvent):
         dt = frameEvent.timeSinceLastFrame
         self.camNode.yaw(50*dt*self.rotationX)
@@ -338,16 +234,33 @@ class Application(OgreApplication):
     def __init__(self):
         OgreApplication.__init__(self)
         self.field = None
+        self.simulation = None
+        self.history = History(keyframeInterval, historyBytes) if historyBytes else None
+        self.recording = Recording(replayPath) if replayPath else None
+        self.sceneCache = SceneCache() if sceneCaching else None
         
     def createNewField(self, size=None, scale=None):
+        if self.simulation is not None:
+            self.simulation.stop()
+            self.simulation = None
         if self.field is not None:
             self.field.remove()
+        if size is None and self.recording is not None:
+            size = list(self.recording.shape)
         if size is None:
             size = getFieldSize()
         if scale is None:
             scale = getFieldScale()
-        self.field = Field(self.sceneManager, size, scale)
-        initField(self.field)
+        self.field = Field(self.sceneManager, size, scale,
+                           instanced=instancedCells, cache=self.sceneCache)
+        if self.recording is not None:
+            setFieldState(self.field, self.recording.state(0))
+        else:
+            initField(self.field)
+        self.simulation = Simulation(self.field.state, tickTime, simulationBuffers, frameBudget,
+                                     history=self.history, recording=self.recording)
+        if threadedSimulation:
+            self.simulation.start()
 
     def _createScene(self):
         sm = self.sceneManager
@@ -369,11 +282,15 @@ class Application(OgreApplication):
     def _createFrameListener(self):
         self.frameListener = FrameListener(self)
         self.root.addFrameListener(self.frameListener)
-        self.frameListener.showDebugOverlay(False)
+        self.frameListener.showDebugOverlay(profiling)
 
 
 if __name__ == '__main__':
     try:
+        if prefetching:
+            startPrefetching()
+        if profiling:
+            startProfiling(profileDump)
         app = Application()
         app.go()
     except ogre.OgreException, e:
@@ -0,0 +1,133 @@
+# ============== MULTI-CORE TILED STEPPING ==============
+#
+# The field is split into tiles (slabs along the first axis by default), one
+# per worker process. The state lives in two multiprocessing.shared_memory
+# buffers (current and next generation). Every generation each worker reads
+# its tile plus a one-cell ghost halo from the current buffer - the halo
+# indices wrap around, so the torus is respected - steps it and writes the
+# tile into the next buffer; all workers then meet at a barrier and swap.
+#
+# Run this module to get a scaling benchmark:
+#     python parallel.py [nx ny nz] [generations]
+
+import sys
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy
+import engine
+
+
+def _worker(names, shape, table, bounds, barrier, commands, done):
+    buffers = [shared_memory.SharedMemory(name=name) for name in names]
+    states = [numpy.ndarray(shape, dtype=numpy.uint8, buffer=b.buf) for b in buffers]
+    halo = numpy.ix_(*[numpy.arange(lo-1, hi+1) % n for (lo, hi), n in zip(bounds, shape)])
+    tile = tuple(slice(lo, hi) for lo, hi in bounds)
+    flat = table.ravel()
+    current = 0
+    while True:
+        command = commands.get()
+        if command is None:
+            break
+        current, generations = command
+        for g in range(generations):
+            padded = states[current][halo]
+            counts = engine.countPadded(padded)
+            cells = padded[(slice(1, -1),)*len(shape)]
+            states[1-current][tile] = numpy.take(flat, cells.astype(numpy.intp)*table.shape[1] + counts)
+            barrier.wait()
+            current = 1-current
+        done.put(current)
+    for b in buffers:
+        b.close()
+
+
+def _splits(n, parts):
+    edges = [n*p//parts for p in range(parts+1)]
+    return [(edges[p], edges[p+1]) for p in range(parts) if edges[p] < edges[p+1]]
+
+
+class ParallelStepper(object):
+    """
+        Steps a torus field with a pool of worker processes over
+        shared-memory tiles. tiles gives the number of splits along every
+        axis (default: one slab per process along the first axis).
+    """
+    def __init__(self, cells, table, processes=None, tiles=None):
+        self.shape = cells.shape
+        self.table = table
+        if tiles is None:
+            if processes is None:
+                processes = multiprocessing.cpu_count()
+            tiles = (processes,) + (1,)*(len(self.shape)-1)
+        axes = [_splits(n, parts) for n, parts in zip(self.shape, tiles)]
+        blocks = [[]]
+        for splits in axes:
+            blocks = [block + [s] for block in blocks for s in splits]
+        self.buffers = [shared_memory.SharedMemory(create=True, size=max(1, cells.size))
+                        for b in range(2)]
+        self.states = [numpy.ndarray(self.shape, dtype=numpy.uint8, buffer=b.buf)
+                       for b in self.buffers]
+        self.current = 0
+        self.setState(cells)
+        barrier = multiprocessing.Barrier(len(blocks))
+        self.done = multiprocessing.Queue()
+        self.commands = []
+        self.workers = []
+        names = [b.name for b in self.buffers]
+        for bounds in blocks:
+            commands = multiprocessing.Queue()
+            worker = multiprocessing.Process(target=_worker,
+                args=(names, self.shape, table, bounds, barrier, commands, self.done))
+            worker.daemon = True
+            worker.start()
+            self.commands.append(commands)
+            self.workers.append(worker)
+
+    def setState(self, cells):
+        self.states[self.current][...] = cells
+
+    def getState(self):
+        return self.states[self.current].copy()
+
+    def step(self, generations=1):
+        for commands in self.commands:
+            commands.put((self.current, generations))
+        for worker in self.workers:
+            self.current = self.done.get()
+
+    def close(self):
+        for commands in self.commands:
+            commands.put(None)
+        for worker in self.workers:
+            worker.join()
+        for b in self.buffers:
+            b.close()
+            b.unlink()
+
+
+def benchmark(size, generations, rules=[[6],[3,4,5,6]]):
+    """
+        Prints generations/sec and the speedup over one process, from 1 up
+        to all the cores.
+    """
+    cells = (numpy.random.random_sample(size) > 0.8).view(numpy.uint8)
+    table = engine.compileRules(rules, len(size))
+    base = None
+    for processes in range(1, multiprocessing.cpu_count()+1):
+        stepper = ParallelStepper(cells, table, processes)
+        stepper.step(1)
+        t = time.time()
+        stepper.step(generations)
+        rate = generations/(time.time()-t)
+        stepper.close()
+        if base is None:
+            base = rate
+        sys.stdout.write('%2d processes: %8.1f gen/s  x%.2f\n' % (processes, rate, rate/base))
+
+
+if __name__ == '__main__':
+    size = [int(n) for n in sys.argv[1:4]] or [100, 100, 100]
+    generations = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+    benchmark(size, generations)
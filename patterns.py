@@ -0,0 +1,274 @@
+# ================== PATTERN FORMATS ==================
+#
+# Loads everything that can live in the configs directory:
+#   .bmp/.png/.gif - 2D cells, alive where the red channel is non-zero
+#   .rle           - the standard run-length encoded format
+#   .cells         - plaintext ('O' alive, '.' dead, '!' comments)
+#   .mc            - Macrocell (HashLife quadtrees, see hashlife.py)
+#   .snap          - field snapshots of any dimension (see snapshot.py)
+#   anything else  - the three-line text config: size, scale, minRand,
+#                    optionally followed by a rule (see rules.py)
+#
+# Decoded configs are kept in an LRU cache keyed by (path, mtime), so
+# revisiting a config costs nothing. load is safe to call from several threads.
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy
+
+cacheSize = 32
+cache = OrderedDict()
+cacheLock = threading.Lock()
+
+
+class Config(object):
+    """
+        A decoded config. cells is a (nx, ny, nz) uint8 state array, or None
+        for random fields; scale, minRand and rule are None when the config
+        does not set them. Snapshots also carry the generation and the seed
+        of their random field. The 2D patterns keep their alive cells as a
+        quadtree (node, of .mc files) or as coordinates (coords, (xs, ys) of
+        .rle and .cells files), only expanded into cells when these are asked
+        for: a pattern may be much too large for an array.
+    """
+    def __init__(self, size, cells=None, scale=None, minRand=None, rule=None, node=None,
+                 snapshot=None, coords=None):
+        self.size = size
+        self.scale = scale
+        self.minRand = minRand
+        self.rule = rule
+        self.node = node
+        self.snapshot = snapshot
+        self.coords = coords
+        self.generation = snapshot.generation if snapshot is not None else 0
+        self.seed = snapshot.seed if snapshot is not None else None
+        self._cells = cells
+
+    @property
+    def cells(self):
+        # patterns and snapshots are only expanded when the cells are asked for
+        if self._cells is None and self.node is not None:
+            universe, root = self.node
+            cells = numpy.zeros(self.size[:2], dtype=numpy.uint8)
+            universe.fill(root, cells)
+            self._cells = cells[:, :, None]
+        elif self._cells is None and self.coords is not None:
+            self._cells = _fromCoords(self.coords[0], self.coords[1], self.size[0], self.size[1])
+        elif self._cells is None and self.snapshot is not None:
+            self._cells = self.snapshot.cells()
+        return self._cells
+
+
+def _fromCoords(xs, ys, nx, ny):
+    cells = numpy.zeros((nx, ny, 1), dtype=numpy.uint8)
+    cells[numpy.asarray(xs, dtype=numpy.intp), numpy.asarray(ys, dtype=numpy.intp), 0] = 1
+    return cells
+
+
+def readImage(path):
+    try:
+        from PIL import Image
+    except ImportError:
+        import Image
+    img = Image.open(path)
+    pixels = numpy.asarray(img.convert('RGB'))
+    # transposed to [x][y]: copied into C order, as the stepping code expects
+    cells = numpy.ascontiguousarray((pixels[:, :, 0] > 0).T, dtype=numpy.uint8)
+    return Config([cells.shape[0], cells.shape[1], 1], cells[:, :, None])
+
+
+def readRLE(path):
+    """
+        Streams an RLE file run by run: only the alive runs are kept, as
+        (y, x, length) triples, and turned into the coordinates of the alive
+        cells (Config.coords).
+    """
+    nx = ny = None
+    rule = None
+    runs = []
+    x = y = 0
+    count = ''
+    f = open(path, 'r')
+    for line in f:
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        if nx is None and line[0] == 'x':
+            nx = int(re.search(r'x\s*=\s*(\d+)', line).group(1))
+            ny = int(re.search(r'y\s*=\s*(\d+)', line).group(1))
+            match = re.search(r'rule\s*=\s*(.+)$', line)
+            if match:
+                rule = match.group(1).strip()
+            continue
+        for c in line:
+            if c.isdigit():
+                count += c
+                continue
+            n = int(count) if count else 1
+            count = ''
+            if c == '!':
+                break
+            elif c == '$':
+                y += n
+                x = 0
+            elif c in 'b.':
+                x += n
+            elif c.isalpha():
+                runs.append((y, x, n))
+                x += n
+        else:
+            continue
+        break
+    f.close()
+    runs = numpy.array(runs, dtype=numpy.intp).reshape(-1, 3)
+    ys = numpy.repeat(runs[:, 0], runs[:, 2])
+    starts = numpy.repeat(runs[:, 1] - numpy.cumsum(runs[:, 2]) + runs[:, 2], runs[:, 2])
+    xs = starts + numpy.arange(len(ys))
+    if nx is None:
+        nx = int(xs.max())+1 if len(xs) else 1
+        ny = int(ys.max())+1 if len(ys) else 1
+    return Config([nx, ny, 1], rule=rule, coords=(xs, ys))
+
+
+def readCells(path):
+    xs, ys = [], []
+    nx = ny = 0
+    f = open(path, 'r')
+    for line in f:
+        line = line.rstrip('\r\n')
+        if line[:1] == '!':
+            continue
+        for x, c in enumerate(line):
+            if c in 'O*':
+                xs.append(x)
+                ys.append(ny)
+        nx = max(nx, len(line))
+        ny += 1
+    f.close()
+    return Config([max(nx, 1), max(ny, 1), 1], coords=(numpy.array(xs, dtype=numpy.intp),
+                                                       numpy.array(ys, dtype=numpy.intp)))
+
+
+def readMacrocell(path, universe=None):
+    """
+        Builds the quadtree straight into a HashLife universe, without ever
+        expanding it: Config.node is (universe, root).
+    """
+    import hashlife
+    import rules
+    rule = None
+    for line in open(path, 'r'):
+        if line.startswith('#R'):
+            rule = line[2:].strip()
+            break
+    if universe is None:
+        universe = hashlife.HashLife(rules.parse(rule or [[3],[2,3]]))
+    nodes = [None]
+    f = open(path, 'r')
+    for line in f:
+        line = line.strip()
+        if not line or line[0] in '[#':
+            continue
+        if line[0] in '.*$':
+            leaf = numpy.zeros((8, 8), dtype=numpy.uint8)
+            for y, row in enumerate(line.split('$')[:8]):
+                for x, c in enumerate(row[:8]):
+                    if c == '*':
+                        leaf[x, y] = 1
+            nodes.append(universe.block(leaf, 3))
+        else:
+            level, nw, ne, sw, se = [int(v) for v in line.split()]
+            children = [nodes[i] if i else universe.empty(level-1) for i in (nw, ne, sw, se)]
+            nodes.append(universe.join(*children))
+    f.close()
+    root = nodes[-1] if len(nodes) > 1 else universe.empty(3)
+    side = 1 << root.level
+    return Config([side, side, 1], rule=rule, node=(universe, root))
+
+
+def readSnapshot(path):
+    import snapshot
+    s = snapshot.Snapshot(path)
+    return Config(list(s.shape), rule=s.rule, snapshot=s)
+
+
+def readText(path):
+    f = open(path, 'r')
+    size = eval(f.readline())
+    scale = eval(f.readline())
+    minRand = eval(f.readline())
+    rule = f.readline().strip()
+    f.close()
+    if rule[:1] in ('[', '(', '"', "'"):
+        rule = eval(rule)
+    return Config(size, scale=scale, minRand=minRand, rule=rule or None)
+
+
+def writeRLE(path, cells, rule=None):
+    """
+        Writes a 2D state array as RLE.
+    """
+    nx, ny = cells.shape
+    tokens = []
+    for y in range(ny):
+        row = cells[:, y]
+        edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(([0], row != 0, [0]))))
+        x = 0
+        for start, end in zip(edges[0::2], edges[1::2]):
+            if start > x:
+                tokens.append('%sb' % (start-x if start-x > 1 else ''))
+            tokens.append('%so' % (end-start if end-start > 1 else ''))
+            x = end
+        tokens.append('$')
+    text = ''.join(tokens).rstrip('$') + '!'
+    f = open(path, 'w')
+    f.write('x = %d, y = %d' % (nx, ny) + (', rule = %s' % rule if rule else '') + '\n')
+    for i in range(0, len(text), 70):
+        f.write(text[i:i+70] + '\n')
+    f.close()
+
+
+def writeCells(path, cells):
+    """
+        Writes a 2D state array as plaintext, in full rows so that the field
+        size is read back.
+    """
+    f = open(path, 'w')
+    for y in range(cells.shape[1]):
+        f.write(''.join('O' if c else '.' for c in cells[:, y]) + '\n')
+    f.close()
+
+
+readers = {
+    '.bmp': readImage, '.png': readImage, '.gif': readImage,
+    '.rle': readRLE,
+    '.cells': readCells,
+    '.mc': readMacrocell,
+    '.snap': readSnapshot,
+}
+
+
+def listConfigs(directory):
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                  if os.path.isfile(os.path.join(directory, f)))
+
+
+def load(path):
+    """
+        Returns the Config of a file, decoding it only if it is not cached
+        (or has changed on disk since).
+    """
+    key = (path, os.path.getmtime(path))
+    with cacheLock:
+        config = cache.pop(key, None)
+    if config is None:
+        reader = readers.get(os.path.splitext(path)[1].lower(), readText)
+        config = reader(path)
+    with cacheLock:
+        cache[key] = config
+        while len(cache) > cacheSize:
+            cache.popitem(last=False)
+    return config
@@ -0,0 +1,118 @@
+# ============== BACKGROUND CONFIG PREFETCHING ==============
+#
+# A daemon thread that keeps the configs around the current one (previous
+# and next in the directory listing) decoded in the patterns cache and,
+# optionally, their initial field states computed, so that switching
+# configs only swaps in ready data. The directory is rescanned on every
+# wake-up, so configs added or removed while running are noticed.
+
+import threading
+from collections import OrderedDict
+from os.path import getmtime
+
+import numpy
+import core
+import patterns
+
+
+def initialState(config):
+    """
+        The initial state array of a config and the seed it was drawn with:
+        its cells (and the seed of its snapshot), or a random field drawn
+        with its minRand. None for configs too large for a field.
+    """
+    if not core.fitsField(config.size):
+        return None
+    if config.cells is not None:
+        return numpy.array(config.cells, dtype=numpy.uint8), config.seed
+    return core.randomState(config.size, config.minRand)
+
+
+class Prefetcher(threading.Thread):
+    """
+        Decodes the neighbours of the current config ahead of time. With
+        states=True their initial field states are precomputed as well
+        (at most maxStates of them are kept).
+    """
+    def __init__(self, directory='configs', distance=1, states=False, maxStates=4, interval=1.0):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.directory = directory
+        self.distance = distance
+        self.states = states
+        self.maxStates = maxStates
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.files = patterns.listConfigs(directory)
+        self.current = None
+        self.prepared = OrderedDict()
+
+    def getFiles(self):
+        with self.lock:
+            return list(self.files)
+
+    def setCurrent(self, fname):
+        with self.lock:
+            self.current = fname
+        self.wake.set()
+
+    def takeState(self, fname):
+        """
+            Returns (and forgets) the precomputed (state, seed) of a config,
+            or None if it is not ready.
+        """
+        with self.lock:
+            key = (fname, _mtime(fname))
+            return self.prepared.pop(key, None)
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+    def _neighbours(self):
+        with self.lock:
+            files, current = self.files, self.current
+        if current not in files:
+            return []
+        index = files.index(current)
+        paths = []
+        for d in range(1, self.distance+1):
+            for i in (index+d, index-d):
+                path = files[i % len(files)]
+                if path not in paths and path != current:
+                    paths.append(path)
+        return paths
+
+    def run(self):
+        while not self.stopped:
+            files = patterns.listConfigs(self.directory)
+            with self.lock:
+                self.files = files
+            for path in self._neighbours():
+                if self.stopped:
+                    break
+                key = (path, _mtime(path))
+                with self.lock:
+                    ready = key in self.prepared
+                try:
+                    config = patterns.load(path)
+                    initial = initialState(config) if self.states and not ready else None
+                except Exception:
+                    # a half-written or broken file: try again on the next pass
+                    continue
+                if initial is not None:
+                    with self.lock:
+                        self.prepared[key] = initial
+                        while len(self.prepared) > self.maxStates:
+                            self.prepared.popitem(last=False)
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+
+def _mtime(path):
+    try:
+        return getmtime(path)
+    except OSError:
+        return None
@@ -0,0 +1,132 @@
+# ================== PROFILING ==================
+#
+# Per-tick timings of the simulation:
+#   step    - computing a generation (updateField without the scene updates)
+#   sync    - pushing it into the scene (Cell.revive/kill or the batch update)
+#   changed - cells revived or killed
+#   frame   - frame times of the viewer
+# The last `length` samples of each are kept for rolling statistics and
+# histograms, and every tick (and frame) can be appended to a JSONL file.
+#
+# Ticks are tracked per thread: with the simulation thread (simulation.py)
+# the worker times the generations, while the scene syncs of the render
+# thread fall outside any tick and are recorded on their own.
+#
+# core.profiler is None while profiling is off, so the hooks cost a single
+# comparison per call.
+
+import json
+import threading
+import time
+from collections import deque
+
+import numpy
+
+metrics = ('step', 'sync', 'changed', 'frame')
+
+
+class Profiler(object):
+    """
+        Rolling per-tick statistics; path is the JSONL file to append the
+        samples to (None to keep them in memory only).
+    """
+    def __init__(self, length=256, path=None):
+        self.samples = dict((name, deque(maxlen=length)) for name in metrics)
+        self.ticks = deque(maxlen=length)
+        self.dump = open(path, 'a') if path else None
+        self.tick = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def beginTick(self):
+        self.local.start = time.time()
+        self.local.syncTime = 0.0
+        self.local.changed = 0
+
+    def addSync(self, seconds, changed):
+        local = self.local
+        if getattr(local, 'start', None) is None:
+            with self.lock:
+                self.samples['sync'].append(seconds)
+                self.samples['changed'].append(changed)
+                self._write({'sync': seconds, 'changed': changed, 'time': time.time()})
+            return
+        local.syncTime += seconds
+        local.changed += changed
+
+    def endTick(self, generations=1):
+        end = time.time()
+        local = self.local
+        if getattr(local, 'start', None) is None:
+            return
+        step = end - local.start - local.syncTime
+        with self.lock:
+            self.samples['step'].append(step)
+            self.samples['sync'].append(local.syncTime)
+            self.samples['changed'].append(local.changed)
+            self.ticks.append((end, generations))
+            self.tick += 1
+            self._write({'tick': self.tick, 'time': end, 'generations': generations,
+                         'step': step, 'sync': local.syncTime, 'changed': local.changed})
+        local.start = None
+
+    def addFrame(self, seconds):
+        with self.lock:
+            self.samples['frame'].append(seconds)
+            self._write({'frame': seconds, 'time': time.time()})
+
+    def _write(self, record):
+        if self.dump is not None:
+            self.dump.write(json.dumps(record, sort_keys=True) + '\n')
+
+    def generationsPerSecond(self):
+        with self.lock:
+            ticks = list(self.ticks)
+        if len(ticks) < 2:
+            return 0.0
+        elapsed = ticks[-1][0] - ticks[0][0]
+        generations = sum(g for t, g in ticks) - ticks[0][1]
+        return generations/elapsed if elapsed > 0 else 0.0
+
+    def statistics(self, name):
+        """
+            mean, median, 95th percentile and maximum of the window of a metric.
+        """
+        with self.lock:
+            samples = numpy.array(self.samples[name], dtype=float)
+        if not len(samples):
+            return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        p50, p95 = numpy.percentile(samples, [50, 95])
+        return {'mean': float(samples.mean()), 'p50': float(p50), 'p95': float(p95),
+                'max': float(samples.max())}
+
+    def histogram(self, name, bins=10):
+        """
+            (counts, bin edges) of the window of a metric.
+        """
+        with self.lock:
+            samples = numpy.array(self.samples[name], dtype=float)
+        return numpy.histogram(samples, bins)
+
+    def summary(self):
+        summary = dict((name, self.statistics(name)) for name in metrics)
+        summary['ticks'] = self.tick
+        summary['generationsPerSecond'] = self.generationsPerSecond()
+        return summary
+
+    def captions(self):
+        """
+            Two lines of text for the debug overlay.
+        """
+        step, sync = self.statistics('step'), self.statistics('sync')
+        changed, frame = self.statistics('changed'), self.statistics('frame')
+        return ('Step: %.1f ms (p95 %.1f)  Sync: %.1f ms (p95 %.1f)'
+                % (step['mean']*1000, step['p95']*1000, sync['mean']*1000, sync['p95']*1000),
+                'Gen/s: %.1f  Changed: %u  Frame: %.1f ms (max %.1f)'
+                % (self.generationsPerSecond(), changed['mean'], frame['mean']*1000, frame['max']*1000))
+
+    def close(self):
+        with self.lock:
+            if self.dump is not None:
+                self.dump.close()
+                self.dump = None
@@ -0,0 +1,138 @@
+# ================== RUN RECORDINGS ==================
+#
+# Runs streamed to disk once and replayed any number of times (see
+# life_run.py --record and replayPath in main.py). A recording is:
+#
+#   header  - magic, version, field shape, chunk length, delta flag, length
+#             of the rule, then the rule text
+#   records - one per generation, in order: a tag byte, then either the
+#             packed bits of the state (a keyframe) or, with delta
+#             compression, its births/deaths as flat uint32 indices. The
+#             first generation of every chunk is a keyframe, and so is any
+#             generation whose delta would be larger than its packed bits
+#   index   - the uint64 offset of every record, plus the end of the data
+#   trailer - generation count, index offset, magic
+#
+# The reader memory-maps the file and the index, so reading a generation is
+# one contiguous slice of the map: its own record, or with delta compression
+# the records from its last keyframe (at most chunkLength of them) - the
+# same I/O for any generation. The trailer is written by close(); a recording that was not
+# closed cannot be read.
+
+import mmap
+import struct
+
+import numpy
+
+MAGIC = b'LIFEREC1'
+VERSION = 1
+HEADER = struct.Struct('<8sI3IIiI')
+TRAILER = struct.Struct('<QQ8s')
+KEYFRAME, DELTA = b'K', b'D'
+
+
+class Recorder(object):
+    """
+        Appends the generations of a field to a recording file.
+    """
+    def __init__(self, path, shape, rule=None, delta=True, chunkLength=32):
+        self.shape = tuple(shape)
+        self.size = int(numpy.prod(self.shape))
+        self.delta = delta
+        self.chunkLength = chunkLength
+        self.file = open(path, 'wb')
+        rule = str(rule or '').encode('ascii')
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.shape[0], self.shape[1], self.shape[2],
+                                    chunkLength, int(delta), len(rule)))
+        self.file.write(rule)
+        self.offsets = []
+        self.previous = None
+
+    def record(self, state):
+        """
+            Appends the state array of the next generation.
+        """
+        generation = len(self.offsets)
+        self.offsets.append(self.file.tell())
+        bits = state.reshape(-1) != 0
+        if self.delta and generation % self.chunkLength:
+            births = numpy.flatnonzero(bits & ~self.previous).astype('<u4')
+            deaths = numpy.flatnonzero(self.previous & ~bits).astype('<u4')
+            if 8 + births.nbytes + deaths.nbytes < (self.size+7)//8:
+                self.file.write(DELTA + struct.pack('<II', len(births), len(deaths)))
+                self.file.write(births.tobytes())
+                self.file.write(deaths.tobytes())
+                self.previous = bits
+                return
+        self.file.write(KEYFRAME + numpy.packbits(bits).tobytes())
+        self.previous = bits
+
+    def close(self):
+        if self.file is None:
+            return
+        end = self.file.tell()
+        self.file.write(numpy.array(self.offsets + [end], dtype='<u8').tobytes())
+        self.file.write(TRAILER.pack(len(self.offsets), end, MAGIC))
+        self.file.close()
+        self.file = None
+
+
+class Recording(object):
+    """
+        A recording file, memory-mapped for reading: state(generation)
+        returns the state array of any recorded generation.
+    """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, nx, ny, nz, self.chunkLength, delta, length = HEADER.unpack_from(self.map, 0)
+        rule = self.map[HEADER.size:HEADER.size+length]
+        count, indexOffset, trailer = TRAILER.unpack_from(self.map, len(self.map) - TRAILER.size)
+        if magic != MAGIC or trailer != MAGIC:
+            raise Exception('Not a complete life recording: %s!' % path)
+        self.shape = (nx, ny, nz)
+        self.size = nx*ny*nz
+        self.delta = bool(delta)
+        self.rule = rule.decode('ascii') or None
+        self.count = count
+        self.offsets = numpy.frombuffer(self.map, dtype='<u8', count=count+1, offset=indexOffset)
+
+    def __len__(self):
+        return self.count
+
+    def _tag(self, generation):
+        offset = int(self.offsets[generation])
+        return self.map[offset:offset+1]
+
+    def state(self, generation):
+        if not 0 <= generation < self.count:
+            raise IndexError('generation %d is not recorded' % generation)
+        first = generation
+        while self._tag(first) != KEYFRAME:
+            first -= 1
+        packed = numpy.frombuffer(self.map, dtype=numpy.uint8, count=(self.size+7)//8,
+                                  offset=int(self.offsets[first])+1)
+        flat = numpy.unpackbits(packed)[:self.size]
+        for g in range(first+1, generation+1):
+            offset = int(self.offsets[g]) + 1
+            births, deaths = struct.unpack_from('<II', self.map, offset)
+            indices = numpy.frombuffer(self.map, dtype='<u4', count=births+deaths, offset=offset+8)
+            flat[indices[:births]] = 1
+            flat[indices[births:]] = 0
+        return flat.reshape(self.shape)
+
+    def first(self):
+        return 0
+
+    def seek(self, generation):
+        """
+            Like history.History.seek: None if the generation is not recorded.
+        """
+        if not 0 <= generation < self.count:
+            return None
+        return self.state(generation)
+
+    def close(self):
+        self.offsets = None
+        self.map.close()
+        self.file.close()
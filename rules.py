@@ -0,0 +1,170 @@
+# ================== RULES ==================
+#
+# Accepted notations (see parse):
+#   'B3/S23'               - birth/survival counts, one digit per count
+#   '23/3'                 - the classic S/B form
+#   'B6/S3-6', 'B6,8/S10..12' - comma separated counts and ranges (3D rules)
+#   'B3/S23/R2/NN'         - radius and neighbourhood (NM = Moore, NN = von Neumann)
+#   'R5,C0,M1,S34..58,B34..45,NM' - Larger-than-Life (M1 counts the cell itself)
+#   [[3],[2,3]]            - the [birth, survival] lists used in main.py
+#   [6,8,10]               - the old flat [birth, survivalMin, survivalMax] presets
+
+import itertools
+import re
+
+import numpy
+import engine
+
+
+class Rule(list):
+    """
+        A [birth, survival] rule (so rule[0]/rule[1] work like the plain
+        lists) together with its neighbourhood.
+    """
+    def __init__(self, birth, survival, radius=1, neighbourhood='moore', centre=False):
+        list.__init__(self, [sorted(set(birth)), sorted(set(survival))])
+        self.radius = radius
+        self.neighbourhood = neighbourhood
+        self.centre = centre
+        self.tables = {}
+
+    def isSimple(self):
+        """
+            True for the radius-1 Moore rules that every backend supports.
+        """
+        return self.radius == 1 and self.neighbourhood == 'moore' and not self.centre
+
+    def offsets(self, dimensions):
+        r = self.radius
+        offsets = []
+        for o in itertools.product(range(-r, r+1), repeat=dimensions):
+            if self.neighbourhood == 'vonneumann' and sum(abs(d) for d in o) > r:
+                continue
+            if any(o) or self.centre:
+                offsets.append(o)
+        return offsets
+
+    def compile(self, dimensions):
+        """
+            Returns the (2, maxCount+1) birth/survival lookup table indexed by
+            [alive][neighboursCount].
+        """
+        table = self.tables.get(dimensions)
+        if table is None:
+            size = len(self.offsets(dimensions)) + 1
+            table = numpy.zeros((2, size), dtype=bool)
+            for n in self[0]:
+                if n < size:
+                    table[0][n] = True
+            for n in self[1]:
+                if n < size:
+                    table[1][n] = True
+            self.tables[dimensions] = table
+        return table
+
+    def countNeighbours(self, cells, axes=None):
+        if self.isSimple():
+            return engine.countNeighbours(cells, axes)
+        if self.neighbourhood == 'moore':
+            return engine.countBox(cells, self.radius, self.centre, axes)
+        return engine.countOffsets(cells, self.offsets(cells.ndim if axes is None else len(axes)), axes)
+
+    def countPadded(self, padded, axes=None):
+        """
+            Neighbour counts of the cells of a padded array whose whole
+            neighbourhood is inside it (see engine.countPadded).
+        """
+        dimensions = padded.ndim if axes is None else len(axes)
+        offsets = None if self.neighbourhood == 'moore' else self.offsets(dimensions)
+        return engine.countPadded(padded, self.radius, offsets, self.centre, axes)
+
+    def step(self, cells):
+        """
+            Advances a state array by one generation under this rule.
+        """
+        table = self.compile(cells.ndim)
+        index = cells.astype(numpy.intp) * table.shape[1] + self.countNeighbours(cells)
+        return numpy.take(table.ravel(), index).view(numpy.uint8)
+
+    def __str__(self):
+        text = 'B%s/S%s' % (_formatCounts(self[0]), _formatCounts(self[1]))
+        if self.radius != 1:
+            text += '/R%d' % self.radius
+        if self.neighbourhood != 'moore':
+            text += '/NN'
+        if self.centre:
+            text += '/M1'
+        return text
+
+    def __repr__(self):
+        return 'Rule(%r)' % str(self)
+
+
+def _formatCounts(counts):
+    if all(n < 10 for n in counts):
+        return ''.join(str(n) for n in counts)
+    # runs of 3 counts or more as ranges: 'S34..58' rather than 25 numbers
+    items, i = [], 0
+    while i < len(counts):
+        j = i
+        while j+1 < len(counts) and counts[j+1] == counts[j]+1:
+            j += 1
+        if j-i >= 2:
+            items.append('%d..%d' % (counts[i], counts[j]))
+        else:
+            items.extend(str(n) for n in counts[i:j+1])
+        i = j+1
+    return ','.join(items)
+
+
+def _parseCounts(text):
+    text = text.strip('/, ')
+    if not text:
+        return []
+    if not re.search(r'[,-]|\.\.', text):
+        return [int(c) for c in text]
+    counts = []
+    for item in text.split(','):
+        bounds = re.split(r'-|\.\.', item.strip())
+        counts.extend(range(int(bounds[0]), int(bounds[-1])+1))
+    return counts
+
+
+parsed = {}
+
+def parse(rule):
+    """
+        Returns the Rule for any of the notations listed at the top. Parsed
+        rules are cached, so their compiled tables are built only once.
+    """
+    if isinstance(rule, Rule):
+        return rule
+    key = repr(rule)
+    if key not in parsed:
+        parsed[key] = _parse(rule)
+    return parsed[key]
+
+
+def _parse(rule):
+    if isinstance(rule, (list, tuple)):
+        if len(rule) == 2 and all(isinstance(r, (list, tuple)) for r in rule):
+            return Rule(rule[0], rule[1])
+        if len(rule) == 3 and all(isinstance(r, int) for r in rule):
+            return Rule([rule[0]], range(rule[1], rule[2]+1))
+        raise Exception('Unknown rule: %r!' % (rule,))
+    text = rule.strip().upper()
+    if re.match(r'^[0-9]*/[0-9]*$', text):
+        survival, birth = text.split('/')
+        return Rule(_parseCounts(birth), _parseCounts(survival))
+    fields = {}
+    for neighbourhood, letter, value in re.findall(r'N([MN])|([A-Z])([^A-Z]*)', text):
+        if neighbourhood:
+            fields['N'] = neighbourhood
+        else:
+            fields[letter] = value.strip('/, ')
+    if 'B' not in fields or 'S' not in fields:
+        raise Exception('Unknown rule: %r!' % (rule,))
+    return Rule(_parseCounts(fields['B']), _parseCounts(fields['S']),
+                radius=int(fields.get('R') or 1),
+                neighbourhood='vonneumann' if fields.get('N') == 'N' else 'moore',
+                centre=fields.get('M') == '1')
@@ -1,5 +1,8 @@
+import numpy
 import ogre.renderer.OGRE as ogre
 from ogre.renderer.OGRE import Vector3
+from instancing import InstancedCells, NoBufferAccess
+from geometry import buildLines, gridLines, gridFrameLines
 
 
 class SceneObject:
@@ -55,33 +58,8 @@ class Grid(SceneObject):
         SceneObject.__init__(self, sceneManager, node)
     
     def _createMesh(self):
-        mesh = self.sceneManager.createManualObject('GridMesh')
-        sx, sy, sz = self.size[0], self.size[1], self.size[2]
-        n20, n21, n22 = sx*self.scale*0.5, sy*self.scale*0.5, sz*self.scale*0.5
-        l0 = [k*self.scale-n20 for k in range(sx+1)]
-        l1 = [k*self.scale-n21 for k in range(sy+1)]
-        l2 = [k*self.scale-n22 for k in range(sz+1)]
-        mb = lambda : mesh.begin("pale", ogre.RenderOperation.OT_LINE_STRIP)
-        me = lambda : mesh.end()
-        po = lambda x, y, z: mesh.position(x, y, z)
-        for i in l0:
-            for j in l1:
-                mb()
-                po(i, j, -n22)
-                po(i, j, n22)
-                me()
-        for i in l1:
-            for j in l2:
-                mb()
-                po(-n20, i, j)
-                po(n20, i, j)
-                me()
-        for i in l0:
-            for j in l2:
-                mb()
-                po(i, -n21, j)
-                po(i, n21, j)
-                me()
+        mesh = self.sceneManager.createManualObject('GridMesh%s_%s' % (self.size, self.scale))
+        buildLines(mesh, "pale", gridLines(self.size, self.scale), ogre.RenderOperation.OT_LINE_LIST)
         return mesh
 
 
@@ -102,33 +80,8 @@ class GridFrame(SceneObject):
         SceneObject.__init__(self, sceneManager, node)
     
     def _createMesh(self):
-        mesh = self.sceneManager.createManualObject('GridFrameMesh')
-        sx, sy, sz = self.size[0], self.size[1], self.size[2]
-        n20, n21, n22 = (sx+0.1)*self.scale*0.5, (sy+0.1)*self.scale*0.5, (sz+0.1)*self.scale*0.5
-        l0 = [-(0.5*sx+0.05)*self.scale, (0.5*sx+0.05)*self.scale]
-        l1 = [-(0.5*sy+0.05)*self.scale, (0.5*sy+0.05)*self.scale]
-        l2 = [-(0.5*sz+0.05)*self.scale, (0.5*sz+0.05)*self.scale]
-        mb = lambda : mesh.begin("red", ogre.RenderOperation.OT_LINE_STRIP)
-        me = lambda : mesh.end()
-        po = lambda x, y, z: mesh.position(x, y, z)
-        for i in l0:
-            for j in l1:
-                mb()
-                po(i, j, -n22)
-                po(i, j, n22)
-                me()
-        for i in l1:
-            for j in l2:
-                mb()
-                po(-n20, i, j)
-                po(n20, i, j)
-                me()
-        for i in l0:
-            for j in l2:
-                mb()
-                po(i, -n21, j)
-                po(i, n21, j)
-                me()
+        mesh = self.sceneManager.createManualObject('GridFrameMesh%s_%s' % (self.size, self.scale))
+        buildLines(mesh, "red", gridFrameLines(self.size, self.scale), ogre.RenderOperation.OT_LINE_LIST)
         return mesh
 
 
@@ -154,6 +107,11 @@ class Cell(SceneObject):
         global cellsCount
         cellsCount -= 1
 
+    def place(self, position, scale=1.0):
+        self.position = position
+        self.node.setPosition(self.position)
+        self.node.setScale(scale*0.008, scale*0.008, scale*0.008)
+
     def revive(self):
         self.mesh.setVisible(True)
         self.alive = True
@@ -166,13 +124,85 @@ class Cell(SceneObject):
     #    self.mesh.setMaterialName("pale")
 
 
+class SceneCache:
+    """
+        Keeps the scene objects of removed fields for the next ones: their
+        hidden cells keyed by (size, scale), taken back whole by a field of
+        the same size and scale or else one by one and repositioned, and
+        the Grid/GridFrame meshes keyed by (size, scale).
+    """
+    def __init__(self):
+        self.fields = {}
+        self.cells = []
+        self.grids = {}
+
+    def getCells(self, size, scale=1.0):
+        # the cells of a removed field of this size and scale, in place
+        fields = self.fields.get((tuple(size), scale))
+        return fields.pop() if fields else None
+
+    def putCells(self, cells, size, scale=1.0, state=None):
+        # hides the cells of a removed field: only the alive ones (of state) are killed
+        if state is None:
+            for plane in cells:
+                for row in plane:
+                    for cell in row:
+                        if cell.alive:
+                            cell.kill()
+        else:
+            for i, j, k in zip(*numpy.nonzero(state)):
+                cells[i][j][k].kill()
+        self.fields.setdefault((tuple(size), scale), []).append(cells)
+
+    def getCell(self, sceneManager, node, position, scale=1.0):
+        if not self.cells:
+            for fields in self.fields.values():
+                if fields:
+                    self.cells = [cell for plane in fields.pop() for row in plane for cell in row]
+                    break
+        if self.cells:
+            cell = self.cells.pop()
+            cell.place(position, scale)
+            return cell
+        cellNode = node.createChildSceneNode('CellNode'+str(cellsCount))
+        cell = Cell(sceneManager, position, scale, cellNode)
+        cell.kill()
+        return cell
+
+    def getGrid(self, gridClass, sceneManager, size, scale=1.0, node=None):
+        key = (gridClass.__name__, tuple(size), scale)
+        grid = self.grids.get(key)
+        if grid is None:
+            grid = self.grids[key] = gridClass(sceneManager, size, scale, node)
+        else:
+            grid.mesh.setVisible(True)
+        return grid
+
+    def putGrid(self, grid):
+        grid.mesh.setVisible(False)
+
+    def clear(self):
+        for fields in self.fields.values():
+            for cells in fields:
+                self.cells.extend(cell for plane in cells for row in plane for cell in row)
+        for cell in self.cells:
+            cell.remove()
+        for grid in self.grids.values():
+            grid.remove()
+        self.fields = {}
+        self.cells = []
+        self.grids = {}
+
+
 class Field(SceneObject):
     """
         The main field of the game.
-        Contains a grid filled with cells.
+        Contains a grid filled with cells - one scene object per cell or,
+        when instanced, a single batch drawing all the alive cells.
     """
-    def __init__(self, sceneManager, size, scale=1.0, node=None):
+    def __init__(self, sceneManager, size, scale=1.0, node=None, instanced=False, cache=None):
         SceneObject.__init__(self, sceneManager, node)
+        self.cache = cache
         if len(size) == 1:
             self.size = size[0:1] + [1, 1]
         elif len(size) == 2:
@@ -181,24 +211,66 @@ class Field(SceneObject):
             self.size = size[0:3]
         else:
             raise Exception('len(size) of Grid may only be 1, 2 or 3!')
-        self.gridFrame = GridFrame(sceneManager, self.size, scale, self.node)
-        self.grid = Grid(sceneManager, self.size, scale, self.node)
+        if cache is None:
+            self.gridFrame = GridFrame(sceneManager, self.size, scale, self.node)
+            self.grid = Grid(sceneManager, self.size, scale, self.node)
+        else:
+            self.gridFrame = cache.getGrid(GridFrame, sceneManager, self.size, scale, self.node)
+            self.grid = cache.getGrid(Grid, sceneManager, self.size, scale, self.node)
+        self.state = None
+        self.active = None
+        self.packed = None
+        self.sparse = None
+        self.hashlife = None
+        self.blocked = None
+        self.cycles = None
+        self.census = None
+        self.batch = None
+        if instanced:
+            try:
+                self.batch = InstancedCells(sceneManager, scale, self.node)
+                self.cells = None
+                return
+            except NoBufferAccess:
+                # no way to copy into the hardware buffers: one node per cell
+                self.batch = None
+        self.scale = scale
+        self.cells = cache.getCells(self.size, scale) if cache is not None else None
+        if self.cells is None:
+            self._createCells(sceneManager, size, scale)
+        # all the cells are dead: setFieldState only revives the alive ones
+        self.state = numpy.zeros(self.size, dtype=numpy.uint8)
+
+    def _createCells(self, sceneManager, size, scale):
+        cache = self.cache
         self.cells = [[[None for i in range(size[2])] for i in range(size[1])] for i in range(size[0])]
         global cellsCount
         n20, n21, n22 = (size[0]-1)*0.5, (size[1]-1)*0.5, (size[2]-1)*0.5
         for i in range(size[0]):
             for j in range(size[1]):
                 for k in range(size[2]):
-                    cellNode = self.node.createChildSceneNode('CellNode'+str(cellsCount))
                     p = Vector3((i-n20)*scale, (j-n21)*scale, (k-n22)*scale)
+                    if cache is not None:
+                        self.cells[i][j][k] = cache.getCell(sceneManager, self.node, p, scale)
+                        continue
+                    cellNode = self.node.createChildSceneNode('CellNode'+str(cellsCount))
                     cell = self.cells[i][j][k] = Cell(sceneManager, p, scale, cellNode)
                     cell.kill()
     
     def remove(self):
-        self.gridFrame.remove()
-        self.grid.remove()
-        for i in range(self.size[0]):
-            for j in range(self.size[1]):
-                for k in range(self.size[2]):
-                    self.cells[i][j][k].remove()
+        if self.cache is None:
+            self.gridFrame.remove()
+            self.grid.remove()
+        else:
+            self.cache.putGrid(self.gridFrame)
+            self.cache.putGrid(self.grid)
+        if self.batch is not None:
+            self.batch.remove()
+        elif self.cache is not None:
+            self.cache.putCells(self.cells, self.size, self.scale, self.state)
+        else:
+            for i in range(self.size[0]):
+                for j in range(self.size[1]):
+                    for k in range(self.size[2]):
+                        self.cells[i][j][k].remove()
         SceneObject.remove(self)
@@ -0,0 +1,314 @@
+# ================== SIMULATION THREAD ==================
+#
+# Steps a field apart from the scene, so that a slow generation never
+# blocks rendering and input. Completed generations are published into a
+# small ring of buffers (double-buffered by default); the render side takes
+# the newest one each frame and older ones are dropped. The simulation is
+# driven by commands - the same ones as the viewer keys: run, pause, step,
+# reset - and either runs in its own thread (start) or is advanced by the
+# render loop (update).
+#
+# Generations are paced by a fixed-timestep Scheduler: elapsed time is
+# accumulated exactly and each tickTime owed is one generation, so several
+# generations run between two frames when tickTime is shorter than a frame.
+#
+# Once the field settles into a still life or an oscillator (see cycles.py),
+# the generations of the cycle are computed once more, checked, and then
+# replayed from memory instead of being stepped.
+#
+# When no generation is needed on its own (tickTime 0, no history and no
+# cycle detection), a step advances the field by core.stride generations,
+# so the 'blocked' backend steps several of them per pass.
+#
+# With a history.History, every generation is recorded and the field can
+# be rewound ('back') or moved to any recorded generation ('seek'). With a
+# recording.Recording, the generations are read from it instead of being
+# stepped (and 'back'/'seek' move through it).
+
+import threading
+import time
+from collections import deque
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import core
+import cycles
+
+
+class Scheduler(object):
+    """
+        Fixed-timestep clock. run adds the elapsed time and calls step once
+        per generation owed, for at most budget seconds; when the budget
+        runs out first, the backlog is dropped (keeping the fraction of a
+        tick) and counted in behind, rather than piled onto the next frames.
+        tickTime 0 runs as many generations as the budget allows.
+    """
+    def __init__(self, tickTime=0.0, budget=0.02):
+        self.tickTime = tickTime
+        self.budget = budget
+        self.accumulated = 0.0
+        self.behind = 0
+
+    def reset(self):
+        self.accumulated = 0.0
+
+    def wait(self):
+        """
+            Seconds until the next generation is owed.
+        """
+        return max(self.tickTime - self.accumulated, 0.0)
+
+    def run(self, dt, step):
+        """
+            Returns the number of generations run.
+        """
+        start = time.time()
+        generations = 0
+        if self.tickTime <= 0:
+            self.accumulated = 0.0
+            while True:
+                step()
+                generations += 1
+                if time.time() - start >= self.budget:
+                    return generations
+        self.accumulated += dt
+        while self.accumulated >= self.tickTime:
+            if generations and time.time() - start >= self.budget:
+                owed = int(self.accumulated // self.tickTime)
+                self.behind += owed
+                self.accumulated -= owed*self.tickTime
+                break
+            step()
+            generations += 1
+            self.accumulated -= self.tickTime
+        return generations
+
+
+class Simulation(threading.Thread):
+    """
+        Steps a HeadlessField with the core functions. state is the initial
+        state array; tickTime is the time between two generations while
+        running (0 = as fast as possible) and budget the longest stretch of
+        stepping between two publications. Cycles of up to maxCycle
+        generations are replayed (maxCycle=0 turns the detection off);
+        period and onset are set once one is found. history is an optional
+        history.History recording the generations, recording an optional
+        recording.Recording to replay.
+    """
+    def __init__(self, state, tickTime=0.0, buffers=2, budget=0.02, maxCycle=256, history=None,
+                 recording=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.field = core.HeadlessField(list(state.shape))
+        core.setFieldState(self.field, state.copy())
+        self.scheduler = Scheduler(tickTime, budget)
+        self.commands = queue.Queue()
+        self.lock = threading.Lock()
+        self.ready = deque(maxlen=buffers)
+        self.generation = 0 if recording is not None else core.initialGeneration
+        self.running = False
+        self.stopped = False
+        self.error = None
+        self.last = time.time()
+        self.recording = recording
+        if recording is not None:
+            # nothing is stepped: no cycles to detect, no history to keep
+            maxCycle = 0
+            history = None
+        if core.isUnbounded(self.field.size):
+            # the field is only a window: its cycles are not the universe's
+            maxCycle = 0
+        self.maxCycle = maxCycle
+        self.detector = None
+        self.period = self.onset = None
+        self.cycle = None
+        self.cycleStart = 0
+        if maxCycle:
+            self.detector = cycles.Cycles(self.field.size, window=4*maxCycle)
+            self._watch()
+        self.history = history
+        if history is not None:
+            history.clear()
+            history.record(self.generation, self.field.state)
+
+    @property
+    def tickTime(self):
+        return self.scheduler.tickTime
+
+    @tickTime.setter
+    def tickTime(self, tickTime):
+        self.scheduler.tickTime = tickTime
+
+    # ------------------------------------------------------------
+    # render side:
+
+    def command(self, name, *args):
+        """
+            Queues one of 'run', 'pause', 'step', 'reset', 'back',
+            'seek' (to a generation, by default the oldest recorded one),
+            'save' (a snapshot, to the given path) or 'stop'.
+        """
+        self.commands.put((name,) + args)
+
+    def takeLatest(self):
+        """
+            Returns (generation, state) of the newest completed generation
+            not taken yet, or None.
+        """
+        if self.error is not None:
+            raise self.error
+        with self.lock:
+            if not self.ready:
+                return None
+            latest = self.ready.pop()
+            self.ready.clear()
+        return latest
+
+    def update(self, dt):
+        """
+            Advances the simulation from the render loop instead of the
+            thread: executes the queued commands and runs the generations
+            owed for the dt seconds of the last frame.
+        """
+        while True:
+            try:
+                self._execute(*self.commands.get_nowait())
+            except queue.Empty:
+                break
+        if self.running and self.scheduler.run(dt, self._run):
+            self._publish()
+
+    def stop(self):
+        self.command('stop')
+        if self.is_alive():
+            self.join()
+
+    # ------------------------------------------------------------
+    # worker side:
+
+    def _run(self):
+        # one scheduler step: several generations at once when none is needed
+        if self.tickTime > 0 or self.history is not None or self.field.cycles is not None:
+            self._step()
+        else:
+            self._step(core.stride(self.field))
+
+    def _step(self, generations=1):
+        if self.recording is not None:
+            if self.generation+1 < len(self.recording):
+                self.generation += 1
+                core.setFieldState(self.field, self.recording.state(self.generation))
+            else:
+                self.running = False
+            return
+        if self.cycle is not None:
+            self.generation += generations
+            core.setFieldState(self.field, self.cycle[(self.generation - self.cycleStart) % self.period])
+        elif generations > 1:
+            core.advanceField(self.field, generations)
+            self.generation += generations
+        else:
+            core.updateField(self.field)
+            self.generation += 1
+            if self.field.cycles is not None and self.field.cycles.record(self.generation):
+                self._cacheCycle(*self.field.cycles.found)
+        if self.history is not None:
+            self.history.record(self.generation, self.field.state)
+
+    def _watch(self):
+        # (re)starts the detection from the current state
+        self.period = self.onset = None
+        self.cycle = None
+        if self.detector is not None:
+            self.detector.reset(self.field.state)
+            self.detector.record(self.generation)
+            self.field.cycles = self.detector
+
+    def _cacheCycle(self, period, onset):
+        self.field.cycles = None
+        if period > self.maxCycle:
+            self.period, self.onset = period, onset
+            return
+        scratch = core.HeadlessField(self.field.size)
+        core.setFieldState(scratch, self.field.state.copy())
+        states = []
+        for g in range(period):
+            states.append(scratch.state.copy())
+            core.updateField(scratch)
+        if (scratch.state != states[0]).any():
+            # a hash collision, not a cycle
+            self._watch()
+            return
+        self.period, self.onset = period, onset
+        self.cycle = states
+        self.cycleStart = self.generation
+
+    def _publish(self):
+        with self.lock:
+            self.ready.append((self.generation, self.field.state.copy()))
+
+    def _seek(self, generation=None):
+        source = self.history if self.recording is None else self.recording
+        if source is None:
+            return
+        if generation is None:
+            generation = source.first()
+        if core.seekField(self.field, source, generation):
+            self.generation = generation
+            self._watch()
+            self._publish()
+
+    def _execute(self, name, *args):
+        if name == 'run':
+            self.running = True
+            self.scheduler.reset()
+            self.last = time.time()
+        elif name == 'pause':
+            self.running = False
+        elif name == 'step':
+            self._step()
+            self._publish()
+        elif name == 'reset' and self.recording is not None:
+            self.running = False
+            self._seek(0)
+        elif name == 'reset':
+            self.running = False
+            core.initField(self.field)
+            self.generation = core.initialGeneration
+            self._watch()
+            if self.history is not None:
+                self.history.clear()
+                self.history.record(self.generation, self.field.state)
+            self._publish()
+        elif name == 'back':
+            self.running = False
+            self._seek(self.generation - 1)
+        elif name == 'seek':
+            self.running = False
+            self._seek(*args)
+        elif name == 'save':
+            core.saveSnapshot(args[0], self.field, self.generation)
+        elif name == 'stop':
+            self.stopped = True
+
+    def run(self):
+        try:
+            while not self.stopped:
+                if self.running:
+                    now = time.time()
+                    if self.scheduler.run(now - self.last, self._run):
+                        self._publish()
+                    self.last = now
+                    wait = self.scheduler.wait()
+                    try:
+                        # sleep until the next generation is owed, unless a command comes
+                        command = self.commands.get(wait > 0, wait)
+                    except queue.Empty:
+                        continue
+                else:
+                    command = self.commands.get()
+                self._execute(*command)
+        except Exception as e:
+            self.error = e
@@ -0,0 +1,65 @@
+# ================== FIELD SNAPSHOTS ==================
+#
+# Saves a field state of any dimension at any generation, random fields and
+# mid-run states included:
+#
+#   header - magic, version, field shape, generation, seed of the random
+#            field (-1 if it was not a random one), length of the rule
+#   rule   - the rule text
+#   cells  - the packed bits of the state array (C order)
+#
+# Loading memory-maps the packed bits: nothing is read until the cells are
+# asked for, and then they are unpacked straight into the state array.
+# Snapshots (.snap) are configs too (see patterns.py).
+
+import struct
+
+import numpy
+
+MAGIC = b'LIFESNAP'
+VERSION = 1
+HEADER = struct.Struct('<8sI3IQqI')
+
+
+class Snapshot(object):
+    """
+        A snapshot file: shape, generation, seed and rule from the header,
+        bits as a read-only memory map of the packed cells.
+    """
+    def __init__(self, path):
+        f = open(path, 'rb')
+        header = f.read(HEADER.size)
+        magic, version, nx, ny, nz, self.generation, seed, length = HEADER.unpack(header)
+        if magic != MAGIC:
+            f.close()
+            raise Exception('Not a life snapshot: %s!' % path)
+        rule = f.read(length)
+        offset = f.tell()
+        f.close()
+        self.shape = (nx, ny, nz)
+        self.seed = seed if seed >= 0 else None
+        self.rule = rule.decode('ascii') or None
+        size = nx*ny*nz
+        self.bits = numpy.memmap(path, dtype=numpy.uint8, mode='r', offset=offset,
+                                 shape=((size+7)//8,))
+
+    def cells(self):
+        """
+            Unpacks the state array.
+        """
+        size = self.shape[0]*self.shape[1]*self.shape[2]
+        return numpy.unpackbits(self.bits)[:size].reshape(self.shape)
+
+
+def save(path, state, generation=0, rule=None, seed=None):
+    """
+        Writes a state array (any of 1 to 3 dimensions) as a snapshot.
+    """
+    shape = tuple(state.shape) + (1,)*(3 - state.ndim)
+    rule = str(rule or '').encode('ascii')
+    f = open(path, 'wb')
+    f.write(HEADER.pack(MAGIC, VERSION, shape[0], shape[1], shape[2], generation,
+                        -1 if seed is None else seed, len(rule)))
+    f.write(rule)
+    f.write(numpy.packbits(state.reshape(-1) != 0).tobytes())
+    f.close()
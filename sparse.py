@@ -0,0 +1,174 @@
+# ================== SPARSE UNIVERSE ==================
+#
+# An unbounded 2D or 3D universe (no torus: what leaves the area keeps
+# going) stored as a hash map of fixed-size blocks, 16x16 in 2D and 8x8x8
+# in 3D by default. Only the blocks holding alive cells are kept, so memory
+# follows the population rather than the bounding volume; blocks that die
+# out are dropped after the generation.
+#
+# A generation steps all the alive blocks and their neighbours at once: each
+# one is copied into a stack with a halo of rule.radius cells taken from
+# its neighbours, the neighbour counts are summed over the stack, and only
+# the blocks that end up with alive cells are kept.
+#
+# Cells are addressed by signed coordinates; block (i, j) holds the cells
+# [i*block, (i+1)*block) x [j*block, (j+1)*block).
+
+import itertools
+
+import numpy
+import rules
+
+
+class Universe(object):
+    """
+        Sparse universe of the given dimensions (2 or 3) under a rule (any
+        notation of rules.py, except birth on 0 neighbours).
+    """
+    def __init__(self, rule=[[3],[2,3]], dimensions=2, block=None):
+        self.rule = rules.parse(rule)
+        if 0 in self.rule[0]:
+            raise Exception('The sparse universe does not support rules with birth on 0 neighbours!')
+        self.dimensions = dimensions
+        self.block = block or (16 if dimensions == 2 else 8)
+        self.radius = self.rule.radius
+        if self.radius > self.block:
+            raise Exception('The blocks must be at least as large as the rule radius!')
+        self.table = self.rule.compile(dimensions)
+        self.around = list(itertools.product((-1, 0, 1), repeat=dimensions))
+        self.blocks = {}
+        self.generation = 0
+        # per neighbour offset: the part of a block that lands in the padded
+        # copy of the neighbour, and where
+        b, r = self.block, self.radius
+        parts = {-1: (slice(b-r, b), slice(0, r)), 0: (slice(0, b), slice(r, r+b)),
+                 1: (slice(0, r), slice(r+b, 2*r+b))}
+        self.halos = []
+        for o in self.around:
+            source = tuple(parts[-d][0] for d in o)
+            target = tuple(parts[-d][1] for d in o)
+            self.halos.append((o, source, target))
+
+    # ------------------------------------------------------------
+    # conversion from/to state arrays:
+
+    def setState(self, cells, origin=None):
+        """
+            Replaces the universe with a state array placed with its
+            corner at origin (by default 0).
+        """
+        self.blocks = {}
+        self.generation = 0
+        self.add(cells, origin)
+
+    def add(self, cells, origin=None):
+        """
+            Adds the alive cells of a state array cornered at origin.
+        """
+        cells = numpy.asarray(cells)
+        # a 2D state of the viewer is (nx, ny, 1)
+        cells = cells.reshape(cells.shape[:self.dimensions])
+        origin = origin or (0,)*self.dimensions
+        coords = numpy.transpose(numpy.nonzero(cells)) + numpy.array(origin)
+        self.setCells(coords)
+
+    def setCells(self, coords):
+        """
+            Sets the cells at the (n, dimensions) coordinates alive.
+        """
+        coords = numpy.asarray(coords, dtype=numpy.int64).reshape(-1, self.dimensions)
+        if not len(coords):
+            return
+        keys = coords // self.block
+        inner = coords - keys*self.block
+        for key in set(map(tuple, keys.tolist())):
+            mask = (keys == key).all(axis=1)
+            data = self.blocks.get(key)
+            if data is None:
+                data = self.blocks[key] = numpy.zeros((self.block,)*self.dimensions, dtype=numpy.uint8)
+            data[tuple(inner[mask].T)] = 1
+
+    def getState(self, origin=None, shape=None):
+        """
+            Returns the (shape) window cornered at origin as a state array;
+            by default the bounding box.
+        """
+        if origin is None:
+            box = self.boundingBox()
+            if box is None:
+                return numpy.zeros((0,)*self.dimensions, dtype=numpy.uint8)
+            origin, shape = box[0], tuple(h-l for l, h in zip(*box))
+        cells = numpy.zeros(shape, dtype=numpy.uint8)
+        b = self.block
+        for key, data in self.blocks.items():
+            corner = [k*b - o for k, o in zip(key, origin)]
+            if any(c >= s or c+b <= 0 for c, s in zip(corner, shape)):
+                continue
+            target = tuple(slice(max(c, 0), min(c+b, s)) for c, s in zip(corner, shape))
+            source = tuple(slice(t.start - c, t.stop - c) for t, c in zip(target, corner))
+            cells[target] = data[source]
+        return cells
+
+    def coordinates(self):
+        """
+            The (n, dimensions) coordinates of the alive cells.
+        """
+        parts = [numpy.transpose(numpy.nonzero(data)) + numpy.array(key)*self.block
+                 for key, data in self.blocks.items()]
+        if not parts:
+            return numpy.zeros((0, self.dimensions), dtype=numpy.int64)
+        return numpy.concatenate(parts)
+
+    def boundingBox(self):
+        """
+            (low, high) corners of the alive cells (high excluded), or None
+            if the universe is empty.
+        """
+        if not self.blocks:
+            return None
+        low, high = [None]*self.dimensions, [None]*self.dimensions
+        for key, data in self.blocks.items():
+            for axis in range(self.dimensions):
+                others = tuple(a for a in range(self.dimensions) if a != axis)
+                alive = numpy.flatnonzero(data.any(axis=others))
+                l, h = key[axis]*self.block + alive[0], key[axis]*self.block + alive[-1] + 1
+                low[axis] = l if low[axis] is None else min(low[axis], l)
+                high[axis] = h if high[axis] is None else max(high[axis], h)
+        return tuple(int(l) for l in low), tuple(int(h) for h in high)
+
+    def getPopulation(self):
+        return int(sum(int(data.sum()) for data in self.blocks.values()))
+
+    # ------------------------------------------------------------
+    # evolution:
+
+    def step(self, generations=1):
+        for g in range(generations):
+            self._step()
+
+    def _step(self):
+        b, r, d = self.block, self.radius, self.dimensions
+        candidates = {}
+        for key in self.blocks:
+            for o in self.around:
+                target = tuple(k+i for k, i in zip(key, o))
+                if target not in candidates:
+                    candidates[target] = len(candidates)
+        self.generation += 1
+        if not candidates:
+            return
+        padded = numpy.zeros((len(candidates),) + (b+2*r,)*d, dtype=numpy.uint8)
+        for key, data in self.blocks.items():
+            for o, source, target in self.halos:
+                # the block is at offset -o from the neighbour key+o
+                index = candidates[tuple(k+i for k, i in zip(key, o))]
+                padded[(index,) + target] = data[source]
+        inner = (slice(None),) + (slice(r, r+b),)*d
+        cells = padded[inner]
+        counts = self.rule.countPadded(padded, range(1, d+1))
+        new = self.table.ravel()[cells.astype(numpy.intp)*self.table.shape[1] + counts].view(numpy.uint8)
+        alive = new.reshape(len(new), -1).any(axis=1)
+        self.blocks = {}
+        for key, index in candidates.items():
+            if alive[index]:
+                self.blocks[key] = new[index].copy()
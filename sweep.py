@@ -0,0 +1,215 @@
+#!/usr/bin/python
+
+# ================== PARAMETER SWEEPS ==================
+#
+# Runs random fields headless over a grid of field sizes, rules, minRand
+# densities, seeds and generation counts, spread over a pool of processes:
+#
+#     python sweep.py --sizes 16x16x16 30x30x20 --rules B6/S3456 B4/S2-4/NN
+#                     --minRand 0.6 0.8 --seeds 20 --generations 200
+#                     [--configs 99_5 ...] [--processes N] [--engine ENGINE]
+#                     [--output results.tsv] [--cache DIR]
+#
+# --configs adds the (fieldSize, minRand) points of configs/ text entries to
+# those of --sizes x --minRand; --seeds N runs the seeds 0..N-1. Every job
+# stops early when the field dies out or settles into a still life or an oscillator (see cycles.py),
+# and reports how it ended: 'extinct', 'cycle' (with period and onset) or
+# 'running' after all its generations.
+#
+# Results are cached by content: a job is keyed by the hash of its
+# parameters (the rule in its canonical form) and stored as one JSON file in
+# the cache directory, so re-running an overlapping sweep only runs the new
+# jobs. All the engines give the same results (the torus ones; 'parallel'
+# cannot run inside the pool), so the engine is not part of the key. The
+# results table (tab separated, one job per line) lists the whole
+# grid, cached jobs included.
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import core
+import cycles
+import patterns
+import rules
+
+engines = ['array', 'active', 'bitpacked', 'blocked']
+columns = ['size', 'rule', 'minRand', 'seed', 'generations', 'outcome', 'generation',
+           'population', 'period', 'onset', 'seconds']
+
+
+def job(size, rule, minRand, seed, generations):
+    """
+        A job of the grid as a dict, its rule in canonical form.
+    """
+    return {'size': list(size), 'rule': str(rules.parse(rule)), 'minRand': float(minRand),
+            'seed': int(seed), 'generations': int(generations)}
+
+
+def jobKey(job):
+    text = json.dumps([job[name] for name in columns[:5]])
+    return hashlib.sha1(text.encode('ascii')).hexdigest()
+
+
+def runJob(job, engine='array'):
+    """
+        Steps the random field of a job until it dies out, enters a cycle or
+        runs all its generations; returns the job with its results.
+    """
+    size = job['size']
+    if core.is3D(size):
+        core.rules3D = job['rule']
+    else:
+        core.rules2D = job['rule']
+    core.backend2D = core.backend3D = engine
+    f = core.HeadlessField(size)
+    state, seed = core.randomState(f.size, job['minRand'], job['seed'])
+    core.setFieldState(f, state)
+    f.cycles = detector = cycles.Cycles(f.size, window=max(job['generations'], 1))
+    detector.reset(f.state)
+    detector.record(0)
+    t = time.time()
+    outcome, generation = 'running', job['generations']
+    for g in range(job['generations']):
+        core.updateField(f)
+        if not f.state.any():
+            outcome, generation = 'extinct', g+1
+            break
+        if detector.record(g+1):
+            outcome, generation = 'cycle', g+1
+            break
+    result = dict(job)
+    result.update({
+        'outcome': outcome,
+        'generation': generation,
+        'population': int(f.state.sum()),
+        'period': detector.found[0] if outcome == 'cycle' else None,
+        'onset': detector.found[1] if outcome == 'cycle' else None,
+        'seconds': round(time.time() - t, 6),
+    })
+    return result
+
+
+def _runJob(args):
+    return runJob(*args)
+
+
+class Cache(object):
+    """
+        Results stored by job key: directory/ab/abcdef....json
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, job):
+        path = self._path(jobKey(job))
+        if not os.path.isfile(path):
+            return None
+        f = open(path)
+        result = json.load(f)
+        f.close()
+        return result
+
+    def put(self, result):
+        path = self._path(jobKey(result))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # written aside and renamed, so an interrupted sweep leaves no partial result
+        f = open(path + '.tmp', 'w')
+        json.dump(result, f, sort_keys=True)
+        f.close()
+        os.rename(path + '.tmp', path)
+
+
+def sweep(jobs, processes=None, engine='array', cache=None, progress=None):
+    """
+        Runs the jobs not found in the cache (a Cache or None) over a pool of
+        processes; returns the results of all the jobs, in the jobs' order.
+        progress is called with every result computed.
+    """
+    results = [cache.get(j) if cache is not None else None for j in jobs]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        pool = multiprocessing.Pool(processes)
+        try:
+            computed = pool.imap(_runJob, [(jobs[i], engine) for i in missing])
+            for i, result in zip(missing, computed):
+                results[i] = result
+                if cache is not None:
+                    cache.put(result)
+                if progress is not None:
+                    progress(result)
+        finally:
+            pool.close()
+            pool.join()
+    return results
+
+
+def writeTable(path, results):
+    f = open(path, 'w') if path != '-' else sys.stdout
+    f.write('\t'.join(columns) + '\n')
+    for result in results:
+        values = [result[name] for name in columns]
+        values[0] = 'x'.join(str(n) for n in values[0])
+        f.write('\t'.join('' if v is None else str(v) for v in values) + '\n')
+    if f is not sys.stdout:
+        f.close()
+
+
+def parseSize(text):
+    size = [int(n) for n in text.lower().split('x')]
+    return size + [1]*(3 - len(size))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs random fields over a grid of parameters.')
+    parser.add_argument('--sizes', nargs='*', type=parseSize, default=[],
+                        help='field sizes, e.g. 16x16x16 or 60x60')
+    parser.add_argument('--rules', nargs='*', default=[], help="rules, e.g. 'B6/S3456' (see rules.py)")
+    parser.add_argument('--minRand', nargs='*', type=float, default=[], help='random field densities')
+    parser.add_argument('--configs', nargs='*', default=[],
+                        help='configs/ text entries whose (fieldSize, minRand) join the grid')
+    parser.add_argument('--seeds', type=int, default=10, help='seeds 0..N-1 of every point')
+    parser.add_argument('--generations', nargs='*', type=int, default=[200])
+    parser.add_argument('--engine', '-e', choices=engines, default='array',
+                        help='stepping backend (see core.py)')
+    parser.add_argument('--processes', '-j', type=int, help='worker processes (default: all cores)')
+    parser.add_argument('--output', '-o', default='-', help='results table (default: stdout)')
+    parser.add_argument('--cache', default='.sweep', help="results cache directory ('' for none)")
+    options = parser.parse_args(args)
+    points = []
+    if options.sizes or options.minRand or not options.configs:
+        points += itertools.product(options.sizes or [core.getFieldSize()],
+                                    options.minRand or [core.getMinRand()])
+    for name in options.configs:
+        path = name if os.path.isfile(name) else os.path.join(core.dir, name + '.txt')
+        config = patterns.load(path)
+        points.append((list(config.size), config.minRand if config.minRand is not None else core.getMinRand()))
+    jobs = []
+    for (size, minRand), rule, seed, generations in itertools.product(
+            points, options.rules or [None], range(options.seeds), options.generations):
+        if rule is None:
+            rule = core.rules3D if core.is3D(size) else core.rules2D
+        jobs.append(job(size, rule, minRand, seed, generations))
+    cache = Cache(options.cache) if options.cache else None
+    t = time.time()
+    done = [0]
+    def progress(result):
+        done[0] += 1
+        sys.stderr.write('\r%d computed' % done[0])
+    results = sweep(jobs, options.processes, options.engine, cache, progress)
+    sys.stderr.write('%s%d jobs, %d computed in %.1fs\n' %
+                     ('\n' if done[0] else '', len(jobs), done[0], time.time() - t))
+    writeTable(options.output, results)
+
+
+if __name__ == '__main__':
+    main()
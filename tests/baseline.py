@@ -0,0 +1,71 @@
+# The per-cell torus loops of the original update2DField/update3DField,
+# on state arrays instead of Cell objects: the reference every stepping
+# backend has to match.
+
+import numpy
+
+
+def _wrap(i, n):
+    # (previous, next) index on a torus axis, as the original loops did
+    return (n-1 if i == 0 else i-1), (0 if i == n-1 else i+1)
+
+
+def step2D(state, rule):
+    """
+        One generation of an (nx, ny) or (nx, ny, 1) state array under a
+        [birth, survival] rule.
+    """
+    old = numpy.asarray(state).reshape(state.shape[0], state.shape[1])
+    new = old.copy()
+    nx, ny = old.shape
+    for i in range(nx):
+        li, ri = _wrap(i, nx)
+        for j in range(ny):
+            bj, uj = _wrap(j, ny)
+            count = (old[ri][j] + old[li][j] + old[i][uj] + old[i][bj] +
+                     old[ri][uj] + old[li][uj] + old[ri][bj] + old[li][bj])
+            if not old[i][j] and count in rule[0]:
+                new[i][j] = 1
+            elif count not in rule[1]:
+                new[i][j] = 0
+    return new.reshape(state.shape)
+
+
+def step3D(state, rule):
+    """
+        One generation of an (nx, ny, nz) state array under a [birth,
+        survival] rule.
+    """
+    old = numpy.asarray(state)
+    new = old.copy()
+    nx, ny, nz = old.shape
+    for i in range(nx):
+        li, ri = _wrap(i, nx)
+        for j in range(ny):
+            bj, uj = _wrap(j, ny)
+            for k in range(nz):
+                rk, fk = _wrap(k, nz)
+                count = (old[ri][j][k] + old[li][j][k] + old[i][uj][k] + old[i][bj][k] +
+                         old[ri][uj][k] + old[li][uj][k] + old[ri][bj][k] + old[li][bj][k] +
+                         old[ri][uj][fk] + old[li][uj][fk] + old[i][uj][fk] +
+                         old[ri][bj][fk] + old[li][bj][fk] + old[i][bj][fk] +
+                         old[ri][j][fk] + old[li][j][fk] + old[i][j][fk] +
+                         old[ri][uj][rk] + old[li][uj][rk] + old[i][uj][rk] +
+                         old[ri][bj][rk] + old[li][bj][rk] + old[i][bj][rk] +
+                         old[ri][j][rk] + old[li][j][rk] + old[i][j][rk])
+                if not old[i][j][k] and count in rule[0]:
+                    new[i][j][k] = 1
+                elif count not in rule[1]:
+                    new[i][j][k] = 0
+    return new
+
+
+def run(state, rule, generations):
+    step = step3D if state.ndim == 3 and min(state.shape) > 1 else step2D
+    for g in range(generations):
+        state = step(state, rule)
+    return state
+
+
+def randomState(shape, density=0.3, seed=0):
+    return (numpy.random.RandomState(seed).random_sample(shape) < density).view(numpy.uint8)
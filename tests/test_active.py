@@ -0,0 +1,39 @@
+import numpy
+import pytest
+
+import baseline
+import core
+import engine
+
+LIFE = [[3], [2, 3]]
+LIFE_3D = [[6], [3, 4, 5, 6]]
+
+
+@pytest.mark.parametrize('shape, rule', [((12, 9), LIFE), ((2, 7), LIFE), ((5, 4, 6), LIFE_3D)])
+def test_diffs_match_the_baseline_loop(shape, rule):
+    state = baseline.randomState(shape, 0.35, seed=9)
+    active = engine.ActiveSet(state, engine.compileRules(rule, len(shape)))
+    for g in range(6):
+        new = baseline.run(state, rule, 1)
+        births, deaths = active.step()
+        assert (active.cells == new).all()
+        assert sorted(zip(*births)) == sorted(zip(*numpy.nonzero(new > state)))
+        assert sorted(zip(*deaths)) == sorted(zip(*numpy.nonzero(new < state)))
+        state = new
+
+
+@pytest.mark.parametrize('size', [(10, 11, 1), (5, 6, 4)])
+def test_backend_matches_the_baseline(size, monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'active')
+    monkeypatch.setattr(core, 'backend3D', 'active')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    monkeypatch.setattr(core, 'rules3D', LIFE_3D)
+    rule = LIFE_3D if core.is3D(size) else LIFE
+    state = baseline.randomState(size, 0.35, seed=10)
+    f = core.HeadlessField(size)
+    core.setFieldState(f, state.copy())
+    for g in range(3):
+        core.updateField(f)
+    assert f.active is not None
+    core.advanceField(f, 3)
+    assert (f.state == baseline.run(state, rule, 6)).all()
@@ -0,0 +1,53 @@
+import numpy
+import pytest
+
+import baseline
+import batch
+import core
+
+LIFE = [[3], [2, 3]]
+HIGHLIFE = [[3, 6], [2, 3]]
+LIFE_3D = [[6], [3, 4, 5, 6]]
+
+
+@pytest.mark.parametrize('shape, fieldRules', [
+    ((9, 8), [LIFE, HIGHLIFE, LIFE]),
+    ((5, 4, 6), [LIFE_3D, [[5], [4, 5]]]),
+])
+def test_fields_match_the_baseline_loop(shape, fieldRules):
+    states = [baseline.randomState(shape, 0.35, seed=32+k) for k in range(len(fieldRules))]
+    b = batch.Batch(shape, len(fieldRules), fieldRules=fieldRules)
+    b.setState(numpy.array(states))
+    b.step(4)
+    for k, rule in enumerate(fieldRules):
+        expected = baseline.run(states[k], rule, 4)
+        if b.done[k]:
+            # a stopped field keeps its last state
+            expected = baseline.run(states[k], rule, int(b.generation[k]))
+        assert (b.cells[k] == expected).all()
+        assert b.population[k] == b.cells[k].sum()
+
+
+def test_done_fields_stop():
+    block = numpy.zeros((6, 6), dtype=numpy.uint8)
+    block[2:4, 2:4] = 1
+    b = batch.Batch((6, 6), 3)
+    b.setState(numpy.array([block, numpy.zeros_like(block), baseline.randomState((6, 6), 0.4, seed=40)]))
+    assert list(b.extinct) == [False, True, False]
+    b.step(3)
+    assert b.still[0] and b.generation[0] == 1
+    assert b.generation[1] == 0
+
+
+def test_rules_must_share_their_neighbourhood():
+    with pytest.raises(Exception):
+        batch.Batch((6, 6), 2, fieldRules=['B3/S23', 'B3/S23/NN'])
+
+
+def test_random_batches_are_the_seeded_fields(monkeypatch):
+    monkeypatch.setattr(core, 'minRand', 0.6)
+    b = batch.Batch((7, 7, 1), 3)
+    seeds = core.setRandomBatch(b, [5, 6, 7])
+    assert seeds == [5, 6, 7]
+    for k, seed in enumerate(seeds):
+        assert (b.cells[k] == core.randomState([7, 7, 1], 0.6, seed)[0]).all()
@@ -0,0 +1,40 @@
+import pytest
+
+import baseline
+import bitpacked
+import core
+
+LIFE = [[3], [2, 3]]
+
+
+@pytest.mark.parametrize('ny', [1, 7, 64, 65, 130])
+def test_pack_round_trip(ny):
+    cells = baseline.randomState((5, ny), 0.5)
+    words = bitpacked.pack(cells)
+    assert words.shape == (5, bitpacked.wordsCount(ny))
+    assert (bitpacked.unpack(words, ny) == cells).all()
+
+
+@pytest.mark.parametrize('shape', [(9, 70), (4, 64), (3, 2), (2, 5), (1, 66)])
+def test_step_matches_the_baseline_loop(shape):
+    state = baseline.randomState(shape, 0.4, seed=3)
+    words = bitpacked.pack(state)
+    for g in range(6):
+        words = bitpacked.step(words, shape[1], LIFE)
+        state = baseline.step2D(state, LIFE)
+        assert (bitpacked.unpack(words, shape[1]) == state).all()
+
+
+def test_backend_keeps_the_words_between_generations(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'bitpacked')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    state = baseline.randomState((10, 67, 1), 0.35, seed=4)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    core.updateField(f)
+    assert f.packed is not None
+    core.advanceField(f, 4)
+    assert (f.state == baseline.run(state, LIFE, 5)).all()
+    # a state pushed from outside drops the words
+    core.setFieldState(f, state.copy())
+    assert f.packed is None
@@ -0,0 +1,47 @@
+import pytest
+
+import baseline
+import blocked
+import core
+import simulation
+
+LIFE = [[3], [2, 3]]
+LIFE_3D = [[6], [3, 4, 5, 6]]
+
+
+@pytest.mark.parametrize('shape, rule, side, depth', [
+    ((20, 17), LIFE, 6, 3),
+    ((9, 10, 11), LIFE_3D, 4, 2),
+    ((7, 30), LIFE, 8, 5),
+])
+def test_tiles_match_the_baseline_loop(shape, rule, side, depth):
+    state = baseline.randomState(shape, 0.35, seed=26)
+    # cacheBytes=0: tiled even though the field would fit in the cache
+    stepper = blocked.BlockedStepper(rule, len(shape), side, depth, cacheBytes=0)
+    assert (stepper.step(state, 7) == baseline.run(state, rule, 7)).all()
+
+
+def test_backend_keeps_its_stepper(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'blocked')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    state = baseline.randomState((12, 13, 1), 0.35, seed=27)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    core.updateField(f)
+    stepper = f.blocked
+    core.advanceField(f, 5)
+    assert f.blocked is stepper and core.stride(f) == stepper.depth
+    assert (f.state == baseline.run(state, LIFE, 6)).all()
+
+
+def test_free_running_simulation_steps_several_generations(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'blocked')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    monkeypatch.setattr(core, 'initialGeneration', 0)
+    state = baseline.randomState((12, 13, 1), 0.35, seed=28)
+    sim = simulation.Simulation(state, tickTime=0.0, budget=0.001, maxCycle=0)
+    sim.command('run')
+    sim.update(0.0)
+    generation, published = sim.takeLatest()
+    assert generation % core.stride(sim.field) == 0
+    assert (published == baseline.run(state, LIFE, generation)).all()
@@ -0,0 +1,60 @@
+import json
+
+import numpy
+import pytest
+
+import baseline
+import census
+import core
+
+LIFE = [[3], [2, 3]]
+LIFE_3D = [[6], [3, 4, 5, 6]]
+
+
+@pytest.mark.parametrize('backend', ['array', 'active', 'bitpacked'])
+def test_counts_match_the_states(backend, monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', backend)
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    state = baseline.randomState((15, 12, 1), 0.35, seed=29)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    for g, record in enumerate(core.iterateField(f, 6, generation=10)):
+        new = baseline.run(state, LIFE, 1)
+        assert record == {'generation': 11 + g,
+                          'population': int(new.sum()),
+                          'births': int((new > state).sum()),
+                          'deaths': int((new < state).sum())}
+        state = new
+    assert f.census is None
+
+
+def test_extent_and_dump(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, 'backend3D', 'array')
+    monkeypatch.setattr(core, 'rules3D', LIFE_3D)
+    state = numpy.zeros((6, 7, 5), dtype=numpy.uint8)
+    state[1:3, 2:5, 1:4] = baseline.randomState((2, 3, 3), 0.7, seed=30)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    path = str(tmp_path / 'census.jsonl')
+    records = list(core.iterateField(f, 2, path, extent=True))
+    expected = baseline.run(state, LIFE_3D, 2)
+    alive = numpy.nonzero(expected)
+    assert records[-1]['boundingBox'] == [[int(a.min()) for a in alive],
+                                          [int(a.max())+1 for a in alive]]
+    assert records[-1]['layers'] == expected.sum(axis=(0, 1)).tolist()
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == records
+
+
+def test_jumps_are_one_record(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'bitpacked')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    state = baseline.randomState((15, 12, 1), 0.35, seed=31)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    f.census = census.Census()
+    f.census.reset(f.state)
+    core.advanceField(f, 5)
+    record, = f.census.take()
+    assert record['generation'] == 5
+    assert record['population'] == baseline.run(state, LIFE, 5).sum()
@@ -0,0 +1,65 @@
+import numpy
+import pytest
+
+import core
+import cycles
+
+LIFE = [[3], [2, 3]]
+
+
+def _run(state, generations, monkeypatch, backend='array'):
+    monkeypatch.setattr(core, 'backend2D', backend)
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state)
+    f.cycles = detector = cycles.Cycles(f.size, window=64)
+    detector.reset(f.state)
+    detector.record(0)
+    for g in range(generations):
+        core.updateField(f)
+        if detector.record(g+1):
+            return detector.found
+    return None
+
+
+def _field(*cells):
+    state = numpy.zeros((12, 12, 1), dtype=numpy.uint8)
+    for i, j in cells:
+        state[i, j, 0] = 1
+    return state
+
+
+@pytest.mark.parametrize('backend', ['array', 'active'])
+def test_still_life(backend, monkeypatch):
+    block = _field((3, 3), (3, 4), (4, 3), (4, 4))
+    assert _run(block, 10, monkeypatch, backend) == (1, 0)
+
+
+@pytest.mark.parametrize('backend', ['array', 'active'])
+def test_blinker_after_its_onset(backend, monkeypatch):
+    blinker = _field((5, 4), (5, 5), (5, 6))
+    assert _run(blinker, 10, monkeypatch, backend) == (2, 0)
+    # three in a row plus a stray cell that dies first: the cycle starts at 1
+    assert _run(_field((5, 4), (5, 5), (5, 6), (9, 9)), 10, monkeypatch, backend) == (2, 1)
+
+
+def test_glider_wraps_around_the_torus(monkeypatch):
+    glider = _field((1, 2), (2, 3), (3, 1), (3, 2), (3, 3))
+    # 4 generations per diagonal cell, 12 cells to come back
+    assert _run(glider, 100, monkeypatch) == (48, 0)
+
+
+def test_hash_follows_flips():
+    detector = cycles.Cycles((5, 5), window=8)
+    state = numpy.zeros((5, 5), dtype=numpy.uint8)
+    detector.reset(state)
+    empty = detector.hash
+    new = state.copy()
+    new[1, 2] = new[3, 4] = 1
+    detector.change(state, new)
+    flipped = detector.hash
+    detector.reset(new)
+    assert detector.hash == flipped
+    detector.flip((numpy.array([1]), numpy.array([2])), (numpy.array([3]), numpy.array([4])))
+    detector.flip((numpy.array([3]), numpy.array([4])), (numpy.array([1]), numpy.array([2])))
+    assert detector.hash == flipped != empty
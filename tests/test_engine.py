@@ -0,0 +1,46 @@
+import numpy
+import pytest
+
+import baseline
+import core
+import engine
+
+LIFE = [[3], [2, 3]]
+LIFE_3D = [[6], [3, 4, 5, 6]]
+
+
+@pytest.mark.parametrize('shape', [(12, 10), (1, 7), (2, 9), (2, 2), (3, 1)])
+def test_step_matches_the_baseline_2D_loop(shape):
+    state = baseline.randomState(shape, 0.4)
+    table = engine.compileRules(LIFE, 2)
+    expected = state
+    for g in range(8):
+        state = engine.step(state, table)
+        expected = baseline.step2D(expected, LIFE)
+        assert (state == expected).all()
+
+
+@pytest.mark.parametrize('shape', [(6, 5, 4), (2, 3, 4), (5, 2, 2)])
+def test_step_matches_the_baseline_3D_loop(shape):
+    state = baseline.randomState(shape, 0.3, seed=1)
+    table = engine.compileRules(LIFE_3D, 3)
+    expected = state
+    for g in range(6):
+        state = engine.step(state, table)
+        expected = baseline.step3D(expected, LIFE_3D)
+        assert (state == expected).all()
+
+
+@pytest.mark.parametrize('size', [(11, 9, 1), (6, 5, 4)])
+def test_updateField_matches_the_baseline(size, monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'array')
+    monkeypatch.setattr(core, 'backend3D', 'array')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    monkeypatch.setattr(core, 'rules3D', LIFE_3D)
+    rule = LIFE_3D if core.is3D(size) else LIFE
+    state = baseline.randomState(size, 0.35, seed=2)
+    f = core.HeadlessField(size)
+    core.setFieldState(f, state.copy())
+    for g in range(5):
+        core.updateField(f)
+    assert (f.state == baseline.run(state, rule, 5)).all()
@@ -0,0 +1,102 @@
+import numpy
+import pytest
+
+import baseline
+import core
+import engine
+import hashlife
+
+LIFE = [[3], [2, 3]]
+
+
+@pytest.mark.parametrize('shape, generations', [((13, 10), 5), ((16, 16), 16), ((7, 20), 9)])
+def test_torus_jump_matches_the_baseline_loop(shape, generations):
+    state = baseline.randomState(shape, 0.35, seed=5)
+    universe = hashlife.HashLife(LIFE)
+    universe.setState(state, torus=True)
+    universe.advance(generations)
+    assert universe.generation == generations
+    assert (universe.getState() == baseline.run(state, LIFE, generations)).all()
+
+
+def test_plane_does_not_wrap_around():
+    glider = numpy.zeros((5, 5), dtype=numpy.uint8)
+    glider[1, 2] = glider[2, 3] = glider[3, 1] = glider[3, 2] = glider[3, 3] = 1
+    universe = hashlife.HashLife(LIFE)
+    universe.setState(glider)
+    universe.advance(40)
+    # a glider moves one cell diagonally every 4 generations
+    window = universe.getState((10, 10, 5, 5))
+    assert (window == glider).all()
+    assert universe.getPopulation() == 5
+
+
+def test_cells_load_like_a_state_array():
+    state = baseline.randomState((40, 25), 0.2, seed=6)
+    xs, ys = numpy.nonzero(state)
+    fromCells, fromState = hashlife.HashLife(LIFE), hashlife.HashLife(LIFE)
+    fromCells.setCells(xs, ys)
+    fromState.setState(state)
+    for universe in (fromCells, fromState):
+        universe.advance(30)
+    window = (-40, -40, 120, 120)
+    assert (fromCells.getState(window) == fromState.getState(window)).all()
+
+
+def _sparseState(n):
+    state = numpy.zeros((n, n, 1), dtype=numpy.uint8)
+    state[:20, :20, 0] = baseline.randomState((20, 20), 0.4, seed=7)
+    return state
+
+
+def test_advanceField_keeps_the_torus_universe(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'array')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    state = _sparseState(512)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    core.advanceField(f, 64)
+    universe = f.hashlife
+    assert universe is not None and universe.torus
+    core.advanceField(f, 64)
+    assert f.hashlife is universe
+    expected = state[:, :, 0]
+    table = engine.compileRules(LIFE, 2)
+    for g in range(128):
+        expected = engine.step(expected, table)
+    assert (f.state[:, :, 0] == expected).all()
+
+
+def test_advanceField_steps_small_tori(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'array')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    state = baseline.randomState((12, 9, 1), 0.4, seed=8)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    core.advanceField(f, 30)
+    assert f.hashlife is None
+    assert (f.state == baseline.run(state, LIFE, 30)).all()
+
+
+def test_hashlife_backend_is_a_plane(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'hashlife')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    # a blinker on the edge of the window: on the plane it does not wrap
+    state = numpy.zeros((6, 6, 1), dtype=numpy.uint8)
+    state[0, 2:5, 0] = 1
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state.copy())
+    core.advanceField(f, 1)
+    assert f.hashlife is not None and not f.hashlife.torus
+    assert f.state.sum() == 2 and f.hashlife.getPopulation() == 3
+    core.updateField(f)
+    assert (f.state == state).all()
+
+
+def test_hashlife_backend_refuses_other_rules(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'hashlife')
+    monkeypatch.setattr(core, 'rules2D', 'B3/S23/R2')
+    f = core.HeadlessField((8, 8, 1))
+    core.setFieldState(f, baseline.randomState((8, 8, 1)))
+    with pytest.raises(Exception):
+        core.advanceField(f, 4)
@@ -0,0 +1,65 @@
+import baseline
+import core
+import history
+import simulation
+
+LIFE = [[3], [2, 3]]
+
+
+def _generations(count, shape=(13, 11, 1)):
+    states = [baseline.randomState(shape, 0.35, seed=19)]
+    for g in range(count-1):
+        states.append(baseline.run(states[-1], LIFE, 1))
+    return states
+
+
+def test_every_recorded_generation_is_found_again():
+    states = _generations(20)
+    record = history.History(keyframeInterval=4)
+    for g, state in enumerate(states):
+        record.record(g, state)
+    assert (record.first(), record.last()) == (0, 19)
+    assert len(record.segments) == 5
+    for g, state in enumerate(states):
+        assert (record.seek(g) == state).all()
+    assert record.seek(20) is None
+
+
+def test_the_oldest_segments_are_dropped():
+    states = _generations(20)
+    record = history.History(keyframeInterval=4, maxBytes=400)
+    for g, state in enumerate(states):
+        record.record(g, state)
+    assert record.nbytes <= 400 and record.first() > 0 and record.last() == 19
+    assert record.seek(0) is None
+    assert (record.seek(record.first()) == states[record.first()]).all()
+
+
+def test_recording_after_a_rewind_drops_the_future():
+    states = _generations(10)
+    record = history.History(keyframeInterval=4)
+    for g, state in enumerate(states):
+        record.record(g, state)
+    other = baseline.randomState(states[0].shape, 0.5, seed=20)
+    record.record(6, other)
+    assert record.last() == 6
+    assert (record.seek(6) == other).all() and (record.seek(5) == states[5]).all()
+
+
+def test_simulation_goes_back(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'array')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    monkeypatch.setattr(core, 'initialGeneration', 0)
+    states = _generations(6)
+    sim = simulation.Simulation(states[0], maxCycle=0, history=history.History(keyframeInterval=4))
+    for g in range(5):
+        sim.command('step')
+    sim.command('back')
+    sim.command('back')
+    sim.update(0.0)
+    generation, published = sim.takeLatest()
+    assert generation == 3 and (published == states[3]).all()
+    sim.command('seek', 1)
+    sim.update(0.0)
+    generation, published = sim.takeLatest()
+    assert generation == 1 and (published == states[1]).all()
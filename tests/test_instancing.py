@@ -0,0 +1,191 @@
+import ctypes
+import types
+
+import numpy
+import pytest
+
+import instancing
+
+
+class MockBuffer(object):
+    def __init__(self, itemSize, count):
+        self.memory = ctypes.create_string_buffer(max(itemSize*count, 1))
+        self.locks = 0
+
+    def lock(self, offset, length, options):
+        assert offset + length <= len(self.memory)
+        self.locks += 1
+        return ctypes.addressof(self.memory) + offset
+
+    def unlock(self):
+        pass
+
+    def array(self, dtype, count):
+        return numpy.frombuffer(self.memory, dtype=dtype, count=count)
+
+
+class MockBufferManager(object):
+    def createVertexBuffer(self, vertexSize, count, usage):
+        return MockBuffer(vertexSize, count)
+
+    def createIndexBuffer(self, indexType, count, usage):
+        return MockBuffer(4, count)
+
+
+class MockMeshManager(object):
+    def __init__(self):
+        self.meshes = {}
+
+    def load(self, name, group):
+        cube = MockMesh()
+        cube.createSubMesh().setMaterialName('CubeMaterial')
+        return cube
+
+    def createManual(self, name, group):
+        assert name not in self.meshes
+        mesh = self.meshes[name] = MockMesh()
+        return mesh
+
+    def remove(self, name):
+        del self.meshes[name]
+
+
+class MockMesh(object):
+    def __init__(self):
+        self.subMeshes = []
+
+    def createSubMesh(self):
+        subMesh = types.SimpleNamespace(indexData=types.SimpleNamespace(), material=None)
+        subMesh.setMaterialName = lambda name: setattr(subMesh, 'material', name)
+        subMesh.getMaterialName = lambda: subMesh.material
+        self.subMeshes.append(subMesh)
+        return subMesh
+
+    def getSubMesh(self, index):
+        return self.subMeshes[index]
+
+    def load(self):
+        pass
+
+    def _setBounds(self, box):
+        self.bounds = box
+
+    def _setBoundingSphereRadius(self, radius):
+        self.radius = radius
+
+
+class MockVertexData(object):
+    def __init__(self):
+        self.vertexDeclaration = types.SimpleNamespace(addElement=lambda *args: None)
+        self.bindings = {}
+        self.vertexBufferBinding = types.SimpleNamespace(setBinding=self.bindings.__setitem__)
+
+
+class MockEntity(object):
+    def __init__(self, name, mesh):
+        self.name, self.mesh = name, mesh
+        self.visible = True
+
+    def setVisible(self, visible):
+        self.visible = visible
+
+
+class MockNode(object):
+    def __init__(self):
+        self.objects = []
+
+    def attachObject(self, entity):
+        self.objects.append(entity)
+
+    def detachObject(self, entity):
+        self.objects.remove(entity)
+
+
+class MockSceneManager(object):
+    def __init__(self):
+        self.root = MockNode()
+        self.entities = {}
+
+    def getRootSceneNode(self):
+        return self.root
+
+    def createEntity(self, name, mesh):
+        entity = self.entities[name] = MockEntity(name, mesh)
+        return entity
+
+    def destroyEntity(self, entity):
+        del self.entities[entity.name]
+
+
+def mockOgre():
+    meshManager, bufferManager = MockMeshManager(), MockBufferManager()
+    return types.SimpleNamespace(
+        MeshManager=types.SimpleNamespace(getSingleton=lambda: meshManager),
+        HardwareBufferManager=types.SimpleNamespace(getSingleton=lambda: bufferManager),
+        ResourceGroupManager=types.SimpleNamespace(DEFAULT_RESOURCE_GROUP_NAME='General'),
+        HardwareBuffer=types.SimpleNamespace(HBU_DYNAMIC_WRITE_ONLY_DISCARDABLE=0, HBL_DISCARD=1),
+        HardwareIndexBuffer=types.SimpleNamespace(IT_32BIT=1),
+        VertexData=MockVertexData,
+        VET_FLOAT3=2, VES_POSITION=1, VES_NORMAL=4,
+        AxisAlignedBox=lambda *corners: corners,
+    )
+
+
+def uploaded(batch):
+    vertices = batch.vertexBuffer.array(numpy.float32, batch.vertexData.vertexCount*6)
+    indices = batch.indexBuffer.array(numpy.uint32, batch.subMesh.indexData.indexCount)
+    return vertices.reshape(-1, 6), indices
+
+
+def test_update_copies_the_geometry_into_the_buffers():
+    ogre, sceneManager = mockOgre(), MockSceneManager()
+    batch = instancing.InstancedCells(sceneManager, 2.0, ogreModule=ogre)
+    assert not batch.entity.visible
+    state = (numpy.random.RandomState(0).random_sample((6, 5, 4)) > 0.7).view(numpy.uint8)
+    batch.update(state)
+    vertices, indices = uploaded(batch)
+    expected = instancing.geometryArrays(state, 2.0)
+    assert batch.cellsCount == state.sum()
+    assert (vertices == expected[0]).all() and (indices == expected[1]).all()
+    assert batch.entity.visible
+    assert batch.subMesh.material == 'CubeMaterial'
+    # one lock per buffer and update: no per-cell calls into Ogre
+    assert batch.vertexBuffer.locks == batch.indexBuffer.locks == 2
+
+
+def test_buffers_grow_with_the_population():
+    ogre, sceneManager = mockOgre(), MockSceneManager()
+    batch = instancing.InstancedCells(sceneManager, ogreModule=ogre)
+    state = numpy.ones((5, 5, 5), dtype=numpy.uint8)
+    batch.update(state)
+    assert batch.capacity >= 125
+    vertices, indices = uploaded(batch)
+    assert len(vertices) == 125*len(instancing.CORNERS)
+    assert (indices == instancing.geometryArrays(state)[1]).all()
+    batch.update(numpy.zeros((5, 5, 5), dtype=numpy.uint8))
+    assert batch.cellsCount == 0 and not batch.entity.visible
+
+
+def test_remove_frees_the_entity_and_the_mesh():
+    ogre, sceneManager = mockOgre(), MockSceneManager()
+    batches = [instancing.InstancedCells(sceneManager, ogreModule=ogre) for i in range(2)]
+    meshes = ogre.MeshManager.getSingleton().meshes
+    assert len(meshes) == 2 and len(sceneManager.entities) == 2
+    for batch in batches:
+        batch.remove()
+    assert not meshes and not sceneManager.entities and not sceneManager.root.objects
+
+
+def test_buffers_without_an_address_are_reported():
+    ogre = mockOgre()
+    buffers = ogre.HardwareBufferManager.getSingleton()
+    create = buffers.createVertexBuffer
+    def opaque(*args):
+        buffer = create(*args)
+        buffer.lock = lambda *args: object()
+        return buffer
+    buffers.createVertexBuffer = opaque
+    with pytest.raises(instancing.NoBufferAccess):
+        instancing.InstancedCells(MockSceneManager(), ogreModule=ogre)
+    # the manual mesh is removed again
+    assert not ogre.MeshManager.getSingleton().meshes
@@ -0,0 +1,42 @@
+import pytest
+
+import baseline
+import core
+import engine
+import parallel
+
+LIFE_3D = [[6], [3, 4, 5, 6]]
+
+
+@pytest.fixture
+def parallelBackend(monkeypatch):
+    monkeypatch.setattr(core, 'backend3D', 'parallel')
+    monkeypatch.setattr(core, 'processes', 2)
+    yield
+    if core.parallelStepper is not None:
+        core.parallelStepper.close()
+        core.parallelStepper = None
+
+
+@pytest.mark.parametrize('tiles', [None, (2, 2, 1), (1, 1, 3)])
+def test_tiles_match_the_baseline_loop(tiles):
+    state = baseline.randomState((6, 5, 7), 0.3, seed=11)
+    stepper = parallel.ParallelStepper(state, engine.compileRules(LIFE_3D, 3), 2, tiles)
+    try:
+        stepper.step(4)
+        assert (stepper.getState() == baseline.run(state, LIFE_3D, 4)).all()
+    finally:
+        stepper.close()
+
+
+def test_backend_restarts_the_workers_for_a_new_rule(parallelBackend, monkeypatch):
+    state = baseline.randomState((6, 6, 5), 0.3, seed=12)
+    f = core.HeadlessField(state.shape)
+    expected = state
+    for rule in (LIFE_3D, [[5], [4, 5]]):
+        monkeypatch.setattr(core, 'rules3D', rule)
+        core.setFieldState(f, expected.copy())
+        core.updateField(f)
+        core.advanceField(f, 3)
+        expected = baseline.run(expected, rule, 4)
+        assert (f.state == expected).all()
@@ -0,0 +1,72 @@
+import os
+
+import numpy
+import pytest
+
+import baseline
+import core
+import patterns
+import rules
+
+CONFIGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'configs')
+
+
+def test_rle_round_trip(tmp_path):
+    cells = baseline.randomState((23, 17), 0.3, seed=15)
+    path = str(tmp_path / 'random.rle')
+    patterns.writeRLE(path, cells, 'B36/S23')
+    config = patterns.load(path)
+    assert config.size == [23, 17, 1] and config.rule == 'B36/S23'
+    assert (config.cells[:, :, 0] == cells).all()
+
+
+def test_cells_round_trip_keeps_the_dead_border(tmp_path):
+    cells = numpy.zeros((9, 6), dtype=numpy.uint8)
+    cells[2, 1] = cells[3, 2] = cells[1:4, 3] = 1
+    path = str(tmp_path / 'glider.cells')
+    patterns.writeCells(path, cells)
+    config = patterns.load(path)
+    assert config.size == [9, 6, 1]
+    assert (config.cells[:, :, 0] == cells).all()
+
+
+def test_macrocell_is_read_into_a_quadtree(tmp_path):
+    path = str(tmp_path / 'glider.mc')
+    with open(path, 'w') as f:
+        f.write('[M2] (golly 2.0)\n#R B3/S23\n.*$..*$***$\n4 1 0 0 0\n')
+    config = patterns.load(path)
+    assert config.size == [16, 16, 1] and config.rule == 'B3/S23'
+    universe, root = config.node
+    assert root.population == 5
+    expected = numpy.zeros((16, 16), dtype=numpy.uint8)
+    expected[1, 0] = expected[2, 1] = 1
+    expected[0:3, 2] = 1
+    assert (config.cells[:, :, 0] == expected).all()
+
+
+def test_images_are_read_in_c_order():
+    config = patterns.load(os.path.join(CONFIGS, '1_0 glider.bmp'))
+    assert config.cells.flags['C_CONTIGUOUS']
+    assert list(config.cells.shape) == config.size and config.cells.any()
+
+
+def test_load_caches_until_the_file_changes(tmp_path):
+    path = str(tmp_path / 'random.txt')
+    with open(path, 'w') as f:
+        f.write('[20, 10, 1]\n2\n0.5\nB36/S23\n')
+    config = patterns.load(path)
+    assert config.size == [20, 10, 1] and config.minRand == 0.5 and config.rule == 'B36/S23'
+    assert patterns.load(path) is config
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert patterns.load(path) is not config
+
+
+def test_large_patterns_need_a_moore_rule(tmp_path):
+    path = str(tmp_path / 'far.rle')
+    with open(path, 'w') as f:
+        f.write('x = 3, y = 1\n3o!\n')
+    config = patterns.load(path)
+    assert core._patternUniverse(config, rules.parse('B3/S23')).getPopulation() == 3
+    with pytest.raises(Exception):
+        core._patternUniverse(config, rules.parse('B3/S23/R2'))
@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+
+import core
+import patterns
+import prefetch
+
+
+def _configs(directory, names):
+    paths = []
+    for name in names:
+        path = os.path.join(str(directory), name)
+        with open(path, 'w') as f:
+            f.write('[12, 8, 1]\n1\n0.5\n')
+        paths.append(path)
+    return paths
+
+
+def _waitFor(condition, timeout=5.0):
+    end = time.time() + timeout
+    while not condition():
+        if time.time() > end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_neighbour_states_are_prepared(tmp_path):
+    first, second, third = _configs(tmp_path, ['a', 'b', 'c'])
+    prefetcher = prefetch.Prefetcher(str(tmp_path), states=True, interval=0.05)
+    prefetcher.setCurrent(second)
+    prefetcher.start()
+    try:
+        assert _waitFor(lambda: len(prefetcher.prepared) == 2)
+        state, seed = prefetcher.takeState(first)
+        assert state.shape == (12, 8, 1) and seed is not None
+        assert prefetcher.takeState(first) is None
+        assert prefetcher.takeState(second) is None
+        # decoded into the patterns cache too
+        assert (third, os.path.getmtime(third)) in patterns.cache
+    finally:
+        prefetcher.stop()
+        prefetcher.join()
+
+
+def test_added_configs_are_noticed(tmp_path):
+    _configs(tmp_path, ['a'])
+    prefetcher = prefetch.Prefetcher(str(tmp_path), interval=0.05)
+    prefetcher.start()
+    try:
+        added = _configs(tmp_path, ['b'])[0]
+        assert _waitFor(lambda: added in prefetcher.getFiles())
+    finally:
+        prefetcher.stop()
+        prefetcher.join()
+
+
+def test_refreshFiles_follows_the_current_config(tmp_path, monkeypatch):
+    first, second, third = _configs(tmp_path, ['a', 'b', 'c'])
+    prefetcher = prefetch.Prefetcher(str(tmp_path))
+    monkeypatch.setattr(core, 'prefetcher', prefetcher)
+    monkeypatch.setattr(core, 'files', [first, second, third])
+    monkeypatch.setattr(core, 'currentFileIndex', 1)
+    prefetcher.files = [second, third]
+    core.refreshFiles(1)
+    assert core.files[core.currentFileIndex] == second
+    # the current config was removed: the next step lands on its neighbour
+    prefetcher.files = [first, second, third]
+    core.refreshFiles(1)
+    prefetcher.files = [first, third]
+    core.refreshFiles(1)
+    assert core.files[(core.currentFileIndex + 1) % len(core.files)] == third
+    prefetcher.files = []
+    with pytest.raises(Exception):
+        core.refreshFiles(1)
@@ -0,0 +1,60 @@
+import numpy
+import pytest
+
+import baseline
+import recording
+
+LIFE = [[3], [2, 3]]
+
+
+def _record(path, states, **options):
+    recorder = recording.Recorder(path, states[0].shape, 'B3/S23', **options)
+    for state in states:
+        recorder.record(state)
+    recorder.close()
+
+
+def _generations(count, shape, density=0.1):
+    states = [baseline.randomState(shape, density, seed=21)]
+    for g in range(count-1):
+        states.append(baseline.run(states[-1], LIFE, 1))
+    return states
+
+
+@pytest.mark.parametrize('delta', [True, False])
+def test_round_trip(tmp_path, delta):
+    states = _generations(12, (40, 30, 1))
+    path = str(tmp_path / 'run.rec')
+    _record(path, states, delta=delta, chunkLength=5)
+    replay = recording.Recording(path)
+    try:
+        assert len(replay) == 12 and replay.shape == (40, 30, 1) and replay.rule == 'B3/S23'
+        # in any order: every read starts from its own keyframe
+        for g in reversed(range(12)):
+            assert (replay.state(g) == states[g]).all()
+        assert replay.seek(12) is None
+        with pytest.raises(IndexError):
+            replay.state(-1)
+    finally:
+        replay.close()
+
+
+def test_deltas_are_smaller_than_keyframes(tmp_path):
+    states = _generations(8, (64, 64, 1), density=0.02)
+    full, deltas = str(tmp_path / 'full.rec'), str(tmp_path / 'delta.rec')
+    _record(full, states, delta=False)
+    _record(deltas, states, delta=True)
+    assert (tmp_path / 'delta.rec').stat().st_size < (tmp_path / 'full.rec').stat().st_size
+
+
+def test_recordings_must_be_closed(tmp_path):
+    path = str(tmp_path / 'open.rec')
+    recorder = recording.Recorder(path, (8, 8, 1))
+    recorder.record(numpy.zeros((8, 8, 1), dtype=numpy.uint8))
+    recorder.file.flush()
+    with pytest.raises(Exception):
+        recording.Recording(path)
+    recorder.close()
+    replay = recording.Recording(path)
+    assert len(replay) == 1
+    replay.close()
@@ -0,0 +1,29 @@
+import numpy
+import pytest
+
+import baseline
+import rules
+
+
+@pytest.mark.parametrize('notation', ['B3/S23', '23/3', [[3], [2, 3]], 'B3/S2-3', 'R1,C0,M0,S2..3,B3..3,NM'])
+def test_notations_of_life(notation):
+    rule = rules.parse(notation)
+    assert list(rule) == [[3], [2, 3]] and rule.isSimple()
+    assert str(rule) == 'B3/S23'
+
+
+def test_simple_rule_matches_the_baseline_loop():
+    state = baseline.randomState((9, 8), 0.4, seed=13)
+    rule = rules.parse('B36/S23')
+    assert (rule.step(state) == baseline.step2D(state, [[3, 6], [2, 3]])).all()
+
+
+@pytest.mark.parametrize('notation', ['B5-7/S4-8/R2', 'B2/S13/NN', 'R2,C0,M1,S5..9,B4..6,NM'])
+def test_larger_neighbourhoods_count_their_offsets(notation):
+    rule = rules.parse(notation)
+    state = baseline.randomState((11, 10), 0.4, seed=14)
+    counts = sum(numpy.roll(state.astype(int), [-o for o in offset], (0, 1))
+                 for offset in rule.offsets(2))
+    expected = numpy.where(state, numpy.isin(counts, rule[1]), numpy.isin(counts, rule[0]))
+    assert (rule.step(state) == expected).all()
+    assert (rule.countNeighbours(state) == counts).all()
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+import simulation
+
+
+def test_one_generation_per_tick_owed():
+    scheduler = simulation.Scheduler(tickTime=0.1, budget=1.0)
+    steps = []
+    assert scheduler.run(0.35, lambda: steps.append(1)) == 3
+    assert len(steps) == 3
+    assert scheduler.accumulated == pytest.approx(0.05)
+    assert scheduler.wait() == pytest.approx(0.05)
+    # the fraction of a tick is kept for the next frame
+    assert scheduler.run(0.06, lambda: steps.append(1)) == 1
+    assert scheduler.behind == 0
+
+
+def test_backlog_beyond_the_budget_is_dropped():
+    # binary fractions: the tick counts are exact
+    scheduler = simulation.Scheduler(tickTime=1.0/1024, budget=0.01)
+    generations = scheduler.run(1.0, lambda: time.sleep(0.004))
+    assert 1 <= generations < 10
+    assert scheduler.behind == 1024 - generations
+    assert scheduler.accumulated == 0
+    # the next frame only owes its own time
+    assert scheduler.run(2.0/1024, lambda: None) == 2
+
+
+def test_tick_time_zero_runs_for_the_budget():
+    scheduler = simulation.Scheduler(tickTime=0.0, budget=0.02)
+    start = time.time()
+    generations = scheduler.run(0.0, lambda: time.sleep(0.001))
+    assert generations >= 2 and time.time() - start >= 0.02
+    assert scheduler.behind == 0
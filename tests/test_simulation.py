@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import baseline
+import core
+import simulation
+
+LIFE = [[3], [2, 3]]
+
+
+@pytest.fixture
+def life(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'array')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    monkeypatch.setattr(core, 'initialGeneration', 0)
+
+
+def test_steps_are_published(life):
+    state = baseline.randomState((14, 11, 1), 0.35, seed=16)
+    sim = simulation.Simulation(state, maxCycle=0, history=None)
+    assert sim.takeLatest() is None
+    for g in range(3):
+        sim.command('step')
+    sim.update(0.0)
+    generation, published = sim.takeLatest()
+    assert generation == 3
+    assert (published == baseline.run(state, LIFE, 3)).all()
+    # only the newest generation is kept for the render side
+    assert sim.takeLatest() is None
+
+
+def test_thread_runs_until_paused(life):
+    state = baseline.randomState((14, 11, 1), 0.35, seed=17)
+    sim = simulation.Simulation(state, tickTime=0.001, maxCycle=0)
+    sim.start()
+    try:
+        sim.command('run')
+        end = time.time() + 5
+        while sim.generation < 5 and time.time() < end:
+            time.sleep(0.01)
+        sim.command('pause')
+    finally:
+        sim.stop()
+    generation, published = sim.takeLatest()
+    assert generation >= 5
+    assert (published == baseline.run(state, LIFE, generation)).all()
+
+
+def test_reset_goes_back_to_the_config(life, monkeypatch):
+    state = baseline.randomState((10, 10, 1), 0.35, seed=18)
+    monkeypatch.setattr(core, 'initialCells', state)
+    monkeypatch.setattr(core, 'prefetchedState', None)
+    sim = simulation.Simulation(state, maxCycle=0)
+    sim.command('step')
+    sim.command('reset')
+    sim.update(0.0)
+    generation, published = sim.takeLatest()
+    assert generation == 0 and (published == state).all()
+
+
+def test_errors_reach_the_render_side(life):
+    sim = simulation.Simulation(baseline.randomState((6, 6, 1)), maxCycle=0)
+    sim.command('save', '/nonexistent/directory/field.snap')
+    sim.start()
+    sim.join(5)
+    with pytest.raises(Exception):
+        sim.takeLatest()
@@ -0,0 +1,47 @@
+import numpy
+import pytest
+
+import baseline
+import core
+import patterns
+import snapshot
+
+
+@pytest.mark.parametrize('shape', [(13, 7, 1), (5, 6, 3)])
+def test_round_trip(tmp_path, shape):
+    state = baseline.randomState(shape, 0.4, seed=22)
+    path = str(tmp_path / 'field.snap')
+    snapshot.save(path, state, generation=42, rule='B6/S3-6', seed=1234)
+    loaded = snapshot.Snapshot(path)
+    assert loaded.shape == shape and loaded.generation == 42
+    assert loaded.seed == 1234 and loaded.rule == 'B6/S3-6'
+    assert (loaded.cells() == state).all()
+
+
+def test_no_rule_and_no_seed(tmp_path):
+    path = str(tmp_path / 'field.snap')
+    snapshot.save(path, numpy.ones((4, 4), dtype=numpy.uint8))
+    loaded = snapshot.Snapshot(path)
+    assert loaded.shape == (4, 4, 1) and loaded.rule is None and loaded.seed is None
+
+
+def test_other_files_are_refused(tmp_path):
+    path = str(tmp_path / 'field.snap')
+    with open(path, 'wb') as f:
+        f.write(b'\0'*64)
+    with pytest.raises(Exception):
+        snapshot.Snapshot(path)
+
+
+def test_loaded_as_a_config(tmp_path, monkeypatch):
+    state = baseline.randomState((9, 8, 1), 0.4, seed=23)
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state)
+    monkeypatch.setattr(core, 'rules2D', [[3, 6], [2, 3]])
+    monkeypatch.setattr(core, 'fieldSeed', 77)
+    path = str(tmp_path / 'field.snap')
+    core.saveSnapshot(path, f, generation=5)
+    config = patterns.load(path)
+    assert config.size == [9, 8, 1] and config.generation == 5 and config.seed == 77
+    assert config.rule == 'B36/S23'
+    assert (config.cells == state).all()
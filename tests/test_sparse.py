@@ -0,0 +1,56 @@
+import numpy
+import pytest
+
+import baseline
+import core
+import sparse
+
+LIFE = [[3], [2, 3]]
+LIFE_3D = [[6], [3, 4, 5, 6]]
+
+
+def _embedded(pattern, side, corner):
+    # a torus large enough for the pattern never to reach its edges
+    state = numpy.zeros((side,)*pattern.ndim, dtype=numpy.uint8)
+    state[tuple(slice(corner, corner+n) for n in pattern.shape)] = pattern
+    return state
+
+
+@pytest.mark.parametrize('origin', [(0, 0), (-13, 21)])
+def test_plane_matches_the_baseline_loop(origin):
+    pattern = baseline.randomState((10, 12), 0.4, seed=24)
+    universe = sparse.Universe(LIFE, 2)
+    universe.setState(pattern, origin)
+    universe.step(8)
+    expected = baseline.run(_embedded(pattern, 44, 16), LIFE, 8)
+    window = tuple(o - 16 for o in origin)
+    assert (universe.getState(window, (44, 44)) == expected).all()
+    assert universe.getPopulation() == expected.sum()
+
+
+def test_space_matches_the_baseline_loop():
+    pattern = baseline.randomState((5, 4, 5), 0.4, seed=25)
+    universe = sparse.Universe(LIFE_3D, 3, block=4)
+    universe.setState(pattern)
+    universe.step(3)
+    expected = baseline.run(_embedded(pattern, 15, 5), LIFE_3D, 3)
+    assert (universe.getState((-5, -5, -5), (15, 15, 15)) == expected).all()
+
+
+def test_birth_on_zero_is_refused():
+    with pytest.raises(Exception):
+        sparse.Universe('B0/S23')
+
+
+def test_backend_lets_cells_leave_the_field(monkeypatch):
+    monkeypatch.setattr(core, 'backend2D', 'sparse')
+    monkeypatch.setattr(core, 'rules2D', LIFE)
+    state = numpy.zeros((10, 10, 1), dtype=numpy.uint8)
+    state[6, 7, 0] = state[7, 8, 0] = state[8, 6:9, 0] = 1
+    f = core.HeadlessField(state.shape)
+    core.setFieldState(f, state)
+    core.advanceField(f, 20)
+    # the glider moved 5 cells diagonally: out of the window, still alive
+    assert not f.state.any()
+    assert f.sparse.getPopulation() == 5
+    assert core.boundingBox(f) == ((11, 11), (14, 14))
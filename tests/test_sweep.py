@@ -0,0 +1,41 @@
+import pytest
+
+import core
+import sweep
+
+
+@pytest.fixture
+def restoredCore(monkeypatch):
+    # runJob sets the rules and the backends of core
+    for name in ('rules2D', 'rules3D', 'backend2D', 'backend3D'):
+        monkeypatch.setattr(core, name, getattr(core, name))
+
+
+def test_jobs_are_keyed_by_their_canonical_rule():
+    a = sweep.job([8, 8, 1], '23/3', 0.7, 1, 50)
+    b = sweep.job((8, 8, 1), 'B3/S23', 0.7, 1, 50)
+    assert a == b and sweep.jobKey(a) == sweep.jobKey(b)
+    assert sweep.jobKey(sweep.job([8, 8, 1], 'B3/S23', 0.7, 2, 50)) != sweep.jobKey(a)
+
+
+def test_engines_agree(restoredCore):
+    job = sweep.job([12, 10, 1], 'B3/S23', 0.7, 3, 60)
+    results = [sweep.runJob(job, engine) for engine in sweep.engines]
+    for result in results:
+        del result['seconds']
+    assert all(result == results[0] for result in results)
+    assert results[0]['outcome'] in ('extinct', 'cycle', 'running')
+
+
+def test_cached_jobs_are_not_run_again(tmp_path, restoredCore, monkeypatch):
+    cache = sweep.Cache(str(tmp_path))
+    jobs = [sweep.job([8, 8, 1], 'B3/S23', 0.7, seed, 30) for seed in range(3)]
+    assert cache.get(jobs[0]) is None
+    first = sweep.sweep(jobs[:2], processes=1, cache=cache)
+    assert cache.get(jobs[1]) == first[1]
+    computed = []
+    results = sweep.sweep(jobs, processes=1, cache=cache, progress=computed.append)
+    assert results[:2] == first and [r['seed'] for r in computed] == [2]
+    # everything cached: no pool at all
+    monkeypatch.setattr(sweep.multiprocessing, 'Pool', None)
+    assert sweep.sweep(jobs, cache=cache) == results